@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.urls import path
-from library_app import views
+from library_app import api, views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +13,7 @@ urlpatterns = [
     path('member/home/', views.member_home, name='member_home'),
     path('member/history/', views.my_history, name='my_history'),
     path('logout/', views.logout_view, name='logout'),
+    path('branch/', views.switch_branch, name='switch_branch'),
     
     # --- Member View ---
     path('<int:ssid>/', views.member_profile, name='member_profile'),
@@ -34,11 +35,29 @@ urlpatterns = [
     # --- Module 5: Return Processing ---
     path('record/', views.return_counter, name='return_counter'),
     path('record/<int:tx_id>/process/', views.process_return, name='process_return'),
+    path('record/member/<int:ssid>/return-all/', views.process_bulk_return, name='process_bulk_return'),
+    path('counter/sync/', views.counter_sync, name='counter_sync'),
 
     # --- Module 6: Transaction History ---
     path('transaction/', views.transaction_history, name='transaction_history'),
+    path('transaction/export/', views.transaction_export, name='transaction_export'),
 
     # --- Module 7: Admin Settings ---
     path('settings/', views.admin_settings, name='admin_settings'),
     path('settings/change-password/', views.change_password, name='change_password'),
+
+    # --- Module 10: Runtime Metrics ---
+    path('metrics/', views.metrics_view, name='metrics'),
+
+    # --- Module 11: Stocktake ---
+    path('stocktake/', views.stocktake_list, name='stocktake_list'),
+    path('stocktake/<int:pk>/', views.stocktake_detail, name='stocktake_detail'),
+    path('stocktake/<int:pk>/apply/', views.stocktake_apply, name='stocktake_apply'),
+    path('stocktake/<int:pk>/report/', views.stocktake_report, name='stocktake_report'),
+
+    # --- Module 12: Scanner JSON API ---
+    path('api/checkout/', api.api_checkout, name='api_checkout'),
+    path('api/return/', api.api_return, name='api_return'),
+    path('api/books/<int:book_id>/', api.api_book, name='api_book'),
+    path('api/members/<int:ssid>/', api.api_member, name='api_member'),
 ]
\ No newline at end of file
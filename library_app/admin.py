@@ -1,7 +1,18 @@
 from django.contrib import admin
-from .models import Member, Book, BorrowTransaction
+from .models import Member, Book, BorrowTransaction, Branch, ScannerDevice
 
 # ลงทะเบียน Models เข้าไปในหน้าต่าง Admin ของ Django
 admin.site.register(Member)
 admin.site.register(Book)
-admin.site.register(BorrowTransaction)
\ No newline at end of file
+admin.site.register(BorrowTransaction)
+admin.site.register(Branch)
+
+
+@admin.register(ScannerDevice)
+class ScannerDeviceAdmin(admin.ModelAdmin):
+    # สร้าง token ใหม่ด้วย `manage.py scanner_token` ที่นี่ใช้ดูและปิดการใช้งานเครื่องเท่านั้น
+    list_display = ('name', 'branch', 'is_active', 'last_seen_at')
+    readonly_fields = ('created_at', 'last_seen_at')
+
+    def has_add_permission(self, request):
+        return False
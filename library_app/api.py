@@ -0,0 +1,197 @@
+import hashlib
+import json
+import secrets
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from . import metrics
+from .circulation import OPEN_STATUSES, CheckoutError, checkout, return_loan
+from .idempotency import IdempotencyError, request_hash, run_once
+from .models import Book, BorrowTransaction, Member, ScannerDevice
+from .routers import pin_member_to_primary
+
+# ==========================================
+# Scanner JSON API (สำหรับเครื่องสแกนที่เคาน์เตอร์)
+# ==========================================
+# ยืนยันตัวตนด้วย header "Authorization: Bearer <token>" ของแต่ละเครื่อง ไม่ใช้ session / CSRF / messages / template
+# ยืม-คืนผ่าน checkout() / return_loan() ตัวเดียวกับหน้า HTML จึงได้ transaction, journal และคิวงานเหมือนกันทุกอย่าง
+# อ่านจาก primary เสมอ เพราะเครื่องสแกนมักอ่านรายการที่เพิ่งเขียนทันที
+# ยืม-คืนรับ header Idempotency-Key: เครื่องที่ส่งซ้ำหลังเครือข่ายค้างได้คำตอบเดิมโดยไม่ทำรายการซ้ำ
+
+# อัปเดต last_seen_at ไม่บ่อยกว่านี้ (วินาที) เพื่อไม่ให้ทุก request ต้องเขียนฐานข้อมูล
+LAST_SEEN_INTERVAL = 60
+MAX_LOAN_DAYS = 60
+
+
+def hash_token(token):
+    # token สุ่มยาว 256 bit จึงใช้ SHA-256 ธรรมดาได้ (ไม่ต้องใช้ password hasher ที่ช้าโดยตั้งใจ)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(name, branch=None):
+    """ สร้างเครื่องสแกนใหม่ คืนค่า (device, token) โดย token แสดงได้ครั้งเดียว ไม่ได้เก็บไว้ในระบบ """
+    token = secrets.token_urlsafe(32)
+    device = ScannerDevice.objects.create(name=name, branch=branch, token_hash=hash_token(token))
+    return device, token
+
+
+def authenticate(request):
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    if scheme != 'Bearer' or not token:
+        return None
+    device = ScannerDevice.objects.filter(token_hash=hash_token(token.strip()), is_active=True).first()
+    if device is not None:
+        now = timezone.now()
+        if device.last_seen_at is None or now - device.last_seen_at > timedelta(seconds=LAST_SEEN_INTERVAL):
+            ScannerDevice.objects.filter(pk=device.pk).update(last_seen_at=now)
+    return device
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def ok(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def device_api(*methods):
+    """ decorator: ตรวจ method และ token ของเครื่องสแกน (request.device) แล้ววัดเวลาที่ใช้ต่อ endpoint """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            start = time.perf_counter()
+            if request.method not in methods:
+                response = error('method not allowed', 405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            request.device = authenticate(request)
+            if request.device is None:
+                return error('invalid device token', 401)
+            response = view(request, *args, **kwargs)
+            metrics.observe('scanner_api_seconds', time.perf_counter() - start, endpoint=view.__name__)
+            return response
+        return wrapper
+    return decorator
+
+
+def _payload(request):
+    """ body เป็น JSON object -> dict (ValueError ถ้ารูปแบบไม่ถูกต้อง) """
+    data = json.loads(request.body or b'{}')
+    if not isinstance(data, dict):
+        raise ValueError('body must be a JSON object')
+    return data
+
+
+def _integer(data, name, default=None):
+    value = data.get(name, default)
+    if isinstance(value, (bool, list, dict)) or value is None:
+        raise ValueError(f'{name} must be an integer')
+    return int(value)
+
+
+def once(request, action, params, perform):
+    """
+    ทำ perform() ครั้งเดียวต่อ header Idempotency-Key ของเครื่องนี้ (เครื่องสแกนส่งซ้ำเมื่อไม่ได้รับคำตอบ)
+    คำขอซ้ำได้ status และ body เดิม พร้อม header Idempotent-Replayed
+    """
+    try:
+        status, body, replayed = run_once(
+            f'device:{request.device.pk}', request.headers.get('Idempotency-Key', ''),
+            request_hash(action, params), perform,
+        )
+    except IdempotencyError as e:
+        return error(str(e), 422)
+    response = ok(body, status)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+# ==========================================
+# Endpoints
+# ==========================================
+@device_api('POST')
+def api_checkout(request):
+    """ {"ssid": 10000001, "book_id": 10001, "days": 7} -> 201 พร้อมรายการยืมที่สร้าง """
+    try:
+        data = _payload(request)
+        ssid, book_id = _integer(data, 'ssid'), _integer(data, 'book_id')
+        days = _integer(data, 'days', 7)
+    except ValueError as e:
+        return error(str(e), 400)
+    if not 1 <= days <= MAX_LOAN_DAYS:
+        return error(f'days must be between 1 and {MAX_LOAN_DAYS}', 400)
+
+    def perform():
+        member = Member.objects.filter(ssid=ssid).first()
+        book = Book.objects.filter(book_id=book_id).first()
+        if member is None or book is None:
+            return 404, {'error': '⚠️ ไม่พบสมาชิกหรือหนังสือในระบบ'}
+        try:
+            tx = checkout(member, book, days=days)
+        except CheckoutError as e:
+            return 409, {'error': str(e)}
+        pin_member_to_primary(member.ssid)
+
+        body = {'tx_id': tx.tx_id, 'ssid': member.ssid, 'book_id': book.book_id, 'title': book.title,
+                'due_date': tx.due_date.isoformat(), 'branch': tx.branch_id}
+        if request.device.branch_id and request.device.branch_id != tx.branch_id:
+            body['warning'] = f'📍 หนังสือเล่มนี้เป็นของสาขา {tx.branch_id}'
+        return 201, body
+
+    return once(request, 'checkout', {'ssid': ssid, 'book_id': book_id, 'days': days}, perform)
+
+
+@device_api('POST')
+def api_return(request):
+    """ {"book_id": 10001} (สแกนที่ตัวเล่ม) หรือ {"tx_id": 123} -> รายการที่รับคืนพร้อมค่าปรับ """
+    try:
+        data = _payload(request)
+        lookup = {'tx_id': _integer(data, 'tx_id')} if 'tx_id' in data else {'book_id': _integer(data, 'book_id')}
+    except ValueError as e:
+        return error(str(e), 400)
+
+    def perform():
+        tx = BorrowTransaction.objects.filter(status__in=OPEN_STATUSES, **lookup).first()
+        if tx is None:
+            return 404, {'error': '⚠️ ไม่พบรายการยืมที่ยังไม่คืน'}
+        tx = return_loan(tx)
+        pin_member_to_primary(tx.member_id)
+        return 200, {'tx_id': tx.tx_id, 'ssid': tx.member_id, 'book_id': tx.book_id, 'status': tx.status,
+                     'fine': str(tx.fine_amount)}
+
+    return once(request, 'return', lookup, perform)
+
+
+@device_api('GET')
+def api_book(request, book_id):
+    book = Book.objects.filter(book_id=book_id).values('book_id', 'title', 'status', 'branch', 'location').first()
+    if book is None:
+        return error('⚠️ ไม่พบหนังสือในระบบ', 404)
+    return ok(book)
+
+
+@device_api('GET')
+def api_member(request, ssid):
+    """ ข้อมูลสมาชิกและรายการที่ยังไม่คืน (ใช้ที่จุดรับคืน) """
+    member = Member.objects.filter(ssid=ssid).values('ssid', 'full_name').first()
+    if member is None:
+        return error('⚠️ ไม่พบรหัสสมาชิก (SSID) นี้ในระบบ', 404)
+    loans = (
+        BorrowTransaction.objects.filter(member_id=ssid, status__in=OPEN_STATUSES).order_by('start_date')
+        .values('tx_id', 'book_id', 'book__title', 'due_date', 'status')
+    )
+    member['loans'] = [
+        {'tx_id': loan['tx_id'], 'book_id': loan['book_id'], 'title': loan['book__title'],
+         'due_date': loan['due_date'].isoformat(), 'status': loan['status']}
+        for loan in loans
+    ]
+    return ok(member)
@@ -3,3 +3,20 @@ from django.apps import AppConfig
 
 class LibraryAppConfig(AppConfig):
     name = 'library_app'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from . import checks  # noqa: F401 (ลงทะเบียน system checks)
+        from . import tasks  # noqa: F401 (ลงทะเบียนงานเบื้องหลัง)
+        from .caching import bump_catalog_version, bump_history_version, bump_members_version
+        from .sqlite import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='library_app.sqlite_pragmas')
+
+        # เปลี่ยน version ของ fragment cache เมื่อข้อมูลหนังสือ/สมาชิกเปลี่ยน
+        for name, signal in (('save', post_save), ('delete', post_delete)):
+            signal.connect(bump_catalog_version, sender='library_app.Book', dispatch_uid=f'library_app.catalog_{name}')
+            signal.connect(bump_members_version, sender='library_app.Member', dispatch_uid=f'library_app.members_{name}')
+        # การลบรายการยืมแบบกลุ่ม (archive) เปลี่ยน version เองหลังลบ จึงไม่ต่อ post_delete ที่ทำให้ต้องโหลดทีละแถว
+        post_save.connect(bump_history_version, sender='library_app.BorrowTransaction', dispatch_uid='library_app.history_save')
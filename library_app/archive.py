@@ -0,0 +1,106 @@
+import heapq
+from datetime import timedelta
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import bump_history_on_commit
+from .models import ArchivedTransaction, Book, BorrowTransaction
+from .routers import archive_alias
+
+# ฟิลด์ที่คัดลอกจากตารางหลัก (hot) ไปยังตาราง archive (cold)
+ARCHIVE_FIELDS = ('tx_id', 'member_id', 'book_id', 'start_date', 'due_date', 'returned_at', 'fine_amount', 'status',
+                  'branch_id')
+
+
+# ==========================================
+# การย้ายข้อมูล Hot -> Cold
+# ==========================================
+def archive_cutoff(older_than_days=None):
+    """ วันที่ตัดรอบ: รายการที่คืนก่อนเวลานี้จะถูกย้ายไป archive """
+    if older_than_days is None:
+        older_than_days = settings.ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=older_than_days)
+
+
+def archivable_transactions(older_than_days=None):
+    return BorrowTransaction.objects.filter(status='RETURNED', returned_at__lt=archive_cutoff(older_than_days))
+
+
+def archive_returned_transactions(older_than_days=None, batch_size=None, max_batches=None):
+    """
+    ย้ายรายการ RETURNED ที่เก่ากว่ากำหนดไปยัง ArchivedTransaction ทีละ batch
+
+    แต่ละ batch จะ commit สำเนาใน archive ก่อนแล้วจึงลบออกจากตารางหลัก หากหยุดกลางคันสามารถรันซ้ำได้ทันที
+    (แถวที่คัดลอกไปแล้วจะถูกข้ามด้วย ignore_conflicts) คืนค่าเป็นจำนวนแถวที่ย้ายสำเร็จ
+    """
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = archive_cutoff(older_than_days)
+    target = archive_alias()
+    moved = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        rows = list(
+            BorrowTransaction.objects
+            .filter(status='RETURNED', returned_at__lt=cutoff)
+            .order_by('tx_id')
+            .values(*ARCHIVE_FIELDS)[:batch_size]
+        )
+        if not rows:
+            break
+
+        tx_ids = [row['tx_id'] for row in rows]
+        # commit สำเนาใน archive ให้เสร็จก่อน (archive อาจเป็นคนละฐานข้อมูล จึงไม่มี transaction ร่วมกัน)
+        with transaction.atomic(using=target):
+            ArchivedTransaction.objects.using(target).bulk_create(
+                [ArchivedTransaction(**row) for row in rows], ignore_conflicts=True,
+            )
+        # ลบจากตารางหลักเฉพาะแถวที่อ่านกลับจาก archive ได้จริง
+        copied = list(ArchivedTransaction.objects.using(target).filter(tx_id__in=tx_ids).values_list('tx_id', flat=True))
+        if not copied:
+            break
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            BorrowTransaction.objects.filter(tx_id__in=copied, status='RETURNED').delete()
+        bump_history_on_commit(row['member_id'] for row in rows)
+
+        moved += len(copied)
+        batches += 1
+
+    return moved
+
+
+# ==========================================
+# การอ่านประวัติแบบรวม Hot + Cold
+# ==========================================
+def filter_archive(archived, query='', status_filter=''):
+    """ ใช้ตัวกรองชุดเดียวกับ transaction_history กับตาราง archive (ไม่ join ข้ามฐานข้อมูล) """
+    if status_filter:
+        archived = archived.filter(status=status_filter)
+    if query:
+        title_matches = Book.objects.filter(title__icontains=query).values_list('book_id', flat=True)
+        archived = archived.filter(
+            Q(member__ssid__icontains=query) | Q(book__book_id__icontains=query) | Q(book_id__in=list(title_matches))
+        )
+    return archived
+
+
+def merge_history(hot_qs, archived_qs, order_field='start_date', descending=True):
+    """
+    รวมผลลัพธ์จากตารางหลักและ archive ที่เรียงมาแล้วทั้งคู่ (merge แบบ O(n) ไม่ต้อง sort ใหม่)
+    แถวที่ซ้ำกันระหว่างการย้าย batch จะถูกตัดออกโดยใช้ tx_id
+    """
+    prefix = '-' if descending else ''
+    hot = hot_qs.order_by(f'{prefix}{order_field}', f'{prefix}tx_id')
+    cold = archived_qs.order_by(f'{prefix}{order_field}', f'{prefix}tx_id').prefetch_related('member', 'book')
+
+    seen = set()
+    merged = []
+    for tx in heapq.merge(hot, cold, key=attrgetter(order_field), reverse=descending):
+        if tx.tx_id in seen:
+            continue
+        seen.add(tx.tx_id)
+        merged.append(tx)
+    return merged
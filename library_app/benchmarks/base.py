@@ -0,0 +1,110 @@
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from library_app.models import Book, BorrowTransaction, Member
+
+
+def peak_rss_mb():
+    """ หน่วยความจำสูงสุดของ process (MB) ru_maxrss เป็น KB บน Linux และ byte บน macOS """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+@contextmanager
+def timer():
+    """ ใช้แบบ `with timer() as elapsed: ...` แล้วอ่านค่า elapsed() เป็นวินาที """
+    start = time.perf_counter()
+    end = None
+
+    def elapsed():
+        return (end or time.perf_counter()) - start
+
+    try:
+        yield elapsed
+    finally:
+        end = time.perf_counter()
+
+
+@contextmanager
+def scratch_database():
+    """
+    สร้างฐานข้อมูลชั่วคราวแยกจากข้อมูลจริง (ใช้กลไกเดียวกับ test runner) แล้วลบทิ้งเมื่อจบ
+    สำหรับ SQLite จะใช้ไฟล์ชั่วคราวแทน in-memory เพื่อให้วัดหน่วยความจำได้ตรงกับการใช้งานจริง
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    original_test_name = test_settings.get('NAME')
+    tmp_dir = None
+    if connection.vendor == 'sqlite':
+        tmp_dir = tempfile.TemporaryDirectory(prefix='library-bench-')
+        test_settings['NAME'] = os.path.join(tmp_dir.name, 'bench.sqlite3')
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = original_test_name
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+def seed_catalog(members=1000, books=5000):
+    """ สร้างสมาชิกและหนังสือจำลองแบบ bulk (ไม่ตั้งรหัสผ่านเพื่อความเร็ว) """
+    categories = ['Technology', 'Science', 'History', 'Fiction', 'Self-Help', 'Business']
+    Member.objects.bulk_create([
+        Member(ssid=10000001 + i, full_name=f"Bench Member {i}", email=f"bench{i}@mem.com", phone_number="0800000000")
+        for i in range(members)
+    ], batch_size=1000)
+    Book.objects.bulk_create([
+        Book(book_id=10001 + i, title=f"Bench Book {i}", author=f"Author {i % 97}",
+             category=categories[i % len(categories)], location=f"{chr(65 + i % 6)}{i % 9 + 1}")
+        for i in range(books)
+    ], batch_size=1000)
+
+
+def seed_transactions(rows, members=1000, books=5000, batch_size=50_000, seed=42):
+    """
+    เติม BorrowTransaction จำนวนมากด้วย executemany โดยตรง (เร็วกว่า ORM หลายเท่า)
+    ใช้สถานะ RETURNED ~85%, ACTIVE ~10%, OVERDUE ~5%
+    """
+    rng = random.Random(seed)
+    meta = BorrowTransaction._meta
+    qn = connection.ops.quote_name
+    columns = [meta.get_field(name).column for name in
+               ('member', 'book', 'start_date', 'due_date', 'returned_at', 'fine_amount', 'status')]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        qn(meta.db_table), ', '.join(qn(c) for c in columns), ', '.join(['%s'] * len(columns)),
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    now = timezone.now()
+
+    def generate(count):
+        for _ in range(count):
+            start = now - timedelta(days=rng.randint(0, 3650), seconds=rng.randint(0, 86400))
+            due = start + timedelta(days=7)
+            roll = rng.random()
+            if roll < 0.85:
+                status, returned, fine = 'RETURNED', adapt(start + timedelta(days=rng.randint(1, 10))), '0.00'
+            elif roll < 0.95:
+                status, returned, fine = 'ACTIVE', None, '0.00'
+            else:
+                status, returned, fine = 'OVERDUE', None, '30.00'
+            yield (10000001 + rng.randrange(members), 10001 + rng.randrange(books),
+                   adapt(start), adapt(due), returned, fine, status)
+
+    remaining = rows
+    with connection.cursor() as cursor:
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            with transaction.atomic():
+                cursor.executemany(sql, list(generate(size)))
+            remaining -= size
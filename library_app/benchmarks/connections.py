@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+MODES = {
+    # ปิดการเชื่อมต่อทุก request (พฤติกรรมเดิมก่อนมี pooling)
+    'no_pooling': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': False},
+    'persistent_health_checked': {'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _simulate_request(conn):
+    """ จำลองวงจรของหนึ่ง request: close_old_connections -> query -> close_old_connections """
+    conn.close_if_unusable_or_obsolete()
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    conn.close_if_unusable_or_obsolete()
+
+
+def run(alias=DEFAULT_DB_ALIAS, iterations=500, handshake_ms=0.0):
+    """
+    วัด latency ต่อ request ของแต่ละโหมดการเชื่อมต่อ
+    handshake_ms ใช้จำลองเวลา TCP/TLS/auth ของเซิร์ฟเวอร์จริงเมื่อทดสอบกับ SQLite ในเครื่อง
+    """
+    conn = connections[alias]
+    original_settings = {key: conn.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    original_get_new_connection = conn.get_new_connection
+    opened = 0
+
+    def get_new_connection(conn_params):
+        nonlocal opened
+        opened += 1
+        if handshake_ms:
+            time.sleep(handshake_ms / 1000)
+        return original_get_new_connection(conn_params)
+
+    conn.get_new_connection = get_new_connection
+    results = {}
+    try:
+        for mode, overrides in MODES.items():
+            conn.close()
+            conn.settings_dict.update(overrides)
+            opened = 0
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                _simulate_request(conn)
+                samples.append((time.perf_counter() - start) * 1000)
+            results[mode] = {
+                'iterations': iterations,
+                'connections_opened': opened,
+                'mean_ms': round(statistics.fmean(samples), 3),
+                'p50_ms': round(_percentile(samples, 50), 3),
+                'p95_ms': round(_percentile(samples, 95), 3),
+            }
+    finally:
+        conn.close()
+        conn.settings_dict.update(original_settings)
+        del conn.get_new_connection
+
+    return {'alias': alias, 'vendor': conn.vendor, 'handshake_ms': handshake_ms, 'modes': results}
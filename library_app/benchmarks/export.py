@@ -0,0 +1,34 @@
+from library_app.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_rows
+
+from .base import peak_rss_mb, scratch_database, seed_catalog, seed_transactions, timer
+
+
+def run(rows=10_000_000, export_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """ วัด rows/sec และ peak RSS ของการ export แบบ streaming บนตารางขนาด `rows` แถว """
+    to_lines, _ = EXPORT_FORMATS[export_format]
+
+    with scratch_database():
+        seed_catalog()
+        with timer() as seed_elapsed:
+            seed_transactions(rows)
+        rss_before = peak_rss_mb()
+
+        exported = nbytes = 0
+        with timer() as export_elapsed:
+            for line in to_lines(export_rows(chunk_size=chunk_size)):
+                exported += 1
+                nbytes += len(line)
+
+    seconds = export_elapsed()
+    return {
+        'rows': rows,
+        'format': export_format,
+        'chunk_size': chunk_size,
+        'seed_seconds': round(seed_elapsed(), 2),
+        'export_seconds': round(seconds, 2),
+        'rows_per_second': round(rows / seconds) if seconds else None,
+        'bytes': nbytes,
+        'lines': exported,
+        'peak_rss_mb_before_export': round(rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
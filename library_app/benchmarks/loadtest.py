@@ -0,0 +1,241 @@
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+
+from library_app.circulation import OPEN_STATUSES
+from library_app.models import Book, BorrowTransaction, Member
+
+from .base import seed_catalog, seed_transactions
+
+# สัดส่วน traffic เริ่มต้นของหนึ่งวันที่เคาน์เตอร์ (ปรับได้ด้วย --mix)
+DEFAULT_MIX = {
+    'login': 5,
+    'borrow_counter': 20,
+    'return_counter': 20,
+    'member_search': 40,
+    'admin_dashboard': 15,
+    # ผู้โจมตีเดารหัสผ่านจาก IP เดียว (ปิดไว้ในค่าเริ่มต้น เปิดด้วย --mix เพื่อวัดผลของ login throttle)
+    'login_flood': 0,
+}
+
+ADMIN_SSID = 90000001
+ADMIN_PASSWORD = 'admin123'
+MEMBER_PASSWORD = 'member123'
+SEARCH_TERMS = ['Bench', 'Book 1', 'Science', 'History', 'Fiction', 'Author 4', 'zzz']
+ATTACKER_IP = '203.0.113.7'
+
+
+# ==========================================
+# Synthetic Data
+# ==========================================
+def seed_counter_day(members=1000, books=5000, history=20_000):
+    """ สร้างข้อมูลจำลอง: Admin 1 คน, สมาชิก, หนังสือ และประวัติการยืม (รหัสผ่านใช้ hash ชุดเดียวเพื่อความเร็ว) """
+    seed_catalog(members=members, books=books)
+    seed_transactions(history, members=members, books=books)
+
+    template = Member(ssid=0)
+    template.set_password(MEMBER_PASSWORD)
+    Member.objects.update(password_hash=template.password_hash)
+
+    admin = Member(ssid=ADMIN_SSID, full_name='Load Test Librarian', email='loadtest@lib.com',
+                   phone_number='0800000000', is_admin=True)
+    admin.set_password(ADMIN_PASSWORD)
+    admin.save()
+
+    # ให้สถานะหนังสือสอดคล้องกับรายการที่ยังไม่คืน
+    Book.objects.filter(transactions__status__in=OPEN_STATUSES).update(status='BORROWED')
+
+
+# ==========================================
+# Scenarios (หนึ่ง scenario = หนึ่งหรือหลาย request ที่ถูกจับเวลาแยกตาม route)
+# ==========================================
+class Worker:
+    def __init__(self, members, books, rng, record):
+        self.members = members
+        self.books = books
+        self.rng = rng
+        self.record = record
+        self.admin = self._login(ADMIN_SSID, ADMIN_PASSWORD, timed=False)
+        self.member = self._login(self.rng.choice(members), MEMBER_PASSWORD, timed=False)
+        self.attacker = Client(raise_request_exception=False, REMOTE_ADDR=ATTACKER_IP)
+
+    def _client(self):
+        # ผู้ใช้จริงมาจากคนละเครื่อง (login throttle นับแยกตาม IP)
+        ip = '10.{}.{}.{}'.format(*(self.rng.randrange(1, 255) for _ in range(3)))
+        return Client(raise_request_exception=False, REMOTE_ADDR=ip)
+
+    def _timed(self, route, func, expected=(200, 302)):
+        start = time.perf_counter()
+        try:
+            response = func()
+            ok = response.status_code in expected
+        except Exception:
+            ok = False
+        self.record(route, time.perf_counter() - start, ok)
+
+    def _login(self, ssid, password, timed=True):
+        client = self._client()
+        request = lambda: client.post('/', {'ssid': ssid, 'password': password})
+        if timed:
+            self._timed('index (login)', request, expected=(302,))
+        else:
+            request()
+        return client
+
+    def login(self):
+        if self.rng.random() < 0.2:
+            self._login(ADMIN_SSID, ADMIN_PASSWORD)
+        else:
+            self._login(self.rng.choice(self.members), MEMBER_PASSWORD)
+
+    def login_flood(self):
+        data = {'ssid': self.rng.choice(self.members), 'password': 'guess'}
+        self._timed('index (flood)', lambda: self.attacker.post('/', data), expected=(200, 429))
+
+    def borrow_counter(self):
+        data = {'ssid': self.rng.choice(self.members), 'book_id': self.rng.choice(self.books), 'duration': 7, 'unit': 'days'}
+        self._timed('borrow_counter', lambda: self.admin.post('/borrow/', data))
+
+    def return_counter(self):
+        # เลือกสมาชิกที่มีรายการค้างคืนอยู่ (นอกช่วงจับเวลา)
+        open_tx = (BorrowTransaction.objects.filter(status__in=OPEN_STATUSES, member_id=self.rng.choice(self.members))
+                   .values_list('tx_id', 'member_id').first())
+        if open_tx is None:
+            ssid = self.rng.choice(self.members)
+            self._timed('return_counter', lambda: self.admin.get('/record/', {'ssid': ssid}))
+            return
+        tx_id, ssid = open_tx
+        self._timed('return_counter', lambda: self.admin.get('/record/', {'ssid': ssid}))
+        self._timed('process_return', lambda: self.admin.post(f'/record/{tx_id}/process/'))
+
+    def member_search(self):
+        term = self.rng.choice(SEARCH_TERMS)
+        self._timed('member_home (search)', lambda: self.member.get('/member/home/', {'q': term}))
+
+    def admin_dashboard(self):
+        self._timed('admin_dashboard', lambda: self.admin.get('/dashboard/'))
+
+
+# ==========================================
+# Runner
+# ==========================================
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, max(0, int(round(len(ordered) * pct / 100)) - 1))]
+
+
+def _collect(threads, duration, scenarios, weights, members, books, seed, ready=None):
+    """
+    ล็อกอิน worker ทั้งหมดก่อน (ไม่นับเวลา) แล้วรัน threads จนครบ duration
+    คืนค่า (samples ms ต่อ route, จำนวน error ต่อ route, เวลาที่ใช้จริง)
+    """
+    lock = threading.Lock()
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+
+    def record(route, seconds, ok):
+        with lock:
+            samples[route].append(seconds * 1000)
+            if not ok:
+                errors[route] += 1
+
+    workers = [Worker(members, books, random.Random(seed * 1000 + i), record) for i in range(threads)]
+    connection.close()
+    if ready is not None:
+        # รอให้ทุก process ล็อกอินเสร็จ แล้วเริ่มจับเวลาพร้อมกัน
+        ready.wait()
+
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def work(worker):
+        try:
+            while time.perf_counter() < deadline:
+                getattr(worker, worker.rng.choices(scenarios, weights)[0])()
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=work, args=(worker,)) for worker in workers]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return dict(samples), dict(errors), time.perf_counter() - started
+
+
+def _process_main(queue, *args):
+    queue.put(_collect(*args))
+
+
+def run(threads=8, duration=30.0, mix=None, seed=1, processes=1):
+    """
+    รันโหลดเทสต์แบบ in-process บนฐานข้อมูลปัจจุบัน (ควรเรียกภายใน scratch_database())
+    processes > 1 จะ fork หลาย process (ฐานข้อมูลต้องเป็นไฟล์หรือเซิร์ฟเวอร์) เพื่อเลี่ยง GIL เหมือน gunicorn หลาย worker
+    คืนค่าเป็น dict พร้อม throughput และ p50/p95/p99/error rate แยกตาม route
+    """
+    mix = mix or DEFAULT_MIX
+    scenarios, weights = zip(*[(name, weight) for name, weight in mix.items() if weight > 0])
+    members = list(Member.objects.filter(is_admin=False).values_list('ssid', flat=True))
+    books = list(Book.objects.values_list('book_id', flat=True))
+    vendor = connection.vendor
+
+    # Client ใช้ host "testserver" จึงต้องอนุญาตไว้ระหว่างรัน
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        if processes > 1:
+            # ห้ามส่งต่อการเชื่อมต่อฐานข้อมูลที่เปิดอยู่ให้ process ลูก
+            connection.close()
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            ready = context.Barrier(processes)
+            children = [
+                context.Process(target=_process_main,
+                                args=(queue, threads, duration, scenarios, weights, members, books, seed + i, ready))
+                for i in range(processes)
+            ]
+            for child in children:
+                child.start()
+            results = [queue.get() for _ in children]
+            for child in children:
+                child.join()
+        else:
+            results = [_collect(threads, duration, scenarios, weights, members, books, seed)]
+
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    elapsed = max(part[2] for part in results)
+    for part_samples, part_errors, _ in results:
+        for route, values in part_samples.items():
+            samples[route].extend(values)
+        for route, count in part_errors.items():
+            errors[route] += count
+
+    routes = {}
+    for route, values in sorted(samples.items()):
+        ordered = sorted(values)
+        routes[route] = {
+            'requests': len(ordered),
+            'errors': errors[route],
+            'error_rate': round(errors[route] / len(ordered), 4),
+            'throughput_rps': round(len(ordered) / elapsed, 2),
+            'mean_ms': round(statistics.fmean(ordered), 2),
+            'p50_ms': round(_percentile(ordered, 50), 2),
+            'p95_ms': round(_percentile(ordered, 95), 2),
+            'p99_ms': round(_percentile(ordered, 99), 2),
+        }
+
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'config': {'threads': threads, 'processes': processes, 'duration_s': duration, 'mix': dict(mix),
+                   'seed': seed, 'database_vendor': vendor},
+        'elapsed_s': round(elapsed, 2),
+        'total_requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'error_rate': round(sum(errors.values()) / total, 4) if total else 0.0,
+        'routes': routes,
+    }
@@ -0,0 +1,185 @@
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.test import Client, override_settings
+
+from library_app.models import Book, BorrowTransaction, Member
+
+from .base import scratch_database, seed_catalog, seed_transactions
+
+DEFAULT_SIZES = (1_000, 10_000)
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baselines' / 'micro.json'
+
+ADMIN_SSID = 90000001
+
+
+# ==========================================
+# Benchmark Registry
+# ==========================================
+# แต่ละ case รับ context (ข้อมูลที่ seed แล้ว) และคืนฟังก์ชันที่จะถูกจับเวลา
+# sized=False หมายถึงไม่ขึ้นกับขนาดข้อมูล (รันเพียงครั้งเดียวที่ขนาดแรก)
+CASES = {}
+
+
+def benchmark(name, sized=True):
+    def register(setup):
+        CASES[name] = {'setup': setup, 'sized': sized}
+        return setup
+    return register
+
+
+def _admin_client():
+    client = Client()
+    session = client.session
+    session['member_id'] = ADMIN_SSID
+    session['is_admin'] = True
+    session.save()
+    return client
+
+
+def _member_client(ssid):
+    client = Client()
+    session = client.session
+    session['member_id'] = ssid
+    session['is_admin'] = False
+    session.save()
+    return client
+
+
+def _get(client, path, params=None):
+    def call():
+        response = client.get(path, params or {})
+        assert response.status_code == 200, f'{path} -> {response.status_code}'
+    return call
+
+
+@benchmark('member.check_password', sized=False)
+def _check_password(context):
+    member = Member.objects.get(ssid=ADMIN_SSID)
+    return lambda: member.check_password('admin123')
+
+
+@benchmark('borrow_transaction.save')
+def _borrow_save(context):
+    member = Member.objects.filter(is_admin=False).first()
+    book = Book.objects.first()
+    # ไม่ส่ง due_date เพื่อวัดค่า default ใน save() ด้วย
+    return lambda: BorrowTransaction(member=member, book=book).save()
+
+
+@benchmark('view.admin_dashboard')
+def _admin_dashboard(context):
+    return _get(_admin_client(), '/dashboard/')
+
+
+@benchmark('view.member_home.search')
+def _catalog_search(context):
+    return _get(_member_client(context['member_ssid']), '/member/home/', {'q': 'Book 1'})
+
+
+@benchmark('view.manage_books.list')
+def _manage_books(context):
+    return _get(_admin_client(), '/manage/')
+
+
+@benchmark('view.transaction_history.list')
+def _transaction_history(context):
+    return _get(_admin_client(), '/transaction/')
+
+
+# ==========================================
+# Runner
+# ==========================================
+def seed(size):
+    """ ขนาด N = หนังสือ N เล่ม, สมาชิก N/5 คน และประวัติการยืม 5N รายการ """
+    members = max(size // 5, 1)
+    seed_catalog(members=members, books=size)
+    seed_transactions(size * 5, members=members, books=size)
+    admin = Member(ssid=ADMIN_SSID, full_name='Bench Librarian', email='bench-admin@lib.com',
+                   phone_number='0800000000', is_admin=True)
+    admin.set_password('admin123')
+    admin.save()
+    return {'size': size, 'member_ssid': 10000001}
+
+
+def measure(func, repeat=5, warmup=1):
+    """ จับเวลาแต่ละรอบ (ms) หลัง warmup แล้วสรุปเป็น min / median / mean """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'repeat': repeat,
+    }
+
+
+def run_cases(context, names=None, repeat=5, include_unsized=True):
+    """ รันทุก case บนฐานข้อมูลปัจจุบันที่ seed แล้ว คืนค่า {"<case>@<size>": stats} """
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, case in CASES.items():
+            if names and name not in names:
+                continue
+            if not case['sized'] and not include_unsized:
+                continue
+            key = f"{name}@{context['size']}" if case['sized'] else name
+            results[key] = measure(case['setup'](context), repeat=repeat)
+    return results
+
+
+def run(sizes=DEFAULT_SIZES, names=None, repeat=5):
+    """ รันชุด benchmark ทุกขนาดข้อมูล (ฐานข้อมูลชั่วคราวแยกต่อขนาด) """
+    results = {}
+    for index, size in enumerate(sizes):
+        with scratch_database():
+            context = seed(size)
+            results.update(run_cases(context, names=names, repeat=repeat, include_unsized=index == 0))
+    return {
+        'environment': {'python': platform.python_version(), 'machine': platform.machine(),
+                        'database_vendor': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1]},
+        'results': results,
+    }
+
+
+# ==========================================
+# Baselines & Regression Check
+# ==========================================
+def load_baseline(path=DEFAULT_BASELINE):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_baseline(report, path=DEFAULT_BASELINE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD, metric='median_ms'):
+    """
+    เทียบผลกับ baseline: case ที่ช้าลงเกิน threshold (เช่น 0.20 = 20%) ถือเป็น regression
+    คืนค่าเป็น list ของ dict เรียงตามอัตราที่ช้าลงมากที่สุด (case ที่ไม่มีใน baseline จะถูกข้าม)
+    """
+    regressions = []
+    previous = (baseline or {}).get('results', {})
+    for key, stats in report['results'].items():
+        if key not in previous or not previous[key].get(metric):
+            continue
+        change = stats[metric] / previous[key][metric] - 1
+        if change > threshold:
+            regressions.append({'case': key, 'baseline_ms': previous[key][metric],
+                                'current_ms': stats[metric], 'change': round(change, 3)})
+    return sorted(regressions, key=lambda item: item['change'], reverse=True)
@@ -0,0 +1,50 @@
+import tempfile
+
+import pandas as pd
+
+from library_app.models import BorrowTransaction
+from library_app.snapshot import Snapshot, write_snapshot
+
+from .base import peak_rss_mb, scratch_database, seed_catalog, seed_transactions, timer
+
+
+def run(rows=1_000_000, append=10_000):
+    """
+    เทียบการโหลดรายการยืมทั้งหมดเข้า pandas ผ่าน ORM (แบบ admin_dashboard) กับการเปิด snapshot
+    และวัดเวลาส่งออกครั้งแรก / ต่อท้ายแบบ incremental
+    """
+    with scratch_database(), tempfile.TemporaryDirectory(prefix='library-snapshot-') as path:
+        seed_catalog()
+        seed_transactions(rows)
+
+        with timer() as orm_elapsed:
+            frame = pd.DataFrame.from_records(
+                BorrowTransaction.objects.values_list('tx_id', 'book__category', 'start_date', 'status').iterator(),
+                columns=['tx_id', 'category', 'start', 'status'],
+            )
+            orm_counts = frame.groupby('category').size()
+        del frame
+
+        with timer() as export_elapsed:
+            write_snapshot(path, full=True)
+        seed_transactions(append, seed=7)
+        with timer() as append_elapsed:
+            stats = write_snapshot(path)
+
+        with timer() as open_elapsed:
+            snapshot = Snapshot(path)
+        with timer() as query_elapsed:
+            counts = snapshot.to_frame(['category']).groupby('category', observed=True).size()
+
+    return {
+        'rows': rows,
+        'orm_to_pandas_seconds': round(orm_elapsed(), 3),
+        'snapshot_export_seconds': round(export_elapsed(), 2),
+        'snapshot_append_seconds': round(append_elapsed(), 2),
+        'appended': stats['appended'],
+        'refreshed': stats['refreshed'],
+        'snapshot_open_ms': round(open_elapsed() * 1000, 3),
+        'snapshot_group_by_seconds': round(query_elapsed(), 3),
+        'same_result': int(counts.sum()) == int(orm_counts.sum()) + append,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
@@ -0,0 +1,120 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from library_app.sqlite import pragma_statements
+
+# โหมดเริ่มต้นของ Django (rollback journal, BEGIN แบบ DEFERRED) เทียบกับโปรไฟล์ production
+DEFAULT_MODE = {'begin': 'BEGIN', 'pragmas': {}}
+TUNED_MODE = {
+    'begin': 'BEGIN IMMEDIATE',
+    'pragmas': {
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000,
+        'cache_size': -64000, 'mmap_size': 256 * 1024 * 1024, 'temp_store': 'MEMORY',
+    },
+}
+
+SCHEMA = """
+CREATE TABLE book (book_id INTEGER PRIMARY KEY, status TEXT NOT NULL);
+CREATE TABLE tx (tx_id INTEGER PRIMARY KEY AUTOINCREMENT, book_id INTEGER NOT NULL, status TEXT NOT NULL, created REAL NOT NULL);
+CREATE INDEX tx_status ON tx (status);
+"""
+
+
+def _connect(path, mode):
+    # timeout=5 เท่ากับค่าเริ่มต้นที่ Django ส่งให้ sqlite3.connect
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    for statement in pragma_statements(mode['pragmas']):
+        conn.execute(statement)
+    return conn
+
+
+def _writer(path, mode, books, deadline, stats):
+    """ จำลองการยืม/คืนที่เคาน์เตอร์: อ่านสถานะหนังสือ -> อัปเดต -> เพิ่มรายการ ใน transaction เดียว """
+    conn = _connect(path, mode)
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        book_id = rng.randrange(books)
+        start = time.perf_counter()
+        try:
+            conn.execute(mode['begin'])
+            (status,) = conn.execute('SELECT status FROM book WHERE book_id = ?', (book_id,)).fetchone()
+            new_status = 'AVAILABLE' if status == 'BORROWED' else 'BORROWED'
+            conn.execute('UPDATE book SET status = ? WHERE book_id = ?', (new_status, book_id))
+            conn.execute('INSERT INTO tx (book_id, status, created) VALUES (?, ?, ?)',
+                         (book_id, 'ACTIVE' if new_status == 'BORROWED' else 'RETURNED', time.time()))
+            conn.execute('COMMIT')
+            stats['write_ms'].append((time.perf_counter() - start) * 1000)
+        except sqlite3.OperationalError:
+            stats['write_errors'] += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    conn.close()
+
+
+def _reader(path, mode, books, deadline, stats):
+    """ จำลองหน้า catalog / dashboard ที่อ่านอย่างเดียว """
+    conn = _connect(path, mode)
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.execute("SELECT COUNT(*) FROM tx WHERE status = 'ACTIVE'").fetchone()
+            conn.execute('SELECT status FROM book WHERE book_id = ?', (rng.randrange(books),)).fetchone()
+            stats['read_ms'].append((time.perf_counter() - start) * 1000)
+        except sqlite3.OperationalError:
+            stats['read_errors'] += 1
+    conn.close()
+
+
+def _summarize(samples):
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1], 3),
+        'p99_ms': round(ordered[int(len(ordered) * 0.99) - 1], 3),
+    }
+
+
+def run_mode(mode, writers=4, readers=8, seconds=5.0, books=10_000):
+    with tempfile.TemporaryDirectory(prefix='library-sqlite-bench-') as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.sqlite3')
+        setup = _connect(path, mode)
+        setup.executescript(SCHEMA)
+        setup.executemany('INSERT INTO book (book_id, status) VALUES (?, ?)', ((i, 'AVAILABLE') for i in range(books)))
+        setup.close()
+
+        stats = {'write_ms': [], 'read_ms': [], 'write_errors': 0, 'read_errors': 0}
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=_writer, args=(path, mode, books, deadline, stats)) for _ in range(writers)]
+        threads += [threading.Thread(target=_reader, args=(path, mode, books, deadline, stats)) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return {
+        'writes_per_second': round(len(stats['write_ms']) / seconds, 1),
+        'reads_per_second': round(len(stats['read_ms']) / seconds, 1),
+        'write_errors': stats['write_errors'],
+        'read_errors': stats['read_errors'],
+        'write_latency': _summarize(stats['write_ms']),
+        'read_latency': _summarize(stats['read_ms']),
+    }
+
+
+def run(writers=4, readers=8, seconds=5.0):
+    return {
+        'writers': writers,
+        'readers': readers,
+        'seconds': seconds,
+        'default': run_mode(DEFAULT_MODE, writers, readers, seconds),
+        'tuned': run_mode(TUNED_MODE, writers, readers, seconds),
+    }
@@ -0,0 +1,46 @@
+from django.db.models import Count, Q
+
+from .circulation import OPEN_STATUSES
+from .models import Book, BorrowTransaction, Branch
+
+# ==========================================
+# Branches (สาขาที่เคาน์เตอร์ให้บริการ)
+# ==========================================
+# สาขาของเคาน์เตอร์เก็บใน session: ตั้งจากสาขาประจำของบรรณารักษ์ตอนเข้าสู่ระบบ และเปลี่ยนได้จากเมนูด้านบน
+# หน้าจอเคาน์เตอร์ (หนังสือ, ประวัติ, Dashboard) query เฉพาะสาขานี้ผ่าน .in_branch() ค่าว่าง = ทุกสาขา
+
+SESSION_KEY = 'branch'
+
+
+def counter_branch(request):
+    return request.session.get(SESSION_KEY, '')
+
+
+def set_counter_branch(request, code):
+    request.session[SESSION_KEY] = code or ''
+
+
+def branch_context(request):
+    """ context processor: สาขาปัจจุบันและรายชื่อสาขาสำหรับเมนูเลือกสาขา (queryset จะ query เมื่อ template ใช้เท่านั้น) """
+    if not request.session.get('is_admin'):
+        return {}
+    return {'counter_branch': counter_branch(request), 'branches': Branch.objects.order_by('code')}
+
+
+def branch_counters():
+    """ ตัวเลขรายสาขาสำหรับ Dashboard: จำนวนหนังสือ / กำลังยืม / เลยกำหนด (GROUP BY ครั้งเดียวต่อตาราง) """
+    books = dict(Book.objects.order_by().values_list('branch').annotate(total=Count('pk')))
+    loans = {
+        row['branch']: row for row in
+        BorrowTransaction.objects.filter(status__in=OPEN_STATUSES).order_by().values('branch').annotate(
+            active=Count('pk', filter=Q(status='ACTIVE')), overdue=Count('pk', filter=Q(status='OVERDUE')),
+        )
+    }
+    return [
+        {
+            'code': branch.code, 'name': branch.name, 'books': books.get(branch.code, 0),
+            'active': loans.get(branch.code, {}).get('active', 0),
+            'overdue': loans.get(branch.code, {}).get('overdue', 0),
+        }
+        for branch in Branch.objects.order_by('code')
+    ]
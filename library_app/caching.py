@@ -0,0 +1,92 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from django.core.cache.utils import make_template_fragment_key
+
+# ==========================================
+# Versioned Fragment Cache
+# ==========================================
+# แต่ละชุดข้อมูลมี "version" เก็บใน cache: template ใช้ version เป็นส่วนหนึ่งของ key ของ {% cache %}
+# เมื่อข้อมูลเปลี่ยนก็แค่เปลี่ยน version -> fragment เก่าจะไม่ถูกใช้อีก (และหมดอายุไปเอง) ไม่ต้องไล่ลบทีละ key
+
+CATALOG = 'catalog'   # Book (grid หน้าสมาชิก, ตารางจัดการหนังสือ)
+MEMBERS = 'members'   # Member (ตารางจัดการสมาชิก)
+RECOMMENDATIONS = 'recommendations'   # BookNeighbors + CategoryPopularity ("ผู้อ่านยังยืม", หมวดหมู่มาแรง)
+
+
+def history(ssid):
+    """ ชื่อ version ของประวัติการยืมรายสมาชิก (หน้า My History) """
+    return f'history:{ssid}'
+
+
+def _version_key(name):
+    return f'fragment-version:{name}'
+
+
+def get_version(name):
+    version = cache.get(_version_key(name))
+    if version is None:
+        # ใช้เวลาปัจจุบันเป็นค่าเริ่มต้น ไม่ให้ชนกับ fragment ที่ค้างจากรอบก่อน (เช่น cache แบบไฟล์)
+        cache.add(_version_key(name), time.time_ns(), None)
+        version = cache.get(_version_key(name))
+    return version
+
+
+def bump_version(name):
+    cache.set(_version_key(name), time.time_ns(), None)
+
+
+def bump_version_on_commit(name):
+    """ เปลี่ยน version หลัง transaction ปัจจุบัน commit (นอก transaction = ทันที) ไม่ให้ถูกอ่านก่อนข้อมูลใหม่ """
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def bump_history(member_ids):
+    """ เปลี่ยน version ประวัติของสมาชิกหลายคนในคำสั่งเดียว (ใช้หลัง bulk update ที่ไม่มี signal) """
+    version = time.time_ns()
+    cache.set_many({_version_key(history(ssid)): version for ssid in set(member_ids)}, None)
+
+
+def bump_history_on_commit(member_ids):
+    """ bump_history หลัง transaction ปัจจุบัน commit (เหมือน bump_version_on_commit) """
+    member_ids = set(member_ids)
+    transaction.on_commit(lambda: bump_history(member_ids))
+
+
+def version_timestamp(version):
+    """ version เป็นเวลาที่เปลี่ยนล่าสุด (nanoseconds) จึงใช้เป็น Last-Modified ได้ """
+    return version / 1_000_000_000
+
+
+def fragment_context(*names):
+    """ ค่าที่ template ต้องใช้กับ {% cache fragment_timeout "<ชื่อ>" <name>_version ... %} """
+    context = {f'{name}_version': get_version(name) for name in names}
+    context['fragment_timeout'] = settings.FRAGMENT_CACHE_TIMEOUT
+    return context
+
+
+def fragments_cached(*fragments):
+    """ fragments: (ชื่อ, [ค่าที่ต่อท้ายใน {% cache %}]) -> True ถ้าทุก fragment อยู่ใน cache แล้ว """
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = cache
+    return all(fragment_cache.has_key(make_template_fragment_key(name, vary_on)) for name, vary_on in fragments)
+
+
+# ==========================================
+# Signal Receivers (เชื่อมใน LibraryAppConfig.ready)
+# ==========================================
+# post_save/post_delete เกิดก่อน commit: ถ้าเปลี่ยน version ทันที คำขออื่นจะ render ข้อมูลเก่าแล้วเก็บไว้ใต้ version ใหม่
+def bump_catalog_version(sender, **kwargs):
+    bump_version_on_commit(CATALOG)
+
+
+def bump_members_version(sender, **kwargs):
+    bump_version_on_commit(MEMBERS)
+
+
+def bump_history_version(sender, instance, **kwargs):
+    bump_history_on_commit([instance.member_id])
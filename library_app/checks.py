@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from django.core.checks import Tags, Warning, register
+
+# ==========================================
+# Static Assets (สร้างด้วย `python manage.py build_assets`)
+# ==========================================
+APP_DIR = Path(__file__).resolve().parent
+ASSETS_DIR = APP_DIR / 'assets'     # source (Tailwind input)
+STATIC_DIR = APP_DIR / 'static'     # output ที่ collectstatic เก็บไปใช้
+
+BUILT_ASSETS = (
+    'library_app/css/app.css',
+    'library_app/vendor/plotly.min.js',
+)
+
+
+@register(Tags.staticfiles)
+def check_built_assets(app_configs, **kwargs):
+    missing = [name for name in BUILT_ASSETS if not (STATIC_DIR / name).exists()]
+    if not missing:
+        return []
+    return [Warning(
+        f'Static assets have not been built: {", ".join(missing)}',
+        hint='Run "python manage.py build_assets" (pages are unstyled and charts do not render until then).',
+        id='library_app.W001',
+    )]
@@ -0,0 +1,187 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import jobs, journal, popularity
+from .caching import CATALOG, bump_history_on_commit, bump_version_on_commit
+from .fines import get_policy
+from .models import Book, BorrowTransaction
+from .recommendations import borrowed_books
+
+# สถานะที่ถือว่ายังไม่ได้คืน
+OPEN_STATUSES = ('ACTIVE', 'OVERDUE')
+
+
+def _to_decimal(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+class CheckoutError(Exception):
+    """ ยืมไม่ได้ (ข้อความเป็นภาษาไทยสำหรับแสดงผลที่เคาน์เตอร์) """
+
+
+def _schedule_projection():
+    # รอให้พ้น settle window ของ journal ก่อน และมีงานรออยู่ได้ครั้งละงานเดียว
+    jobs.enqueue('journal.project', key='journal.project',
+                 run_at=timezone.now() + timedelta(seconds=settings.JOURNAL_SETTLE_SECONDS))
+
+
+# ==========================================
+# Checkout (ยืมหนังสือ)
+# ==========================================
+def checkout(member, book, days=7, now=None):
+    """
+    สร้างรายการยืมและเปลี่ยนสถานะหนังสือเป็น BORROWED ภายใน transaction เดียว
+    พร้อมอัปเดตคะแนนความนิยม และส่งงานอัปเดตดัชนีแนะนำหนังสือ (co-borrow) เข้าคิว
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        book = Book.objects.select_for_update().get(pk=book.pk)
+        if book.status != 'AVAILABLE':
+            raise CheckoutError(f'❌ หนังสือ "{book.title}" ไม่พร้อมให้ยืม')
+        if BorrowTransaction.objects.filter(book=book, status__in=OPEN_STATUSES).exists():
+            raise CheckoutError(f'❌ หนังสือ "{book.title}" กำลังถูกยืมอยู่!')
+
+        previous_books = borrowed_books(member.pk)
+        tx = BorrowTransaction.objects.create(
+            member=member, book=book, branch_id=book.branch_id,
+            start_date=now, due_date=now + timedelta(days=days), status='ACTIVE',
+        )
+        book.status = 'BORROWED'
+        book.save()
+        journal.record([journal.event('CHECKOUT', tx.tx_id, member.pk, book.pk, now, due_date=tx.due_date.isoformat())])
+        popularity.record_checkout(book, now)
+        # งานที่ไม่ต้องเสร็จก่อนตอบเคาน์เตอร์: ย้ายไปทำใน worker (บันทึกคิวใน transaction เดียวกัน)
+        jobs.enqueue('recommendations.record_checkout',
+                     member_id=member.pk, book_id=book.pk, previous_books=sorted(previous_books))
+        _schedule_projection()
+    return tx
+
+
+# ==========================================
+# Returns (รับคืนรายการเดียว / หลายรายการ)
+# ==========================================
+def return_loan(tx, returned_at=None, policy=None):
+    """ รับคืนหนังสือ 1 รายการ คิดค่าปรับตาม FinePolicy และคืนสถานะหนังสือเป็น AVAILABLE """
+    policy = policy or get_policy()
+    returned_at = returned_at or timezone.now()
+
+    with transaction.atomic():
+        tx = BorrowTransaction.objects.select_for_update().select_related('book').get(pk=tx.pk)
+        if tx.status not in OPEN_STATUSES:
+            return tx
+
+        previous_status = tx.status
+        tx.returned_at = returned_at
+        tx.status = 'RETURNED'
+        tx.fine_amount = policy.fine_for(tx.due_date, returned_at, tx.book.category)
+        tx.book.status = 'AVAILABLE'
+        tx.book.save()
+        tx.save()
+        journal.record(journal.loan_events(tx, previous_status, returned_at))
+        _schedule_projection()
+    return tx
+
+
+def bulk_return(tx_ids, returned_at=None, policy=None):
+    """
+    รับคืนหลายรายการพร้อมกัน: คิดค่าปรับทั้งชุดด้วย fines_for() ครั้งเดียว
+    แล้วบันทึกด้วย bulk_update + UPDATE หนังสือในคำสั่งเดียว คืนค่าเป็นรายการที่ถูกรับคืน
+    """
+    policy = policy or get_policy()
+    returned_at = returned_at or timezone.now()
+
+    with transaction.atomic():
+        txs = list(
+            BorrowTransaction.objects.select_for_update()
+            .filter(tx_id__in=tx_ids, status__in=OPEN_STATUSES)
+            .select_related('book')
+        )
+        if not txs:
+            return []
+
+        fines = policy.fines_for([tx.due_date for tx in txs], returned_at, [tx.book.category for tx in txs])
+        events = []
+        for tx, fine in zip(txs, fines):
+            previous_status = tx.status
+            tx.returned_at = returned_at
+            tx.status = 'RETURNED'
+            tx.fine_amount = _to_decimal(fine)
+            events += journal.loan_events(tx, previous_status, returned_at)
+
+        BorrowTransaction.objects.bulk_update(txs, ['returned_at', 'status', 'fine_amount'])
+        Book.objects.filter(book_id__in=[tx.book_id for tx in txs]).update(status='AVAILABLE', updated_at=returned_at)
+        journal.record(events)
+        _schedule_projection()
+    # bulk_update / update() ไม่ส่ง post_save จึงต้องเปลี่ยน version ของแคตตาล็อกและประวัติเอง
+    # (หลัง commit: ผู้เรียกอาจครอบด้วย transaction อีกชั้น เช่น run_once)
+    bump_version_on_commit(CATALOG)
+    bump_history_on_commit([tx.member_id for tx in txs])
+    return txs
+
+
+# ==========================================
+# Overdue Sweep & Reporting
+# ==========================================
+def sweep_overdue(now=None, batch_size=2000, policy=None):
+    """
+    เปลี่ยนรายการที่เลยกำหนดคืนเป็น OVERDUE และอัปเดตค่าปรับสะสม ณ เวลานี้ทีละ batch
+    คืนค่าเป็นจำนวนรายการที่ถูกอัปเดต
+    """
+    policy = policy or get_policy()
+    now = now or timezone.now()
+    # UPDATE ใช้ parameter เท่ากับจำนวนรายการใน batch (MSSQL รับได้ 2100, SQLite 999)
+    batch_size = min(batch_size, (connection.features.max_query_params or batch_size) - 10)
+    updated = 0
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            # ล็อกแถวไว้จนจบ batch: สถานะที่อ่านได้ต้องตรงกับที่ UPDATE และบันทึกลง journal
+            rows = list(
+                BorrowTransaction.objects.select_for_update()
+                .filter(status__in=OPEN_STATUSES, due_date__lt=now, tx_id__gt=last_id)
+                .order_by('tx_id')
+                .values_list('tx_id', 'due_date', 'book__category', 'member_id', 'book_id', 'status')[:batch_size]
+            )
+            if not rows:
+                return updated
+
+            tx_ids, due_dates, categories, member_ids, book_ids, statuses = zip(*rows)
+            fines = policy.fines_for(due_dates, now, categories)
+            # ค่าปรับมีไม่กี่ค่า (ตามจำนวนวันที่เลยกำหนด) จึง UPDATE ครั้งละค่าปรับ แทน CASE ที่ยาวตามขนาด batch
+            tx_ids_by_fine = defaultdict(list)
+            for tx_id, fine in zip(tx_ids, fines):
+                tx_ids_by_fine[_to_decimal(fine)].append(tx_id)
+            # กรองสถานะซ้ำใน UPDATE เพื่อไม่ให้ทับรายการที่เพิ่งถูกรับคืนระหว่าง sweep
+            for fine, fine_tx_ids in tx_ids_by_fine.items():
+                BorrowTransaction.objects.filter(tx_id__in=fine_tx_ids, status__in=OPEN_STATUSES).update(
+                    status='OVERDUE', fine_amount=fine,
+                )
+            journal.record([
+                journal.event('STATUS_CHANGE', tx_id, member_id, book_id, now, to='OVERDUE')
+                for tx_id, member_id, book_id, status in zip(tx_ids, member_ids, book_ids, statuses)
+                if status == 'ACTIVE'
+            ])
+            _schedule_projection()
+        bump_history_on_commit(member_ids)
+        updated += len(rows)
+        last_id = tx_ids[-1]
+
+
+def accrued_fines(branch=''):
+    """
+    ยอดค่าปรับสะสมของรายการที่เลยกำหนดและยังไม่คืน ณ sweep ล่าสุด เฉพาะสาขา หรือทุกสาขาถ้า branch ว่าง
+    ใช้ fine_amount ที่ sweep_overdue บันทึกไว้ (รวมในฐานข้อมูล ไม่ต้องคำนวณใหม่ทุกครั้งที่เปิด dashboard)
+    """
+    total = (
+        BorrowTransaction.objects.in_branch(branch).filter(status='OVERDUE')
+        .aggregate(total=Sum('fine_amount'))['total']
+    )
+    return _to_decimal(total or 0)
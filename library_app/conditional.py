@@ -0,0 +1,98 @@
+import hashlib
+from functools import wraps
+
+from django.contrib import messages
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+from .branches import counter_branch
+from .caching import CATALOG, MEMBERS, RECOMMENDATIONS, get_version, history, version_timestamp
+from .models import BorrowTransaction
+
+
+# ==========================================
+# Conditional GET (ETag / Last-Modified)
+# ==========================================
+# validator ของแต่ละหน้าคืนค่า (ส่วนประกอบของ ETag, Last-Modified เป็น epoch วินาที) หรือ None ถ้าไม่รองรับ
+# ต้องถูกกว่าการ render หน้าเต็มมาก (อ่าน version จาก cache หรือ aggregate เล็ก ๆ เท่านั้น)
+
+def _has_pending_messages(request):
+    # len() โหลดข้อความมาดูโดยไม่ mark ว่าใช้แล้ว ข้อความยังแสดงในหน้าถัดไปตามปกติ
+    return len(messages.get_messages(request)) > 0
+
+
+def _make_etag(parts):
+    return quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def conditional_page(validator):
+    """
+    ใส่ ETag / Last-Modified ให้หน้า GET และตอบ 304 โดยไม่เรียก view (ไม่รัน queryset หลัก)
+    เมื่อ browser ส่ง If-None-Match / If-Modified-Since ที่ยังตรงกับข้อมูลปัจจุบัน
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            state = None
+            if request.method in ('GET', 'HEAD') and not _has_pending_messages(request):
+                state = validator(request, *args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+
+            parts, last_modified = state
+            etag = _make_etag(parts)
+            response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.headers.setdefault('ETag', etag)
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+            # หน้าเฉพาะผู้ใช้: ให้ browser เก็บได้แต่ต้องถามทุกครั้ง และห้าม proxy ใช้ร่วมกัน
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+# ---------- Validators ----------
+def catalog_state(request):
+    """
+    member_home: แคตตาล็อก + ข้อมูลสมาชิกที่แสดงใน header + ประวัติการยืม + หนังสือแนะนำ/หมวดหมู่มาแรง
+    + คำค้นหา/การเรียงลำดับ
+    """
+    member_id = request.session.get('member_id')
+    if not member_id:
+        return None
+    # history: แผง "ผู้อ่านยังยืม" อิงหนังสือเล่มล่าสุดของสมาชิก ส่วนเนื้อหาของแผงมาจาก job ที่คำนวณแยก (recommendations)
+    catalog, members, loans = get_version(CATALOG), get_version(MEMBERS), get_version(history(member_id))
+    recommendations = get_version(RECOMMENDATIONS)
+    parts = ('member_home', catalog, members, loans, recommendations, member_id,
+             request.GET.get('q', ''), request.GET.get('sort', ''))
+    return parts, version_timestamp(max(catalog, members, loans, recommendations))
+
+
+def book_table_state(request):
+    """ manage_books: ตารางหนังสือของสาขาเคาน์เตอร์ตามคำค้นหา """
+    if not request.session.get('is_admin'):
+        return None
+    catalog = get_version(CATALOG)
+    return ('manage_books', catalog, counter_branch(request), request.GET.get('q', '')), version_timestamp(catalog)
+
+
+def history_state(request):
+    """ my_history: version ประวัติของสมาชิก + เวลาแก้ไขล่าสุดของหนังสือในรายการ (เช่น ชื่อหนังสือ) """
+    member_id = request.session.get('member_id')
+    if not member_id:
+        return None
+    version = get_version(history(member_id))
+    books_changed = (
+        BorrowTransaction.objects.filter(member_id=member_id)
+        .aggregate(latest=Max('book__updated_at'))['latest']
+    )
+    last_modified = version_timestamp(version)
+    if books_changed is not None:
+        last_modified = max(last_modified, books_changed.timestamp())
+    parts = ('my_history', version, books_changed, member_id, request.GET.get('tab', 'active'))
+    return parts, last_modified
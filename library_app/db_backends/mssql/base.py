@@ -0,0 +1,7 @@
+from mssql import base
+
+from library_app.db_backends.pool import PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    pass
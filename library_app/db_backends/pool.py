@@ -0,0 +1,51 @@
+import time
+
+from django.core.signals import request_started
+from django.db import connections
+
+from library_app import metrics
+
+
+class PooledConnectionMixin:
+    """
+    ชั้นเสริมของ DatabaseWrapper สำหรับ backend ที่เชื่อมต่อผ่านเครือข่าย (MariaDB/MSSQL)
+
+    Django เก็บการเชื่อมต่อแบบถาวรไว้หนึ่งเส้นต่อ thread ของ worker ตาม CONN_MAX_AGE (อายุสูงสุดของการเชื่อมต่อ)
+    และตรวจสุขภาพก่อนใช้ซ้ำเมื่อเปิด CONN_HEALTH_CHECKS คลาสนี้เพิ่มตัวนับให้เห็นขนาด pool จริง,
+    อัตราการใช้ซ้ำ และเวลาที่เสียไปกับการ handshake ของแต่ละ alias
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        metrics.observe('db.connect_seconds', time.perf_counter() - start, alias=self.alias)
+        metrics.incr('db.connections_opened', alias=self.alias)
+        metrics.gauge_add('db.pool_size', 1, alias=self.alias)
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            metrics.incr('db.connections_closed', alias=self.alias)
+            metrics.gauge_add('db.pool_size', -1, alias=self.alias)
+
+    def close_if_health_check_failed(self):
+        had_connection = self.connection is not None
+        super().close_if_health_check_failed()
+        if had_connection and self.connection is None:
+            metrics.incr('db.health_check_failures', alias=self.alias)
+
+
+def record_reuse(wrappers):
+    """ นับการเชื่อมต่อที่ยังเปิดอยู่ตอนเริ่ม request (= ถูกใช้ซ้ำจาก request ก่อน) """
+    for wrapper in wrappers:
+        if isinstance(wrapper, PooledConnectionMixin) and wrapper.connection is not None:
+            metrics.incr('db.connections_reused', alias=wrapper.alias)
+
+
+def _count_reused_connections(**kwargs):
+    # close_old_connections ทำงานทั้งตอนเริ่มและจบ request จึงนับเฉพาะตอนเริ่ม (receiver นี้ต่อหลังของ Django)
+    record_reuse(connections.all(initialized_only=True))
+
+
+request_started.connect(_count_reused_connections)
@@ -0,0 +1,285 @@
+import statistics
+import time
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, NotSupportedError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Book, BorrowTransaction, Job
+from .popularity import CATALOG_SORTS
+from .reminders import pending_reminders
+
+# ==========================================
+# Database Diagnostics (ใช้โดย `manage.py checkdb`)
+# ==========================================
+# ทุกฟังก์ชันรับ alias ของฐานข้อมูลและคืนค่าเป็น dict/list ที่แปลงเป็น JSON ได้ (ใช้วางแผน capacity)
+# นอกจาก run_benchmark() ทุกอย่างอ่านอย่างเดียว
+
+SCRATCH_TABLE = 'library_diag_scratch'
+
+# ขนาดตาราง (data + index, ไบต์) แยกตาม vendor; SQLite ต้องมี dbstat (มีใน Python ทั่วไป)
+SIZE_QUERIES = {
+    'sqlite': (
+        "SELECT COALESCE(m.tbl_name, s.name), SUM(s.pgsize) FROM dbstat s "
+        "LEFT JOIN sqlite_master m ON m.name = s.name GROUP BY 1"
+    ),
+    'mysql': (
+        "SELECT table_name, data_length + index_length FROM information_schema.tables "
+        "WHERE table_schema = DATABASE()"
+    ),
+    'microsoft': (
+        "SELECT t.name, SUM(s.used_page_count) * 8192 FROM sys.dm_db_partition_stats s "
+        "JOIN sys.tables t ON t.object_id = s.object_id GROUP BY t.name"
+    ),
+    'postgresql': "SELECT relname, pg_total_relation_size(oid) FROM pg_class WHERE relkind = 'r'",
+}
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'max_ms': round(ordered[-1], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+    }
+
+
+def _timed(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def connection_info(alias=DEFAULT_DB_ALIAS):
+    conn = connections[alias]
+    conn.ensure_connection()
+    try:
+        version = '.'.join(map(str, conn.get_database_version()))
+    except NotImplementedError:
+        version = ''
+    return {
+        'alias': alias,
+        'vendor': conn.vendor,
+        'engine': conn.settings_dict['ENGINE'],
+        'name': str(conn.settings_dict['NAME']),
+        'host': conn.settings_dict.get('HOST') or '',
+        'server_version': version,
+    }
+
+
+def ping(alias=DEFAULT_DB_ALIAS, iterations=50):
+    """ latency ของการเปิดการเชื่อมต่อใหม่ และ round trip ของ SELECT 1 """
+    conn = connections[alias]
+    conn.close()
+    start = time.perf_counter()
+    conn.ensure_connection()
+    connect_ms = (time.perf_counter() - start) * 1000
+
+    with conn.cursor() as cursor:
+        def round_trip():
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        samples = _timed(round_trip, iterations)
+    return {'connect_ms': round(connect_ms, 3), **_summary(samples)}
+
+
+# ==========================================
+# ตารางและ Index
+# ==========================================
+def app_models():
+    return [model for model in apps.get_app_config('library_app').get_models() if model._meta.managed]
+
+
+def table_stats(alias=DEFAULT_DB_ALIAS):
+    """ จำนวนแถวและขนาด (ถ้า vendor รองรับ) ของทุกตารางของแอป; ตารางที่ยังไม่ migrate ได้ rows=None """
+    conn = connections[alias]
+    with conn.cursor() as cursor:
+        existing = set(conn.introspection.table_names(cursor))
+        sizes = {}
+        if conn.vendor in SIZE_QUERIES:
+            try:
+                with transaction.atomic(using=alias):
+                    cursor.execute(SIZE_QUERIES[conn.vendor])
+                    sizes = {name: int(size or 0) for name, size in cursor.fetchall()}
+            except Exception:
+                # ไม่มีสิทธิ์อ่าน catalog หรือ SQLite ที่คอมไพล์โดยไม่มี dbstat
+                sizes = {}
+
+    stats = []
+    for model in app_models():
+        table = model._meta.db_table
+        present = table in existing
+        stats.append({
+            'table': table,
+            'model': model.__name__,
+            'rows': model._base_manager.using(alias).count() if present else None,
+            'bytes': sizes.get(table) if present else None,
+        })
+    return stats
+
+
+def expected_indexes(model):
+    """ index ที่ model ประกาศไว้: Meta.indexes, unique_together/UniqueConstraint และคอลัมน์ FK / db_index """
+    meta = model._meta
+    column = lambda name: meta.get_field(name.lstrip('-')).column  # noqa: E731
+    expected = [(index.name, tuple(column(f) for f in index.fields)) for index in meta.indexes if index.fields]
+    expected += [
+        (constraint.name, tuple(column(f) for f in constraint.fields))
+        for constraint in meta.constraints if getattr(constraint, 'fields', None)
+    ]
+    expected += [(f'unique_together:{",".join(fields)}', tuple(column(f) for f in fields))
+                 for fields in meta.unique_together]
+    expected += [
+        (f'{field.name} (db_index)', (field.column,))
+        for field in meta.local_fields if (field.db_index or field.unique) and not field.primary_key
+    ]
+    return expected
+
+
+def missing_indexes(alias=DEFAULT_DB_ALIAS):
+    """
+    เทียบกับ index ที่มีจริงในฐานข้อมูล: ถือว่ามีแล้วถ้ามี index/unique/PK ใดที่คอลัมน์นำหน้าตรงกัน
+    (ตรวจตามคอลัมน์ ไม่ใช่ชื่อ เพราะบาง backend ตั้งชื่อ index เอง)
+    """
+    conn = connections[alias]
+    missing = []
+    with conn.cursor() as cursor:
+        existing_tables = set(conn.introspection.table_names(cursor))
+        for model in app_models():
+            table = model._meta.db_table
+            if table not in existing_tables:
+                continue
+            constraints = conn.introspection.get_constraints(cursor, table).values()
+            available = [
+                tuple(c['columns']) for c in constraints
+                if c['columns'] and (c['index'] or c['unique'] or c['primary_key'])
+            ]
+            for name, columns in expected_indexes(model):
+                if not any(found[:len(columns)] == columns for found in available):
+                    missing.append({'table': table, 'index': name, 'columns': list(columns)})
+    return missing
+
+
+# ==========================================
+# EXPLAIN ของ query หลักในแต่ละหน้า
+# ==========================================
+def key_queries():
+    """ query เดียวกับที่ view ใช้ (ค่าพารามิเตอร์เป็นตัวอย่าง) """
+    now = timezone.now()
+    return {
+        'member_home.search': Book.objects.filter(Q(title__icontains='data') | Q(category__icontains='data'))
+                                          .order_by(*CATALOG_SORTS['']),
+        'member_home.trending': Book.objects.order_by(*CATALOG_SORTS['trending'])[:24],
+        'my_history.active': BorrowTransaction.objects.filter(member_id=10000001)
+                                              .exclude(status='RETURNED').order_by('due_date'),
+        'transaction_history': BorrowTransaction.objects.select_related('member', 'book')
+                                                .filter(status='OVERDUE').order_by('-start_date')[:50],
+        'admin_dashboard.overdue': BorrowTransaction.objects.filter(status='OVERDUE')
+                                                    .select_related('member', 'book').order_by('due_date'),
+        'sweep_overdue': BorrowTransaction.objects.filter(status='ACTIVE', due_date__lt=now),
+        'send_reminders': pending_reminders(now),
+        'runjobs.claim': Job.objects.filter(status='QUEUED', run_at__lte=now)
+                                    .order_by('-priority', 'run_at', 'id')[:4],
+    }
+
+
+def explain(alias=DEFAULT_DB_ALIAS):
+    plans = {}
+    for name, queryset in key_queries().items():
+        try:
+            plans[name] = queryset.using(alias).explain()
+        except NotSupportedError as error:
+            plans[name] = f'(EXPLAIN not supported: {error})'
+    return plans
+
+
+# ==========================================
+# Read/Write Micro-benchmark (ตารางชั่วคราว SCRATCH_TABLE ลบทิ้งเมื่อจบ)
+# ==========================================
+def run_benchmark(alias=DEFAULT_DB_ALIAS, iterations=200, batch_size=1000):
+    """
+    วัด latency ของ INSERT / UPDATE แบบ commit ทีละแถว, SELECT ตาม PK และ INSERT แบบ batch ใน transaction เดียว
+    ใช้ SQL ตรง ๆ บนตารางแยก จึงไม่ยุ่งกับข้อมูลจริง, signal หรือ cache
+    """
+    conn = connections[alias]
+    qn = conn.ops.quote_name
+    table = qn(SCRATCH_TABLE)
+    results = {}
+
+    with conn.cursor() as cursor:
+        if SCRATCH_TABLE in conn.introspection.table_names(cursor):
+            cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(
+            f'CREATE TABLE {table} ({qn("id")} INTEGER NOT NULL PRIMARY KEY, '
+            f'{qn("value")} INTEGER NOT NULL, {qn("note")} VARCHAR(64) NOT NULL)'
+        )
+        try:
+            ids = iter(range(1, iterations + 1))
+            results['insert_commit'] = _summary(_timed(
+                lambda: _autocommit(alias, cursor, f'INSERT INTO {table} VALUES (%s, %s, %s)',
+                                    [next(ids), 0, 'diagnostics']),
+                iterations,
+            ))
+            ids = iter(range(1, iterations + 1))
+            results['select_pk'] = _summary(_timed(
+                lambda: (cursor.execute(f'SELECT {qn("value")} FROM {table} WHERE {qn("id")} = %s', [next(ids)]),
+                         cursor.fetchone()),
+                iterations,
+            ))
+            ids = iter(range(1, iterations + 1))
+            results['update_commit'] = _summary(_timed(
+                lambda: _autocommit(alias, cursor, f'UPDATE {table} SET {qn("value")} = {qn("value")} + 1 '
+                                                   f'WHERE {qn("id")} = %s', [next(ids)]),
+                iterations,
+            ))
+
+            rows = [(iterations + 1 + i, i, 'batch') for i in range(batch_size)]
+            start = time.perf_counter()
+            with transaction.atomic(using=alias):
+                cursor.executemany(f'INSERT INTO {table} VALUES (%s, %s, %s)', rows)
+            seconds = time.perf_counter() - start
+            results['insert_batch'] = {
+                'rows': batch_size, 'seconds': round(seconds, 4),
+                'rows_per_second': round(batch_size / seconds) if seconds else None,
+            }
+
+            start = time.perf_counter()
+            cursor.execute(f'SELECT COUNT(*), SUM({qn("value")}) FROM {table}')
+            cursor.fetchone()
+            results['scan_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        finally:
+            cursor.execute(f'DROP TABLE {table}')
+
+    for name in ('insert_commit', 'select_pk', 'update_commit'):
+        mean = results[name]['mean_ms']
+        results[name]['ops_per_second'] = round(1000 / mean) if mean else None
+    return results
+
+
+def _autocommit(alias, cursor, sql, params):
+    # transaction ละ 1 แถว เพื่อให้เวลาที่วัดรวมการ commit (fsync) เหมือนการยืม/คืนหนึ่งครั้ง
+    with transaction.atomic(using=alias):
+        cursor.execute(sql, params)
+
+
+def report(alias=DEFAULT_DB_ALIAS, ping_iterations=50, bench_iterations=200, batch_size=1000,
+           include_explain=True, include_benchmark=True):
+    result = {
+        'generated_at': timezone.now().isoformat(),
+        'connection': connection_info(alias),
+        'ping': ping(alias, ping_iterations),
+        'tables': table_stats(alias),
+        'missing_indexes': missing_indexes(alias),
+    }
+    if include_explain:
+        result['explain'] = explain(alias)
+    if include_benchmark:
+        result['benchmark'] = run_benchmark(alias, bench_iterations, batch_size)
+    return result
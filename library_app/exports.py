@@ -0,0 +1,91 @@
+import csv
+import json
+from itertools import islice
+
+from django.db.models import Q
+
+from .archive import filter_archive
+from .models import ArchivedTransaction, Book, BorrowTransaction, Member
+
+EXPORT_HEADER = ('tx_id', 'ssid', 'member_name', 'book_id', 'book_title',
+                 'start_date', 'due_date', 'returned_at', 'fine_amount', 'status', 'branch')
+
+# คอลัมน์ที่ดึงจากตารางหลัก (join กับ Member/Book ในคิวรีเดียว)
+HOT_COLUMNS = ('tx_id', 'member__ssid', 'member__full_name', 'book__book_id', 'book__title',
+               'start_date', 'due_date', 'returned_at', 'fine_amount', 'status', 'branch_id')
+
+# ตาราง archive อาจอยู่คนละฐานข้อมูล จึงดึงชื่อสมาชิก/หนังสือแยกทีละ chunk
+ARCHIVE_COLUMNS = ('tx_id', 'member_id', 'book_id', 'start_date', 'due_date', 'returned_at', 'fine_amount', 'status',
+                   'branch_id')
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def filter_transactions(txs, query='', status_filter=''):
+    """ ตัวกรอง q/status ชุดเดียวกับหน้า transaction_history """
+    if query:
+        txs = txs.filter(Q(member__ssid__icontains=query) | Q(book__book_id__icontains=query) | Q(book__title__icontains=query))
+    if status_filter:
+        txs = txs.filter(status=status_filter)
+    return txs
+
+
+def _archive_rows(query, status_filter, chunk_size, branch=''):
+    archived = filter_archive(ArchivedTransaction.objects.in_branch(branch), query, status_filter)
+    rows = archived.order_by('tx_id').values_list(*ARCHIVE_COLUMNS).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        names = dict(Member.objects.filter(ssid__in={r[1] for r in chunk}).values_list('ssid', 'full_name'))
+        titles = dict(Book.objects.filter(book_id__in={r[2] for r in chunk}).values_list('book_id', 'title'))
+        for tx_id, ssid, book_id, *rest in chunk:
+            yield (tx_id, ssid, names.get(ssid, ''), book_id, titles.get(book_id, ''), *rest)
+
+
+def export_rows(query='', status_filter='', include_archive=False, chunk_size=DEFAULT_CHUNK_SIZE, branch=''):
+    """
+    คืนค่า generator ของ tuple ตามลำดับ EXPORT_HEADER เรียงตาม tx_id
+    ใช้ .iterator() จึงไม่โหลดทั้งตารางเข้าหน่วยความจำ
+    """
+    if include_archive:
+        yield from _archive_rows(query, status_filter, chunk_size, branch)
+
+    hot = filter_transactions(BorrowTransaction.objects.in_branch(branch), query, status_filter)
+    yield from hot.order_by('tx_id').values_list(*HOT_COLUMNS).iterator(chunk_size=chunk_size)
+
+
+def _serialize(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class _Echo:
+    """ pseudo-buffer สำหรับ csv.writer: คืนค่าบรรทัดที่เขียนแทนการเก็บไว้ """
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, header=EXPORT_HEADER):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_serialize(value) for value in row])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        record = dict(zip(EXPORT_HEADER, row))
+        for key in ('start_date', 'due_date', 'returned_at', 'fine_amount'):
+            record[key] = _serialize(record[key]) or None
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson; charset=utf-8'),
+}
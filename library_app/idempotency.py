@@ -0,0 +1,81 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+# ==========================================
+# Idempotency Keys (ยืม-คืนที่ถูกส่งซ้ำได้ผลเดิม)
+# ==========================================
+# client ส่ง key เดิมเมื่อส่งคำขอซ้ำ (ฟอร์มเคาน์เตอร์: hidden field, เครื่องสแกน: header Idempotency-Key)
+# แถวของ key ถูกสร้างใน transaction เดียวกับรายการยืม-คืน: ถ้ารายการ rollback แถวก็หายไปด้วย (ส่งใหม่ได้)
+# และคำขอซ้ำที่มาพร้อมกันจะรอจน transaction แรก commit แล้วได้ผลที่บันทึกไว้แทนการทำรายการซ้ำ
+
+KEY_MAX_LENGTH = 100
+
+
+class IdempotencyError(Exception):
+    """ ใช้ key นี้ไม่ได้ (ข้อความเป็นภาษาไทยสำหรับแสดงผล) """
+
+
+def request_hash(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _replay(record, fingerprint):
+    if record.request_hash != fingerprint:
+        raise IdempotencyError('⚠️ รหัสคำขอนี้ถูกใช้กับรายการอื่นไปแล้ว')
+    if record.status_code == 0:
+        raise IdempotencyError('⏳ คำขอเดียวกันกำลังทำรายการอยู่')
+    return record.status_code, record.response, True
+
+
+def run_once(scope, key, fingerprint, action, now=None):
+    """
+    ทำ action() ครั้งเดียวต่อ key ภายใน scope (ผู้ส่ง) action คืนค่า (status_code, body ที่แปลงเป็น JSON ได้)
+    คืนค่า (status_code, body, replayed) ถ้าไม่มี key จะทำ action() ทุกครั้งตามเดิม
+    """
+    if not key:
+        return (*action(), False)
+    if len(key) > KEY_MAX_LENGTH:
+        raise IdempotencyError(f'⚠️ รหัสคำขอยาวเกิน {KEY_MAX_LENGTH} ตัวอักษร')
+
+    now = now or timezone.now()
+    full_key = f'{scope}:{key}'
+    record = IdempotencyKey.objects.filter(key=full_key).first()
+    if record is not None:
+        if record.expires_at > now:
+            return _replay(record, fingerprint)
+        record.delete()
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    key=full_key, request_hash=fingerprint,
+                    expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+                )
+        except IntegrityError:
+            # คำขอเดียวกันอีกรายการจอง key ไปก่อน (ฐานข้อมูลให้รอจนรายการนั้น commit แล้ว)
+            return _replay(IdempotencyKey.objects.get(key=full_key), fingerprint)
+
+        record.status_code, record.response = action()
+        record.save(update_fields=['status_code', 'response'])
+    return record.status_code, record.response, False
+
+
+def purge_expired(batch_size=None, now=None):
+    """ ลบ key ที่หมดอายุทีละชุด (ชุดละ transaction สั้น ๆ ไม่ล็อกตารางนาน) คืนค่าเป็นจำนวนที่ลบ """
+    batch_size = batch_size or settings.IDEMPOTENCY_PURGE_BATCH_SIZE
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        keys = list(IdempotencyKey.objects.filter(expires_at__lt=now).values_list('key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(key__in=keys).delete()[0]
@@ -0,0 +1,184 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# Background Job Queue (เก็บในฐานข้อมูลหลัก)
+# ==========================================
+# view / circulation เรียก enqueue() ภายใน transaction เดิม งานจึงถูกบันทึกพร้อมข้อมูล (rollback ก็หายไปด้วย)
+# worker (`manage.py runjobs`) ดึงงานตาม priority แล้วทำใน thread pool พร้อม retry แบบ exponential backoff
+# JOBS_EAGER=True (ค่าเริ่มต้นตอนพัฒนา/ทดสอบ) ทำงานทันทีหลัง transaction ของผู้เรียก commit โดยไม่ต้องเปิด worker
+
+TASKS = {}
+
+
+def task(name, priority=0, max_attempts=3):
+    """ ลงทะเบียนฟังก์ชันเป็นงานเบื้องหลัง (arguments ต้องเป็น keyword ที่แปลงเป็น JSON ได้) """
+    def decorator(func):
+        func.job_options = {'priority': priority, 'max_attempts': max_attempts}
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, key='', priority=None, run_at=None, **kwargs):
+    """
+    เพิ่มงานเข้าคิว คืนค่าเป็น Job (หรือ None เมื่อทำแบบ eager / มีงาน key เดียวกันรออยู่แล้ว)
+    """
+    func = TASKS[name]
+    if settings.JOBS_EAGER:
+        # ทำหลัง commit เหมือน worker: งานต้องเห็นข้อมูลที่ผู้เรียกเพิ่งบันทึก (rollback ก็ไม่ทำ)
+        transaction.on_commit(lambda: func(**kwargs))
+        return None
+    if key and Job.objects.filter(key=key, status='QUEUED').exists():
+        metrics.incr('jobs_deduplicated', job=name)
+        return None
+
+    options = func.job_options
+    job = Job.objects.create(
+        name=name, kwargs=kwargs, key=key,
+        priority=options['priority'] if priority is None else priority,
+        max_attempts=options['max_attempts'], run_at=run_at or timezone.now(),
+    )
+    metrics.incr('jobs_enqueued', job=name)
+    return job
+
+
+def backoff(attempts):
+    """ เวลารอก่อนลองใหม่ (วินาที): base * 2^(attempts-1) ไม่เกิน JOBS_RETRY_MAX_SECONDS """
+    return min(settings.JOBS_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_SECONDS)
+
+
+# ==========================================
+# Worker
+# ==========================================
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def requeue_stale(now=None):
+    """ คืนงานที่ RUNNING นานเกิน JOBS_LEASE_SECONDS (worker ตายระหว่างทำ) กลับเข้าคิว """
+    now = now or timezone.now()
+    return Job.objects.filter(
+        status='RUNNING', locked_at__lt=now - timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+    ).update(status='QUEUED', locked_by='', locked_at=None)
+
+
+def claim(limit, now=None):
+    """
+    จองงานที่ถึงเวลาแล้วสูงสุด limit งาน: เลือก id แล้ว UPDATE แบบมีเงื่อนไข status='QUEUED'
+    ใส่ token ของรอบนี้ไว้ใน locked_by จึงไม่มีงานใดถูก worker สองตัวจองซ้ำ (ใช้ได้ทุก backend รวม SQLite)
+    """
+    now = now or timezone.now()
+    # token ยาวคงที่ 32 ตัวอักษร (hostname ยาวได้ไม่จำกัด จึงไม่ใส่ใน locked_by ซึ่งยาวได้ 64) ส่วน worker_id อยู่ใน log
+    token = uuid.uuid4().hex
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    # SQLite: ไม่เปิด transaction ครอบ SELECT + UPDATE (ถ้าไม่ใช่ BEGIN IMMEDIATE จะ deadlock ตอนอัปเกรด lock)
+    with transaction.atomic() if skip_locked else nullcontext():
+        queued = Job.objects.filter(status='QUEUED', run_at__lte=now)
+        if skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        ids = list(queued.order_by('-priority', 'run_at', 'id').values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids, status='QUEUED').update(status='RUNNING', locked_by=token, locked_at=now)
+    logger.debug('Worker %s claimed %d job(s) as %s', worker_id(), len(ids), token)
+    return list(Job.objects.filter(locked_by=token, status='RUNNING').order_by('-priority', 'run_at', 'id'))
+
+
+def execute(job):
+    """ ทำงาน 1 ชิ้นและบันทึกผล: DONE / QUEUED อีกครั้งพร้อม backoff / FAILED เมื่อครบจำนวนครั้ง """
+    started = timezone.now()
+    metrics.observe('job_wait_seconds', max((started - job.run_at).total_seconds(), 0.0), job=job.name)
+    start = time.perf_counter()
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError(f'Unknown job: {job.name}')
+        func(**job.kwargs)
+    except Exception:
+        job.duration = time.perf_counter() - start
+        job.attempts += 1
+        job.last_error = traceback.format_exc()[-4000:]
+        job.locked_by, job.locked_at = '', None
+        if job.attempts < job.max_attempts:
+            job.status = 'QUEUED'
+            job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+            metrics.incr('jobs_retried', job=job.name)
+        else:
+            job.status = 'FAILED'
+            job.finished_at = timezone.now()
+            metrics.incr('jobs_failed', job=job.name)
+            logger.error('Job #%s %s failed after %s attempts', job.pk, job.name, job.attempts)
+    else:
+        job.duration = time.perf_counter() - start
+        job.attempts += 1
+        job.status = 'DONE'
+        job.finished_at = timezone.now()
+        metrics.incr('jobs_completed', job=job.name)
+    finally:
+        metrics.observe('job_seconds', time.perf_counter() - start, job=job.name)
+
+    job.save(update_fields=['status', 'attempts', 'run_at', 'locked_by', 'locked_at', 'last_error',
+                            'finished_at', 'duration'])
+    return job
+
+
+def _execute_in_thread(job):
+    # แต่ละ thread มี connection ของตัวเอง: ปิดเมื่อเสียหรือหมดอายุ เหมือนจบ request
+    close_old_connections()
+    try:
+        return execute(job)
+    finally:
+        close_old_connections()
+
+
+def run_worker(concurrency=None, poll_interval=None, burst=False, max_jobs=None, stop=None):
+    """
+    วนดึงงานทีละ batch (ขนาด = จำนวน thread) แล้วทำพร้อมกันใน ThreadPoolExecutor
+    burst=True หยุดเมื่อคิวว่าง คืนค่าจำนวนงานที่ทำ
+    """
+    concurrency = concurrency or settings.JOBS_CONCURRENCY
+    poll_interval = settings.JOBS_POLL_SECONDS if poll_interval is None else poll_interval
+    stop = stop or threading.Event()
+    processed = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job') as pool:
+        while not stop.is_set():
+            requeue_stale()
+            limit = concurrency if max_jobs is None else min(concurrency, max_jobs - processed)
+            jobs = claim(limit)
+            if not jobs:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            for job in pool.map(_execute_in_thread, jobs):
+                processed += 1
+            metrics.gauge_set('jobs_queued', Job.objects.filter(status='QUEUED').count())
+            if max_jobs is not None and processed >= max_jobs:
+                break
+    return processed
+
+
+def purge(older_than_days):
+    """ ลบงานที่ DONE นานกว่ากำหนด (งาน FAILED เก็บไว้ตรวจสอบ) """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = Job.objects.filter(status='DONE', finished_at__lt=cutoff).delete()
+    return deleted
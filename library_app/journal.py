@@ -0,0 +1,237 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import metrics
+from .models import (
+    ArchivedTransaction, BorrowTransaction, CirculationEvent, DailyCirculation, MemberCirculationStats,
+    ProjectorCheckpoint,
+)
+
+# ==========================================
+# Circulation Journal (append-only)
+# ==========================================
+# circulation.py เขียนเหตุการณ์ใน transaction เดียวกับการเปลี่ยนแปลงจริง: ถ้า rollback เหตุการณ์ก็หายไปด้วย
+# projector อ่านเหตุการณ์ตามลำดับ id ทีละ batch แล้วอัปเดตตาราง projection พร้อมเลื่อน checkpoint ใน transaction เดียวกัน
+
+
+def event(kind, tx_id, member_id, book_id, occurred_at, **payload):
+    """ สร้าง CirculationEvent (ยังไม่บันทึก) ค่าใน payload ต้องแปลงเป็น JSON ได้ """
+    return CirculationEvent(
+        kind=kind, tx_id=tx_id, member_id=member_id, book_id=book_id, occurred_at=occurred_at, payload=payload,
+    )
+
+
+def record(events):
+    """ บันทึกเหตุการณ์ทั้งชุดด้วย INSERT เดียว (ต้องเรียกภายใน transaction ของการเปลี่ยนแปลง) """
+    return CirculationEvent.objects.bulk_create(events)
+
+
+def loan_events(tx, previous_status, returned_at):
+    """ เหตุการณ์ของการรับคืน 1 รายการ: RETURN และ FINE_ASSESSED ถ้ามีค่าปรับ """
+    events = [event('RETURN', tx.tx_id, tx.member_id, tx.book_id, returned_at,
+                    previous_status=previous_status, late=returned_at > tx.due_date)]
+    if tx.fine_amount > 0:
+        events.append(event('FINE_ASSESSED', tx.tx_id, tx.member_id, tx.book_id, returned_at,
+                            amount=str(tx.fine_amount)))
+    return events
+
+
+# ==========================================
+# Projectors
+# ==========================================
+class Projector:
+    """ อัปเดตตาราง projection จากเหตุการณ์ทีละ batch (apply) และล้างตารางก่อน replay (reset) """
+    name = None
+
+    def apply(self, events):
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+
+class DailyCirculationProjector(Projector):
+    name = 'daily_circulation'
+
+    def apply(self, events):
+        deltas = {}
+        for item in events:
+            day = timezone.localdate(item.occurred_at)
+            row = deltas.setdefault(day, DailyCirculation(day=day))
+            if item.kind == 'CHECKOUT':
+                row.checkouts += 1
+            elif item.kind == 'RETURN':
+                row.returns += 1
+                row.late_returns += int(item.payload.get('late', False))
+            elif item.kind == 'STATUS_CHANGE' and item.payload.get('to') == 'OVERDUE':
+                row.became_overdue += 1
+            elif item.kind == 'FINE_ASSESSED':
+                row.fines_assessed += Decimal(item.payload['amount'])
+        _merge(DailyCirculation, deltas,
+               ['checkouts', 'returns', 'late_returns', 'became_overdue', 'fines_assessed'])
+
+    def reset(self):
+        DailyCirculation.objects.all().delete()
+
+
+class MemberStatsProjector(Projector):
+    name = 'member_stats'
+
+    def apply(self, events):
+        deltas = {}
+        for item in events:
+            row = deltas.setdefault(item.member_id, MemberCirculationStats(member_id=item.member_id))
+            if item.kind == 'CHECKOUT':
+                row.checkouts += 1
+                row.open_loans += 1
+            elif item.kind == 'RETURN':
+                row.returns += 1
+                row.open_loans -= 1
+                row.overdue_loans -= int(item.payload.get('previous_status') == 'OVERDUE')
+            elif item.kind == 'STATUS_CHANGE' and item.payload.get('to') == 'OVERDUE':
+                row.overdue_loans += 1
+            elif item.kind == 'FINE_ASSESSED':
+                row.fines_total += Decimal(item.payload['amount'])
+            row.last_activity = max(filter(None, (row.last_activity, item.occurred_at)), default=None)
+        _merge(MemberCirculationStats, deltas,
+               ['checkouts', 'returns', 'open_loans', 'overdue_loans', 'fines_total'], latest=['last_activity'])
+
+    def reset(self):
+        MemberCirculationStats.objects.all().delete()
+
+
+def _merge(model, deltas, additive, latest=()):
+    """ รวมผลต่างของ batch เข้ากับแถวเดิม: อ่านครั้งเดียว แล้ว bulk_update / bulk_create """
+    existing = model.objects.in_bulk(list(deltas))
+    changed = []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            continue
+        for field in additive:
+            setattr(row, field, getattr(row, field) + getattr(delta, field))
+        for field in latest:
+            setattr(row, field, max(filter(None, (getattr(row, field), getattr(delta, field))), default=None))
+        changed.append(row)
+    model.objects.bulk_update(changed, [*additive, *latest])
+    model.objects.bulk_create([delta for key, delta in deltas.items() if key not in existing])
+
+
+PROJECTORS = {projector.name: projector for projector in (DailyCirculationProjector(), MemberStatsProjector())}
+
+
+# ==========================================
+# Running / Replay / Lag
+# ==========================================
+def _checkpoint(name, lock=False):
+    queryset = ProjectorCheckpoint.objects.select_for_update() if lock else ProjectorCheckpoint.objects
+    checkpoint = queryset.filter(name=name).first()
+    return checkpoint or ProjectorCheckpoint.objects.create(name=name)
+
+
+def _settled(events, now):
+    """
+    id ถูกจองตอน INSERT แต่ commit อาจไม่เรียงตาม id (MariaDB/MSSQL ที่มีหลาย transaction พร้อมกัน)
+    จึงอ่านเฉพาะเหตุการณ์ที่บันทึกนานกว่า JOURNAL_SETTLE_SECONDS เพื่อไม่ให้ high-water mark ข้าม id ที่ยังไม่ commit
+    """
+    cutoff = now - timedelta(seconds=settings.JOURNAL_SETTLE_SECONDS)
+    for index, item in enumerate(events):
+        if item.recorded_at > cutoff:
+            return events[:index]
+    return events
+
+
+def project(projector, batch_size=None, now=None, settle=True):
+    """
+    นำเหตุการณ์ใหม่ทั้งหมดไปใช้กับ projector ทีละ batch คืนค่าจำนวนเหตุการณ์ที่ประมวลผล
+    settle=False อ่านถึงเหตุการณ์ล่าสุดโดยไม่รอ JOURNAL_SETTLE_SECONDS (ใช้เมื่อไม่มี transaction อื่นเขียนพร้อมกัน)
+    """
+    batch_size = batch_size or settings.JOURNAL_BATCH_SIZE
+    now = now or timezone.now()
+    processed = 0
+    while True:
+        with transaction.atomic():
+            checkpoint = _checkpoint(projector.name, lock=True)
+            events = list(CirculationEvent.objects.filter(pk__gt=checkpoint.position).order_by('pk')[:batch_size])
+            if settle:
+                events = _settled(events, now)
+            if not events:
+                break
+            projector.apply(events)
+            checkpoint.position = events[-1].pk
+            checkpoint.save()
+        processed += len(events)
+
+    metrics.incr('journal_events_projected', processed, projector=projector.name)
+    lag(projector, now=now)
+    return processed
+
+
+def replay(projector, batch_size=None, now=None):
+    """
+    สร้าง projection ใหม่ทั้งหมดจากเหตุการณ์แรก (ล้างตาราง + checkpoint = 0 แล้ว project ตามปกติ)
+    ระหว่าง replay ตาราง projection จะยังไม่ครบ
+    """
+    with transaction.atomic():
+        checkpoint = _checkpoint(projector.name, lock=True)
+        projector.reset()
+        checkpoint.position = 0
+        checkpoint.save()
+    return project(projector, batch_size=batch_size, now=now)
+
+
+def lag(projector, now=None):
+    """ ความล่าช้าของ projector: จำนวนเหตุการณ์ที่ยังไม่ได้ใช้ และอายุของเหตุการณ์ที่เก่าที่สุดในนั้น (วินาที) """
+    now = now or timezone.now()
+    position = _checkpoint(projector.name).position
+    pending = CirculationEvent.objects.filter(pk__gt=position)
+    oldest = pending.order_by('pk').values_list('recorded_at', flat=True).first()
+    report = {
+        'projector': projector.name,
+        'position': position,
+        'head': CirculationEvent.objects.aggregate(head=Max('pk'))['head'] or 0,
+        'pending': pending.count(),
+        'lag_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+    }
+    metrics.gauge_set('journal_pending_events', report['pending'], projector=projector.name)
+    metrics.gauge_set('journal_lag_seconds', report['lag_seconds'], projector=projector.name)
+    return report
+
+
+# ==========================================
+# Backfill (ติดตั้งบนฐานข้อมูลที่มีประวัติอยู่แล้ว)
+# ==========================================
+def backfill(batch_size=None):
+    """
+    สร้างเหตุการณ์ย้อนหลังจากรายการยืมที่มีอยู่ (รวม archive) เรียงตามเวลา ใช้ได้เมื่อ journal ยังว่างเท่านั้น
+    คืนค่าจำนวนเหตุการณ์ที่สร้าง
+    """
+    batch_size = batch_size or settings.JOURNAL_BATCH_SIZE
+    fields = ('tx_id', 'member_id', 'book_id', 'start_date', 'due_date', 'returned_at', 'fine_amount', 'status')
+    rows = list(BorrowTransaction.objects.values_list(*fields).iterator(chunk_size=10_000))
+    rows += list(ArchivedTransaction.objects.values_list(*fields).iterator(chunk_size=10_000))
+
+    events = []
+    for tx_id, member_id, book_id, start, due, returned_at, fine, status in rows:
+        events.append(event('CHECKOUT', tx_id, member_id, book_id, start, due_date=due.isoformat()))
+        # ไม่รู้เวลาที่ sweep เปลี่ยนสถานะจริง จึงใช้กำหนดคืนแทน
+        if status == 'OVERDUE' or (returned_at and fine > 0):
+            events.append(event('STATUS_CHANGE', tx_id, member_id, book_id, due, to='OVERDUE'))
+        if returned_at:
+            previous = 'OVERDUE' if fine > 0 else 'ACTIVE'
+            events.append(event('RETURN', tx_id, member_id, book_id, returned_at,
+                                previous_status=previous, late=returned_at > due))
+            if fine > 0:
+                events.append(event('FINE_ASSESSED', tx_id, member_id, book_id, returned_at, amount=str(fine)))
+    events.sort(key=lambda item: (item.occurred_at, item.tx_id))
+
+    with transaction.atomic():
+        if CirculationEvent.objects.exists():
+            raise ValueError('Journal already has events; backfill only works on an empty journal')
+        CirculationEvent.objects.bulk_create(events, batch_size=batch_size)
+    return len(events)
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from library_app.archive import archivable_transactions, archive_returned_transactions
+from library_app.routers import archive_alias
+
+
+class Command(BaseCommand):
+    help = 'Move RETURNED transactions older than ARCHIVE_AFTER_DAYS into the archive store (resumable, batched)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help='Archive transactions returned more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches (run again later to continue)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count eligible rows')
+
+    def handle(self, *args, **options):
+        pending = archivable_transactions(options['days']).count()
+        self.stdout.write(f'Archive target: {archive_alias()}')
+        self.stdout.write(f'Eligible RETURNED transactions (> {options["days"]} days): {pending}')
+
+        if options['dry_run'] or not pending:
+            return
+
+        moved = archive_returned_transactions(
+            older_than_days=options['days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} transactions'))
@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from library_app.benchmarks import connections
+from library_app.benchmarks.base import scratch_database
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request connection setup overhead with and without persistent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+        parser.add_argument('--handshake-ms', type=float, default=0.0,
+                            help='Simulated TCP/TLS/auth handshake added to every new connection')
+        parser.add_argument('--database', default=None,
+                            help='Run against this configured alias (read-only SELECT 1) instead of a scratch SQLite database')
+
+    def handle(self, *args, **options):
+        if options['database']:
+            result = connections.run(options['database'], options['iterations'], options['handshake_ms'])
+        else:
+            with scratch_database():
+                result = connections.run(iterations=options['iterations'], handshake_ms=options['handshake_ms'])
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from library_app.benchmarks import export
+from library_app.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = 'Benchmark streaming transaction export (rows/sec, peak RSS) on a scratch database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000)
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        result = export.run(rows=options['rows'], export_format=options['format'], chunk_size=options['chunk_size'])
+        self.stdout.write(json.dumps(result, indent=2))
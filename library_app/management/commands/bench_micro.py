@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library_app.benchmarks import micro
+
+
+class Command(BaseCommand):
+    help = 'Time model/view hot paths at several data sizes and compare against a JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(str(size) for size in micro.DEFAULT_SIZES),
+                            help='Comma-separated catalog sizes (books); history is 5x, members 1/5x')
+        parser.add_argument('--only', default=None,
+                            help=f'Comma-separated cases to run (available: {", ".join(micro.CASES)})')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--baseline', default=str(micro.DEFAULT_BASELINE), help='Baseline JSON file')
+        parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline')
+        parser.add_argument('--threshold', type=float, default=micro.DEFAULT_THRESHOLD,
+                            help='Allowed slowdown of the median before failing (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        names = None
+        if options['only']:
+            names = {name.strip() for name in options['only'].split(',')}
+            unknown = names - set(micro.CASES)
+            if unknown:
+                raise CommandError(f'Unknown cases in --only: {", ".join(sorted(unknown))}')
+
+        report = micro.run(sizes=sizes, names=names, repeat=options['repeat'])
+        self.stdout.write(json.dumps(report, indent=2))
+
+        baseline = micro.load_baseline(options['baseline'])
+        if options['save_baseline'] or baseline is None:
+            # ไม่มี baseline ใน repo (เวลาขึ้นกับเครื่อง): ครั้งแรกบนเครื่องนี้ใช้ผลของรอบนี้เป็น baseline
+            micro.save_baseline(report, options['baseline'])
+            if baseline is None and not options['save_baseline']:
+                self.stdout.write(self.style.WARNING('No baseline found, nothing to compare against on this first run'))
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+
+        regressions = micro.compare(report, baseline, threshold=options['threshold'])
+        if regressions:
+            for item in regressions:
+                self.stderr.write(
+                    f"{item['case']}: {item['baseline_ms']} ms -> {item['current_ms']} ms ({item['change']:+.0%})"
+                )
+            raise CommandError(f'{len(regressions)} benchmark(s) slower than baseline by more than '
+                               f"{options['threshold']:.0%}")
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
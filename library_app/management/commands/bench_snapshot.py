@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from library_app.benchmarks import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the columnar transaction snapshot against loading transactions through the ORM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--append', type=int, default=10_000, help='Rows added before the incremental run')
+
+    def handle(self, *args, **options):
+        result = snapshot.run(rows=options['rows'], append=options['append'])
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from library_app.benchmarks import sqlite_concurrency
+
+
+class Command(BaseCommand):
+    help = 'Concurrent read/write benchmark: default SQLite settings vs the production profile (WAL + BEGIN IMMEDIATE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        result = sqlite_concurrency.run(options['writers'], options['readers'], options['seconds'])
+        self.stdout.write(json.dumps(result, indent=2))
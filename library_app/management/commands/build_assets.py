@@ -0,0 +1,57 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from library_app.checks import ASSETS_DIR, BUILT_ASSETS, STATIC_DIR
+
+
+class Command(BaseCommand):
+    help = 'Build the purged Tailwind CSS bundle and vendor plotly.js into library_app/static (no CDN at runtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tailwind', default=None,
+                            help='Path to the Tailwind standalone CLI (default: TAILWIND_CLI setting or "tailwindcss" on PATH)')
+        parser.add_argument('--no-minify', action='store_true')
+        parser.add_argument('--collectstatic', action='store_true',
+                            help='Run collectstatic afterwards (hashed, gzip/brotli-compressed files in production)')
+
+    def handle(self, *args, **options):
+        self.build_css(options['tailwind'], minify=not options['no_minify'])
+        self.vendor_plotly()
+
+        for name in BUILT_ASSETS:
+            path = STATIC_DIR / name
+            self.stdout.write(f'{name}: {path.stat().st_size / 1024:,.1f} KB')
+
+        if options['collectstatic']:
+            # finder ถูกสร้างไว้ตอน system check (ก่อนมีโฟลเดอร์ static) จึงต้องล้างให้มองเห็นไฟล์ใหม่
+            finders.get_finder.cache_clear()
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+    def build_css(self, cli=None, minify=True):
+        cli = cli or settings.TAILWIND_CLI or shutil.which('tailwindcss')
+        if not cli:
+            raise CommandError('Tailwind CLI not found: pip install -r requirements.txt (tailwindcss-bin) '
+                               'or pass --tailwind /path/to/tailwindcss')
+
+        output = STATIC_DIR / 'library_app' / 'css' / 'app.css'
+        output.parent.mkdir(parents=True, exist_ok=True)
+        command = [cli, '-i', str(ASSETS_DIR / 'tailwind.css'), '-o', str(output)]
+        if minify:
+            command.append('--minify')
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f'Tailwind build failed:\n{result.stderr}')
+
+    def vendor_plotly(self):
+        # ใช้ plotly.js ที่มากับแพ็กเกจ plotly (เวอร์ชันตรงกับที่ใช้สร้างกราฟใน admin_dashboard)
+        from plotly.offline import get_plotlyjs
+
+        output = STATIC_DIR / 'library_app' / 'vendor' / 'plotly.min.js'
+        output.parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(get_plotlyjs(), encoding='utf-8')
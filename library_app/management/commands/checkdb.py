@@ -1,13 +1,74 @@
+import json
+
 from django.core.management.base import BaseCommand
-from django.db import connection
+from django.db import DEFAULT_DB_ALIAS
+
+from library_app import diagnostics
+
 
 class Command(BaseCommand):
-    help = 'Check current database connection'
-
-    def handle(self, *args, **kwargs):
-        db_engine = connection.settings_dict['ENGINE']
-        db_name = connection.settings_dict['NAME']
-        self.stdout.write(self.style.SUCCESS(f'--- Database Connection Info ---'))
-        self.stdout.write(f'Current Engine: {db_engine}')
-        self.stdout.write(f'Current DB Name: {db_name}')
-        self.stdout.write(self.style.SUCCESS(f'-------------------------------'))
\ No newline at end of file
+    help = ('Check the database connection: ping latency, table sizes, missing indexes, EXPLAIN of key queries '
+            'and a short read/write benchmark')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to check')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+        parser.add_argument('--ping', type=int, default=50, help='Number of SELECT 1 round trips')
+        parser.add_argument('--iterations', type=int, default=200, help='Operations per benchmark case')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows in the batched INSERT case')
+        parser.add_argument('--no-explain', action='store_true', help='Skip EXPLAIN of key queries')
+        parser.add_argument('--no-benchmark', action='store_true',
+                            help='Skip the read/write benchmark (it creates and drops a scratch table)')
+
+    def handle(self, *args, **options):
+        report = diagnostics.report(
+            alias=options['database'],
+            ping_iterations=options['ping'],
+            bench_iterations=options['iterations'],
+            batch_size=options['batch_size'],
+            include_explain=not options['no_explain'],
+            include_benchmark=not options['no_benchmark'],
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        info = report['connection']
+        self.stdout.write(self.style.SUCCESS('--- Database Connection Info ---'))
+        self.stdout.write(f'Current Engine: {info["engine"]}')
+        self.stdout.write(f'Current DB Name: {info["name"]}')
+        self.stdout.write(f'Server Version: {info["server_version"] or "unknown"}')
+        ping = report['ping']
+        self.stdout.write(f'Connect: {ping["connect_ms"]} ms, ping p50 {ping["p50_ms"]} ms / p95 {ping["p95_ms"]} ms')
+
+        self.stdout.write(self.style.SUCCESS('--- Tables ---'))
+        for table in report['tables']:
+            if table['rows'] is None:
+                self.stdout.write(self.style.WARNING(f'{table["table"]:<40} not migrated'))
+                continue
+            size = f'{table["bytes"] / 1024:>10.0f} KiB' if table['bytes'] is not None else '      size n/a'
+            self.stdout.write(f'{table["table"]:<40} {table["rows"]:>10} rows {size}')
+
+        self.stdout.write(self.style.SUCCESS('--- Indexes ---'))
+        if not report['missing_indexes']:
+            self.stdout.write('All expected indexes are present')
+        for index in report['missing_indexes']:
+            self.stdout.write(self.style.ERROR(
+                f'Missing {index["index"]} on {index["table"]} ({", ".join(index["columns"])}) - run migrate'
+            ))
+
+        for name, plan in report.get('explain', {}).items():
+            self.stdout.write(self.style.SUCCESS(f'--- EXPLAIN {name} ---'))
+            self.stdout.write(plan)
+
+        if 'benchmark' in report:
+            bench = report['benchmark']
+            self.stdout.write(self.style.SUCCESS('--- Read/Write Benchmark ---'))
+            for case in ('select_pk', 'insert_commit', 'update_commit'):
+                stats = bench[case]
+                self.stdout.write(f'{case:<15} p50 {stats["p50_ms"]:>8} ms  p95 {stats["p95_ms"]:>8} ms  '
+                                  f'{stats["ops_per_second"]:>8} ops/s')
+            batch = bench['insert_batch']
+            self.stdout.write(f'{"insert_batch":<15} {batch["rows"]} rows in {batch["seconds"]} s  '
+                              f'{batch["rows_per_second"]} rows/s')
+        self.stdout.write(self.style.SUCCESS('-------------------------------'))
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from library_app.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream transaction history to CSV/JSONL using the same q/status filters as the History page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--q', default='', help='Search by SSID, Book ID or title')
+        parser.add_argument('--status', default='', help='ACTIVE / RETURNED / OVERDUE')
+        parser.add_argument('--include-archive', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--output', '-o', default='-', help='Output file (default: stdout)')
+
+    def handle(self, *args, **options):
+        to_lines, _ = EXPORT_FORMATS[options['format']]
+        rows = export_rows(
+            query=options['q'],
+            status_filter=options['status'],
+            include_archive=options['include_archive'],
+            chunk_size=options['chunk_size'],
+        )
+
+        out = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8', newline='')
+        try:
+            for line in to_lines(rows):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
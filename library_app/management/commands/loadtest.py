@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from library_app.benchmarks import loadtest
+from library_app.benchmarks.base import scratch_database
+
+
+class Command(BaseCommand):
+    help = 'Simulate a counter day: concurrent in-process traffic over the real URL routes, reported as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Threads per process')
+        parser.add_argument('--processes', type=int, default=1, help='Forked worker processes (like gunicorn workers)')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds of traffic')
+        parser.add_argument('--mix', default=None,
+                            help='JSON weights per scenario, e.g. \'{"borrow_counter": 50, "member_search": 50}\' '
+                                 f'(scenarios: {", ".join(loadtest.DEFAULT_MIX)})')
+        parser.add_argument('--members', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=5000)
+        parser.add_argument('--history', type=int, default=20_000, help='Synthetic past transactions')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--no-login-throttle', action='store_true',
+                            help='Disable the login throttle (compare a login_flood mix with and without it)')
+        parser.add_argument('--output', '-o', default=None, help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        mix = None
+        if options['mix']:
+            mix = json.loads(options['mix'])
+            unknown = set(mix) - set(loadtest.DEFAULT_MIX)
+            if unknown:
+                raise CommandError(f'Unknown scenarios in --mix: {", ".join(sorted(unknown))}')
+
+        with scratch_database(), override_settings(LOGIN_THROTTLE_ENABLED=not options['no_login_throttle']):
+            loadtest.seed_counter_day(options['members'], options['books'], options['history'])
+            report = loadtest.run(threads=options['threads'], duration=options['duration'], mix=mix,
+                                  seed=options['seed'], processes=options['processes'])
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                fh.write(output)
+        self.stdout.write(output)
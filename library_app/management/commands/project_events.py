@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library_app import journal
+
+
+class Command(BaseCommand):
+    help = 'Apply new circulation events to the projection tables (batched, resumable), replay them, or report lag'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projector', action='append', choices=sorted(journal.PROJECTORS),
+                            help='Only run this projector (repeatable; default: all)')
+        parser.add_argument('--batch-size', type=int, default=settings.JOURNAL_BATCH_SIZE)
+        parser.add_argument('--replay', action='store_true',
+                            help='Clear the projection tables and rebuild them from the first event')
+        parser.add_argument('--lag', action='store_true', help='Only report how far each projector is behind')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Create events from existing loans (including the archive); journal must be empty')
+        parser.add_argument('--follow', action='store_true', help='Keep running, polling every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        projectors = [journal.PROJECTORS[name] for name in options['projector'] or sorted(journal.PROJECTORS)]
+
+        if options['backfill']:
+            try:
+                created = journal.backfill(batch_size=options['batch_size'])
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write(self.style.SUCCESS(f'Backfilled {created:,} events'))
+
+        if options['lag']:
+            for projector in projectors:
+                self.report(journal.lag(projector))
+            return
+
+        while True:
+            for projector in projectors:
+                start = time.perf_counter()
+                run = journal.replay if options['replay'] else journal.project
+                processed = run(projector, batch_size=options['batch_size'])
+                if processed or not options['follow']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{projector.name}: {processed:,} events in {time.perf_counter() - start:.2f}s'
+                    ))
+            if not options['follow']:
+                break
+            options['replay'] = False
+            time.sleep(options['interval'])
+
+    def report(self, lag):
+        self.stdout.write(
+            f'{lag["projector"]}: position {lag["position"]:,} / head {lag["head"]:,} | '
+            f'pending {lag["pending"]:,} | lag {lag["lag_seconds"]:.1f}s'
+        )
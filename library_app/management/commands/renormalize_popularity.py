@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from library_app import popularity
+
+
+class Command(BaseCommand):
+    help = 'Move the popularity epoch to now and rescale all scores (ranking is unchanged; run periodically, e.g. weekly)'
+
+    def handle(self, *args, **options):
+        factor = popularity.renormalize()
+        self.stdout.write(self.style.SUCCESS(f'Popularity scores rescaled by {factor:.6g}'))
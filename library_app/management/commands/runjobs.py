@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+
+from library_app import jobs
+from library_app.models import Job
+
+
+def _process_main(options):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    jobs.run_worker(concurrency=options['concurrency'], poll_interval=options['poll'], burst=options['burst'],
+                    max_jobs=options['max_jobs'], stop=stop)
+
+
+class Command(BaseCommand):
+    help = 'Run the background job worker (database-backed queue, no external broker needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY, help='Threads per process')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Forked worker processes (for CPU-heavy jobs such as pandas reports)')
+        parser.add_argument('--poll', type=float, default=settings.JOBS_POLL_SECONDS,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after this many jobs (per process)')
+        parser.add_argument('--status', action='store_true', help='Only show queue counts by job and status')
+        parser.add_argument('--purge-days', type=int, default=None,
+                            help='Delete DONE jobs finished more than this many days ago, then exit')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            rows = Job.objects.values('name', 'status').annotate(total=Count('id')).order_by('name', 'status')
+            for row in rows:
+                self.stdout.write(f'{row["name"]:<40} {row["status"]:<8} {row["total"]:>8,}')
+            return
+        if options['purge_days'] is not None:
+            deleted = jobs.purge(options['purge_days'])
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted:,} finished jobs'))
+            return
+
+        self.stdout.write(f'Worker: {options["processes"]} process(es) x {options["concurrency"]} thread(s)')
+        if options['processes'] > 1:
+            # ห้ามส่งต่อการเชื่อมต่อฐานข้อมูลที่เปิดอยู่ให้ process ลูก
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            children = [context.Process(target=_process_main, args=(options,)) for _ in range(options['processes'])]
+            for child in children:
+                child.start()
+            try:
+                for child in children:
+                    child.join()
+            except KeyboardInterrupt:
+                for child in children:
+                    child.terminate()
+                    child.join()
+            return
+
+        stop = threading.Event()
+        try:
+            processed = jobs.run_worker(concurrency=options['concurrency'], poll_interval=options['poll'],
+                                        burst=options['burst'], max_jobs=options['max_jobs'], stop=stop)
+        except KeyboardInterrupt:
+            stop.set()
+            return
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed:,} jobs'))
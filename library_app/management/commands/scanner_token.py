@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library_app.api import issue_token
+from library_app.models import Branch, ScannerDevice
+
+
+class Command(BaseCommand):
+    help = 'Register a barcode scanner for the JSON API and print its token, or list/revoke devices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help='Name of the new device, e.g. "Front counter 1"')
+        parser.add_argument('--branch', default='', help='Branch code where the device is installed')
+        parser.add_argument('--list', action='store_true', help='List registered devices')
+        parser.add_argument('--revoke', type=int, metavar='ID', help='Deactivate the device with this id')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for device in ScannerDevice.objects.order_by('pk'):
+                state = 'active' if device.is_active else 'revoked'
+                self.stdout.write(f'{device.pk:>4}  {device.name:<30} {device.branch_id or "-":<8} {state:<8} '
+                                  f'last seen {device.last_seen_at or "never"}')
+            return
+
+        if options['revoke'] is not None:
+            if not ScannerDevice.objects.filter(pk=options['revoke']).update(is_active=False):
+                raise CommandError(f'No device with id {options["revoke"]}')
+            self.stdout.write(self.style.SUCCESS(f'Device {options["revoke"]} revoked'))
+            return
+
+        if not options['name']:
+            raise CommandError('Give a device name, or use --list / --revoke')
+        branch = None
+        if options['branch']:
+            branch = Branch.objects.filter(code=options['branch']).first()
+            if branch is None:
+                raise CommandError(f'Unknown branch {options["branch"]}')
+
+        device, token = issue_token(options['name'], branch)
+        self.stdout.write(self.style.SUCCESS(f'Device {device.pk} "{device.name}" registered'))
+        self.stdout.write('Token (shown only once, configure it on the scanner):')
+        self.stdout.write(token)
@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from library_app.reminders import send_reminders
+
+
+class Command(BaseCommand):
+    help = 'Email members about overdue and soon-due loans (batched, rate-limited, never sends the same reminder twice)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.REMINDER_BATCH_SIZE,
+                            help='Emails sent per mail server connection')
+        parser.add_argument('--rate', type=float, default=settings.REMINDER_RATE_PER_SECOND,
+                            help='Maximum emails per second (0 = unlimited)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count who would be reminded')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = send_reminders(batch_size=options['batch_size'], rate=options['rate'], dry_run=options['dry_run'])
+        self.stdout.write(f'Members: {stats["members"]:,} | loans: {stats["loans"]:,}')
+        if options['dry_run']:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {stats["sent"]:,} emails ({stats["failed"]:,} failed) in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from library_app.circulation import accrued_fines, sweep_overdue
+
+
+class Command(BaseCommand):
+    help = 'Mark loans past their due date as OVERDUE and refresh their accrued fines (run periodically, e.g. hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        updated = sweep_overdue(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} overdue transactions'))
+        self.stdout.write(f'Total accrued fines: {accrued_fines()} THB')
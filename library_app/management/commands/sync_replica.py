@@ -0,0 +1,29 @@
+import sqlite3
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from library_app.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the local stand-in replica file(s) (SQLite only)'
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replica only supports SQLite; server replicas use the database\'s own replication.')
+
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError('No replicas configured. Set DB_REPLICAS in .env (e.g. DB_REPLICAS=replica.sqlite3).')
+
+        for alias in aliases:
+            connections[alias].close()
+            target_path = settings.DATABASES[alias]['NAME']
+            # ใช้ backup API ของ SQLite เพื่อได้สำเนาที่สอดคล้องกันแม้ primary กำลังถูกเขียน
+            with closing(sqlite3.connect(primary['NAME'])) as source, closing(sqlite3.connect(target_path)) as target:
+                source.backup(target)
+            self.stdout.write(self.style.SUCCESS(f'{alias}: synced {primary["NAME"]} -> {target_path}'))
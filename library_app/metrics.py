@@ -0,0 +1,60 @@
+import threading
+from collections import defaultdict
+
+# ==========================================
+# In-process Metrics Registry
+# ==========================================
+# ตัวนับแบบง่ายภายใน process (แต่ละ gunicorn worker มีชุดของตัวเอง)
+# ดูค่าได้ที่ /metrics/ (เฉพาะ Admin) หรือเรียก snapshot() จากโค้ด
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = defaultdict(float)
+_timings = {}
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}={v}' for k, v in sorted(labels.items())) + '}'
+
+
+def incr(name, value=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def gauge_set(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def gauge_add(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] += value
+
+
+def observe(name, seconds, **labels):
+    """ เก็บสถิติเวลา (count / sum / max) ของเหตุการณ์ """
+    key = _key(name, labels)
+    with _lock:
+        stats = _timings.setdefault(key, {'count': 0, 'sum': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['sum'] += seconds
+        stats['max'] = max(stats['max'], seconds)
+
+
+def snapshot():
+    with _lock:
+        timings = {
+            key: {**stats, 'avg': stats['sum'] / stats['count'] if stats['count'] else 0.0}
+            for key, stats in _timings.items()
+        }
+        return {'counters': dict(_counters), 'gauges': dict(_gauges), 'timings': timings}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.11 on 2026-10-19 04:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('tx_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('start_date', models.DateTimeField()),
+                ('due_date', models.DateTimeField()),
+                ('returned_at', models.DateTimeField(blank=True, null=True)),
+                ('fine_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=8)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('RETURNED', 'Returned'), ('OVERDUE', 'Overdue')], default='RETURNED', max_length=20)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='borrowtransaction',
+            index=models.Index(fields=['status', 'returned_at'], name='tx_status_returned_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='book',
+            field=models.ForeignKey(db_column='book_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_transactions', to='library_app.book'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='member',
+            field=models.ForeignKey(db_column='ssid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_transactions', to='library_app.member'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtransaction',
+            index=models.Index(fields=['member', 'start_date'], name='archive_member_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtransaction',
+            index=models.Index(fields=['start_date'], name='archive_start_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0004_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryPopularity',
+            fields=[
+                ('category', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('borrow_count', models.PositiveIntegerField(default=0)),
+                ('popularity', models.FloatField(default=0.0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PopularityEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='borrow_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='popularity',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-popularity', 'book_id'], name='book_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-borrow_count', 'book_id'], name='book_most_borrowed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='categorypopularity',
+            index=models.Index(fields=['-popularity'], name='category_popularity_idx'),
+        ),
+    ]
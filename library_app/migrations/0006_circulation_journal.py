@@ -0,0 +1,59 @@
+# Generated by Django 5.2.11 on 2026-10-19 05:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0005_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCirculation',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('late_returns', models.PositiveIntegerField(default=0)),
+                ('became_overdue', models.PositiveIntegerField(default=0)),
+                ('fines_assessed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MemberCirculationStats',
+            fields=[
+                ('member', models.OneToOneField(db_column='ssid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='circulation_stats', serialize=False, to='library_app.member')),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('open_loans', models.IntegerField(default=0)),
+                ('overdue_loans', models.IntegerField(default=0)),
+                ('fines_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectorCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CirculationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CHECKOUT', 'Checkout'), ('RETURN', 'Return'), ('STATUS_CHANGE', 'Status change'), ('FINE_ASSESSED', 'Fine assessed')], max_length=20)),
+                ('tx_id', models.IntegerField()),
+                ('occurred_at', models.DateTimeField()),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('book', models.ForeignKey(db_column='book_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='circulation_events', to='library_app.book')),
+                ('member', models.ForeignKey(db_column='ssid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='circulation_events', to='library_app.member')),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-19 05:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0007_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tx_id', models.IntegerField()),
+                ('kind', models.CharField(choices=[('DUE_SOON', 'Due soon'), ('OVERDUE', 'Overdue')], max_length=10)),
+                ('email', models.EmailField(max_length=254)),
+                ('sent_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='borrowtransaction',
+            index=models.Index(fields=['status', 'due_date'], name='tx_status_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='reminderlog',
+            name='member',
+            field=models.ForeignKey(db_column='ssid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reminders', to='library_app.member'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminderlog',
+            constraint=models.UniqueConstraint(fields=('tx_id', 'kind'), name='reminder_tx_kind_uniq'),
+        ),
+    ]
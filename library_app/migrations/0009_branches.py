@@ -0,0 +1,66 @@
+# Generated by Django 5.2.11 on 2026-10-19 05:52
+
+import django.db.models.deletion
+from django.db import migrations, models, router
+
+
+def create_default_branch(apps, schema_editor):
+    # ต้องมีสาขาเริ่มต้นก่อนเพิ่มคอลัมน์ branch เพราะข้อมูลเดิมทั้งหมดจะอยู่ในสาขานี้
+    Branch = apps.get_model('library_app', 'Branch')
+    alias = schema_editor.connection.alias
+    if router.allow_migrate_model(alias, Branch):
+        Branch.objects.using(alias).get_or_create(code='MAIN', defaults={'name': 'สาขาหลัก'})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0008_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Branch',
+            fields=[
+                ('code', models.CharField(help_text='รหัสสาขา (เช่น MAIN, NORTH)', max_length=16, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.RunPython(create_default_branch, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='branch',
+            field=models.ForeignKey(db_constraint=False, db_default='MAIN', db_index=False, default='MAIN', on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_transactions', to='library_app.branch'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='branch',
+            field=models.ForeignKey(db_default='MAIN', db_index=False, default='MAIN', on_delete=django.db.models.deletion.PROTECT, related_name='books', to='library_app.branch'),
+        ),
+        migrations.AddField(
+            model_name='borrowtransaction',
+            name='branch',
+            field=models.ForeignKey(db_default='MAIN', db_index=False, default='MAIN', on_delete=django.db.models.deletion.PROTECT, related_name='transactions', to='library_app.branch'),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='branch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='members', to='library_app.branch'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtransaction',
+            index=models.Index(fields=['branch', 'start_date'], name='archive_branch_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['branch', 'book_id'], name='book_branch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowtransaction',
+            index=models.Index(fields=['branch', 'status', 'due_date'], name='tx_branch_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowtransaction',
+            index=models.Index(fields=['branch', '-start_date'], name='tx_branch_start_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0009_branches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stocktake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('APPLIED', 'Applied')], default='OPEN', max_length=10)),
+                ('scanned', models.BinaryField(default=bytes)),
+                ('scanned_count', models.PositiveIntegerField(default=0)),
+                ('scan_events', models.PositiveIntegerField(default=0)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stocktakes', to='library_app.branch')),
+                ('started_by', models.ForeignKey(blank=True, db_column='started_by', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stocktakes', to='library_app.member')),
+            ],
+        ),
+    ]
@@ -3,6 +3,27 @@ from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
 from datetime import timedelta
 
+# ==========================================
+# 0. Branches (สาขา: แบ่งหนังสือและรายการยืมตามสาขาที่ให้บริการ)
+# ==========================================
+# ข้อมูลเดิมทั้งหมดอยู่ในสาขานี้ (db_default ครอบคลุม INSERT ตรงจาก script / benchmark ด้วย)
+DEFAULT_BRANCH = 'MAIN'
+
+
+class Branch(models.Model):
+    code = models.CharField(max_length=16, primary_key=True, help_text="รหัสสาขา (เช่น MAIN, NORTH)")
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return f"[{self.code}] {self.name}"
+
+
+class BranchQuerySet(models.QuerySet):
+    def in_branch(self, branch):
+        """ เฉพาะสาขาที่ระบุ (ค่าว่าง = ทุกสาขา) """
+        return self.filter(branch_id=branch) if branch else self
+
+
 # ==========================================
 # 1. Members (ข้อมูลสมาชิกและระบบ Auth)
 # ==========================================
@@ -14,6 +35,8 @@ class Member(models.Model):
     
     # แยก Role ชัดเจน
     is_admin = models.BooleanField(default=False)
+    # สาขาประจำ: หน้าจอเคาน์เตอร์ของบรรณารักษ์จะแสดงเฉพาะสาขานี้ตั้งแต่เข้าสู่ระบบ (ว่าง = ทุกสาขา)
+    branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
     
     # ฟิลด์รหัสผ่านรองรับผู้ใช้ทุกคน
     password_hash = models.CharField(max_length=128, null=True, blank=True)
@@ -45,6 +68,8 @@ class Book(models.Model):
     isbn = models.CharField(max_length=20, null=True, blank=True)
     category = models.CharField(max_length=100)
     location = models.CharField(max_length=100)
+    branch = models.ForeignKey(Branch, on_delete=models.PROTECT, related_name='books', db_index=False,
+                               default=DEFAULT_BRANCH, db_default=DEFAULT_BRANCH)
     
     STATUS_CHOICES = [
         ('AVAILABLE', 'Available'),
@@ -53,6 +78,23 @@ class Book(models.Model):
         ('LOST', 'Lost'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='AVAILABLE')
+    # เวลาแก้ไขล่าสุด (ใช้ทำ Last-Modified) ถ้าอัปเดตผ่าน queryset.update() ต้องกำหนดค่าเอง
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # ความนิยม: จำนวนครั้งที่ถูกยืมทั้งหมด และคะแนนลดทอนตามเวลา (ดู library_app/popularity.py)
+    borrow_count = models.PositiveIntegerField(default=0)
+    popularity = models.FloatField(default=0.0)
+
+    class Meta:
+        indexes = [
+            # หน้าแคตตาล็อกเรียง "Trending" / "Most borrowed" ด้วย ORDER BY ที่ใช้ index ได้ตรง ๆ
+            models.Index(fields=['-popularity', 'book_id'], name='book_trending_idx'),
+            models.Index(fields=['-borrow_count', 'book_id'], name='book_most_borrowed_idx'),
+            # หน้าจัดการหนังสือของเคาน์เตอร์อ่านเฉพาะสาขาตัวเอง
+            models.Index(fields=['branch', 'book_id'], name='book_branch_idx'),
+        ]
+
+    objects = BranchQuerySet.as_manager()
 
     def __str__(self):
         return f"[{self.book_id}] {self.title}"
@@ -67,6 +109,9 @@ class BorrowTransaction(models.Model):
     # ใช้ db_column เพื่อรักษาชื่อคอลัมน์ใน DB ให้ตรงกับ schema เดิม (ssid, book_id)
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='transactions', db_column='ssid')
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='transactions', db_column='book_id')
+    # สาขาของหนังสือ ณ ตอนยืม (เก็บซ้ำไว้เพื่อกรองตามสาขาได้โดยไม่ต้อง join กับ Book)
+    branch = models.ForeignKey(Branch, on_delete=models.PROTECT, related_name='transactions', db_index=False,
+                               default=DEFAULT_BRANCH, db_default=DEFAULT_BRANCH)
     
     start_date = models.DateTimeField(default=timezone.now)
     due_date = models.DateTimeField()
@@ -81,6 +126,19 @@ class BorrowTransaction(models.Model):
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
 
+    class Meta:
+        indexes = [
+            # ใช้ตอนค้นหารายการที่คืนแล้วเพื่อย้ายไป archive
+            models.Index(fields=['status', 'returned_at'], name='tx_status_returned_idx'),
+            # รายการที่ยังไม่คืนและใกล้/เลยกำหนด (แจ้งเตือนทางอีเมล, sweep_overdue)
+            models.Index(fields=['status', 'due_date'], name='tx_status_due_idx'),
+            # ค้นหาตามสาขา: รายการค้าง/เลยกำหนดของสาขา และประวัติล่าสุดของสาขา
+            models.Index(fields=['branch', 'status', 'due_date'], name='tx_branch_status_due_idx'),
+            models.Index(fields=['branch', '-start_date'], name='tx_branch_start_idx'),
+        ]
+
+    objects = BranchQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         # คำนวณวันคืนอัตโนมัติ (สมมติว่ายืมได้ 7 วัน) ถ้าไม่ได้กำหนดมา
         if not self.due_date:
@@ -88,4 +146,303 @@ class BorrowTransaction(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"TX-{self.tx_id} | {self.member.full_name} -> {self.book.title}"
\ No newline at end of file
+        return f"TX-{self.tx_id} | {self.member.full_name} -> {self.book.title}"
+
+
+# ==========================================
+# 4. Archived Transactions (ประวัติการยืมเก่าที่ย้ายออกจากตารางหลัก)
+# ==========================================
+class ArchivedTransaction(models.Model):
+    """ สำเนาของ BorrowTransaction ที่คืนแล้ว (cold store) อาจอยู่คนละฐานข้อมูลกับตารางหลัก """
+    tx_id = models.IntegerField(primary_key=True)
+
+    # ไม่สร้าง FK constraint เพราะตารางนี้อาจถูกแยกไปอยู่ในฐานข้อมูล archive
+    member = models.ForeignKey(Member, on_delete=models.DO_NOTHING, db_constraint=False,
+                               related_name='archived_transactions', db_column='ssid')
+    book = models.ForeignKey(Book, on_delete=models.DO_NOTHING, db_constraint=False,
+                             related_name='archived_transactions', db_column='book_id')
+    branch = models.ForeignKey(Branch, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                               related_name='archived_transactions',
+                               default=DEFAULT_BRANCH, db_default=DEFAULT_BRANCH)
+
+    start_date = models.DateTimeField()
+    due_date = models.DateTimeField()
+    returned_at = models.DateTimeField(null=True, blank=True)
+
+    fine_amount = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
+    status = models.CharField(max_length=20, choices=BorrowTransaction.STATUS_CHOICES, default='RETURNED')
+
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['member', 'start_date'], name='archive_member_start_idx'),
+            models.Index(fields=['start_date'], name='archive_start_idx'),
+            models.Index(fields=['branch', 'start_date'], name='archive_branch_start_idx'),
+        ]
+
+    objects = BranchQuerySet.as_manager()
+
+    def __str__(self):
+        return f"TX-{self.tx_id} (archived)"
+
+
+# ==========================================
+# 5. Recommendations (หนังสือที่ผู้อ่านคนอื่นยืมด้วย)
+# ==========================================
+class CoBorrowCount(models.Model):
+    """
+    Sparse co-borrow matrix: จำนวนสมาชิกที่เคยยืมทั้ง book และ other
+    เก็บทั้งสองทิศทาง (A,B) และ (B,A) เพื่อให้ดึงแถวของหนังสือเล่มเดียวได้ด้วย index เดียว
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', db_column='book_id')
+    other = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', db_column='other_book_id')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'other'], name='coborrow_pair_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} ~ {self.other_id}: {self.count}"
+
+
+class BookNeighbors(models.Model):
+    """ Top-K หนังสือที่ถูกยืมร่วมกันบ่อยที่สุด คำนวณไว้ล่วงหน้า: [[book_id, count], ...] เรียงจากมากไปน้อย """
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True,
+                                related_name='neighbors', db_column='book_id')
+    neighbors = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Neighbors of {self.book_id} ({len(self.neighbors)})"
+
+
+# ==========================================
+# 6. Popularity (คะแนนความนิยมแบบลดทอนตามเวลา)
+# ==========================================
+class CategoryPopularity(models.Model):
+    """ คะแนนความนิยมต่อหมวดหมู่ (หน่วยเดียวกับ Book.popularity) """
+    category = models.CharField(max_length=100, primary_key=True)
+    borrow_count = models.PositiveIntegerField(default=0)
+    popularity = models.FloatField(default=0.0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-popularity'], name='category_popularity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category}: {self.popularity:.2f}"
+
+
+class PopularityEpoch(models.Model):
+    """
+    เวลาอ้างอิงของคะแนนความนิยม (มีแถวเดียว)
+    คะแนนเก็บเป็นผลรวมของ exp(λ·(t - epoch)) จึงเรียงลำดับได้ตรงโดยไม่ต้องลดค่าทุกแถวทุกวัน
+    และเลื่อน epoch พร้อมหารคะแนนทั้งหมดเป็นครั้งคราว (renormalize) เพื่อไม่ให้ตัวเลขโตเกินไป
+    """
+    epoch = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Popularity epoch {self.epoch:%Y-%m-%d %H:%M}"
+
+
+# ==========================================
+# 7. Circulation Journal (บันทึกเหตุการณ์แบบ append-only + ตาราง projection)
+# ==========================================
+class CirculationEvent(models.Model):
+    """
+    เหตุการณ์ยืม-คืน 1 รายการ เขียนใน transaction เดียวกับการเปลี่ยนแปลงจริง (ดู library_app/journal.py)
+    ห้ามแก้ไขหรือลบ: projection ทั้งหมดสร้างใหม่ได้จากการ replay ตารางนี้ตามลำดับ id
+    """
+    KIND_CHOICES = [
+        ('CHECKOUT', 'Checkout'),
+        ('RETURN', 'Return'),
+        ('STATUS_CHANGE', 'Status change'),
+        ('FINE_ASSESSED', 'Fine assessed'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # อ้างอิงแบบไม่มี constraint: รายการยืมอาจถูกย้ายไป archive และสมาชิก/หนังสืออาจถูกลบภายหลัง
+    tx_id = models.IntegerField()
+    member = models.ForeignKey(Member, on_delete=models.DO_NOTHING, db_constraint=False,
+                               related_name='circulation_events', db_column='ssid')
+    book = models.ForeignKey(Book, on_delete=models.DO_NOTHING, db_constraint=False,
+                             related_name='circulation_events', db_column='book_id')
+
+    occurred_at = models.DateTimeField()
+    recorded_at = models.DateTimeField(default=timezone.now)
+    payload = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} TX-{self.tx_id}"
+
+
+class ProjectorCheckpoint(models.Model):
+    """ ตำแหน่ง (high-water mark) ของ projector แต่ละตัว: id ของเหตุการณ์ล่าสุดที่นำไปใช้แล้ว """
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class DailyCirculation(models.Model):
+    """ Projection: สรุปการยืม-คืนรายวัน (ตามวันที่ท้องถิ่น) """
+    day = models.DateField(primary_key=True)
+    checkouts = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    late_returns = models.PositiveIntegerField(default=0)
+    became_overdue = models.PositiveIntegerField(default=0)
+    fines_assessed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.checkouts} out / {self.returns} in"
+
+
+class MemberCirculationStats(models.Model):
+    """ Projection: สถิติการยืมสะสมต่อสมาชิก """
+    member = models.OneToOneField(Member, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True,
+                                  related_name='circulation_stats', db_column='ssid')
+    checkouts = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    open_loans = models.IntegerField(default=0)
+    overdue_loans = models.IntegerField(default=0)
+    fines_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Stats of {self.member_id}"
+
+
+# ==========================================
+# 8. Background Jobs (คิวงานในฐานข้อมูลเดียวกัน ไม่ต้องมี broker)
+# ==========================================
+class Job(models.Model):
+    """ งาน 1 ชิ้นที่รอ worker (`manage.py runjobs`) ดึงไปทำ ดู library_app/jobs.py """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # งานที่ key ซ้ำกับงานที่ยังรออยู่จะไม่ถูกเพิ่มซ้ำ (เช่น งานสรุปผลที่ทำครั้งเดียวก็ครอบคลุมทั้งหมด)
+    key = models.CharField(max_length=100, blank=True, default='')
+    priority = models.SmallIntegerField(default=0, help_text="ค่ามากทำก่อน")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True, help_text="เวลาที่ใช้ทำงานครั้งล่าสุด (วินาที)")
+
+    class Meta:
+        indexes = [
+            # worker ดึงงาน: WHERE status='QUEUED' AND run_at <= now ORDER BY priority DESC, id
+            models.Index(fields=['status', '-priority', 'run_at', 'id'], name='job_ready_idx'),
+            models.Index(fields=['key', 'status'], name='job_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.pk} {self.name} ({self.status})"
+
+
+# ==========================================
+# 9. Reminders (บันทึกการส่งอีเมลแจ้งเตือน)
+# ==========================================
+class ReminderLog(models.Model):
+    """ รายการยืมที่ส่งแจ้งเตือนแล้ว 1 ครั้งต่อประเภท (ใช้กันส่งซ้ำเมื่อรันซ้ำ) """
+    KIND_CHOICES = [
+        ('DUE_SOON', 'Due soon'),
+        ('OVERDUE', 'Overdue'),
+    ]
+    tx_id = models.IntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    member = models.ForeignKey(Member, on_delete=models.DO_NOTHING, db_constraint=False,
+                               related_name='reminders', db_column='ssid')
+    email = models.EmailField()
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tx_id', 'kind'], name='reminder_tx_kind_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} TX-{self.tx_id} -> {self.email}"
+
+
+# ==========================================
+# 10. Stocktake (รอบตรวจนับหนังสือบนชั้น)
+# ==========================================
+class Stocktake(models.Model):
+    """ รอบตรวจนับ 1 รอบ: สะสมรหัสที่สแกนได้ แล้วเทียบกับสถานะในระบบ (ดู library_app/stocktake.py) """
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('APPLIED', 'Applied'),
+    ]
+    # ว่าง = ตรวจนับทุกสาขา
+    branch = models.ForeignKey(Branch, on_delete=models.PROTECT, null=True, blank=True, related_name='stocktakes')
+    started_by = models.ForeignKey(Member, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='stocktakes', db_column='started_by')
+    started_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN')
+
+    # รหัสหนังสือที่สแกนแล้ว (ไม่ซ้ำ เรียงลำดับ เก็บเป็นผลต่างระหว่างรหัสแล้วบีบอัดด้วย zlib)
+    scanned = models.BinaryField(default=bytes)
+    scanned_count = models.PositiveIntegerField(default=0)
+    # จำนวนครั้งที่สแกนทั้งหมดรวมรหัสซ้ำ (ใช้ดูความคืบหน้า)
+    scan_events = models.PositiveIntegerField(default=0)
+
+    applied_at = models.DateTimeField(null=True, blank=True)
+    # ผลการตรวจนับตอนปรับสถานะ: จำนวนและรหัสหนังสือของแต่ละกลุ่ม
+    result = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"Stocktake #{self.pk} {self.branch_id or 'ALL'} ({self.status})"
+
+
+# ==========================================
+# 11. Scanner Devices (เครื่องสแกนที่เรียก JSON API)
+# ==========================================
+class ScannerDevice(models.Model):
+    """ เครื่องสแกน 1 เครื่อง ยืนยันตัวตนด้วย token ประจำเครื่อง (เก็บเฉพาะ SHA-256 ดู library_app/api.py) """
+    name = models.CharField(max_length=100)
+    # สาขาที่ติดตั้งเครื่อง ใช้เตือนเมื่อยืมหนังสือของสาขาอื่น (ว่าง = ไม่ระบุ)
+    branch = models.ForeignKey(Branch, on_delete=models.PROTECT, null=True, blank=True, related_name='devices')
+    token_hash = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.branch_id or '-'})"
+
+
+# ==========================================
+# 12. Idempotency Keys (ผลของคำขอยืม-คืนที่อาจถูกส่งซ้ำ)
+# ==========================================
+class IdempotencyKey(models.Model):
+    """ ผลลัพธ์ของคำขอเขียน 1 ครั้งต่อ key: คำขอซ้ำได้ผลเดิมโดยไม่ทำรายการอีก (ดู library_app/idempotency.py) """
+    # "<ผู้ส่ง>:<key จาก client>" เช่น counter:90000001:... หรือ device:3:...
+    key = models.CharField(max_length=150, primary_key=True)
+    # hash ของเนื้อหาคำขอ ใช้ตรวจว่า key เดิมไม่ได้ถูกนำไปใช้กับคำขออื่น
+    request_hash = models.CharField(max_length=32)
+    # 0 = กำลังทำรายการ (แถวถูกจองไว้ใน transaction เดียวกับรายการ จึงไม่มีใครเห็นค่านี้หลัง commit)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    response = models.JSONField(default=dict)
+    # ลบทิ้งเป็นชุดด้วย `manage.py purge_idempotency_keys`
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key} -> {self.status_code}"
@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import RECOMMENDATIONS, bump_version_on_commit
+from .fines import SECONDS_PER_DAY
+from .models import ArchivedTransaction, Book, BorrowTransaction, CategoryPopularity, PopularityEpoch
+
+# ==========================================
+# Time-decayed Popularity
+# ==========================================
+# คะแนนของหนังสือ = Σ exp(λ·(เวลาที่ถูกยืม - epoch)) โดย λ = ln 2 / half-life
+# เมื่อเทียบ ณ เวลาเดียวกัน การยืมที่เก่ากว่า half-life จะมีน้ำหนักครึ่งหนึ่ง การเรียงคะแนนจึงเท่ากับเรียงตามความนิยมล่าสุด
+# ทุกแถวใช้ epoch เดียวกัน จึงไม่ต้องลดคะแนนทุกแถวทุกวัน แค่บวกเพิ่มตอนยืม และเลื่อน epoch เป็นครั้งคราว (renormalize)
+
+# ลำดับการแสดงผลแคตตาล็อก (?sort=...) ตรงกับ index book_trending_idx / book_most_borrowed_idx
+CATALOG_SORTS = {
+    '': ('book_id',),
+    'trending': ('-popularity', 'book_id'),
+    'popular': ('-borrow_count', 'book_id'),
+}
+SORT_LABELS = (('', 'Default'), ('trending', 'Trending'), ('popular', 'Most borrowed'))
+
+
+def decay_rate():
+    """ λ ต่อวินาที """
+    return math.log(2) / (settings.POPULARITY_HALF_LIFE_DAYS * SECONDS_PER_DAY)
+
+
+def current_epoch(lock=False):
+    queryset = PopularityEpoch.objects.select_for_update() if lock else PopularityEpoch.objects
+    state = queryset.order_by('pk').first()
+    if state is None:
+        state = PopularityEpoch.objects.create()
+    return state
+
+
+def weight(when, epoch):
+    return math.exp(decay_rate() * (when - epoch).total_seconds())
+
+
+def trending_categories(limit=5):
+    return CategoryPopularity.objects.filter(popularity__gt=0).order_by('-popularity')[:limit]
+
+
+def record_checkout(book, when=None):
+    """ เพิ่มคะแนนหนังสือและหมวดหมู่หลังการยืม 1 ครั้ง (เรียกภายใน transaction ของ checkout) """
+    when = when or timezone.now()
+    with transaction.atomic():
+        # ล็อกแถว epoch กันไม่ให้ renormalize สลับ epoch ระหว่างคำนวณน้ำหนัก
+        increment = weight(when, current_epoch(lock=True).epoch)
+        Book.objects.filter(pk=book.pk).update(
+            borrow_count=F('borrow_count') + 1, popularity=F('popularity') + increment,
+        )
+        CategoryPopularity.objects.get_or_create(category=book.category)
+        CategoryPopularity.objects.filter(category=book.category).update(
+            borrow_count=F('borrow_count') + 1, popularity=F('popularity') + increment,
+        )
+        bump_version_on_commit(RECOMMENDATIONS)
+
+
+def renormalize(now=None):
+    """ เลื่อน epoch มาที่เวลาปัจจุบันและหารคะแนนทั้งหมดด้วยตัวคูณเดียวกัน (ลำดับไม่เปลี่ยน) คืนค่าตัวคูณ """
+    now = now or timezone.now()
+    with transaction.atomic():
+        state = current_epoch(lock=True)
+        factor = 1 / weight(now, state.epoch)
+        Book.objects.filter(popularity__gt=0).update(popularity=F('popularity') * factor)
+        CategoryPopularity.objects.update(popularity=F('popularity') * factor)
+        state.epoch = now
+        state.save()
+    return factor
+
+
+def rebuild(now=None, batch_size=2000):
+    """ คำนวณ borrow_count และคะแนนใหม่ทั้งหมดจากประวัติการยืม (รวม archive) ด้วย NumPy คืนค่าจำนวนหนังสือ """
+    now = now or timezone.now()
+    rows = list(BorrowTransaction.objects.values_list('book_id', 'start_date').iterator(chunk_size=10_000))
+    rows += list(ArchivedTransaction.objects.values_list('book_id', 'start_date').iterator(chunk_size=10_000))
+    categories = dict(Book.objects.values_list('book_id', 'category'))
+
+    with transaction.atomic():
+        state = current_epoch(lock=True)
+        state.epoch = now
+        state.save()
+
+        Book.objects.update(borrow_count=0, popularity=0.0)
+        CategoryPopularity.objects.all().delete()
+        bump_version_on_commit(RECOMMENDATIONS)
+        if not rows:
+            return 0
+
+        book_ids, started = zip(*rows)
+        book_ids = np.asarray(book_ids, dtype=np.int64)
+        started = np.fromiter((value.timestamp() for value in started), dtype=np.float64, count=len(started))
+        weights = np.exp(decay_rate() * (started - now.timestamp()))
+        unique_ids, inverse = np.unique(book_ids, return_inverse=True)
+        counts = np.bincount(inverse)
+        scores = np.bincount(inverse, weights=weights)
+
+        books = [
+            Book(book_id=book_id, borrow_count=count, popularity=score)
+            for book_id, count, score in zip(unique_ids.tolist(), counts.tolist(), scores.tolist())
+            if book_id in categories
+        ]
+        Book.objects.bulk_update(books, ['borrow_count', 'popularity'], batch_size=batch_size)
+
+        per_category = {}
+        for book in books:
+            total = per_category.setdefault(categories[book.book_id], [0, 0.0])
+            total[0] += book.borrow_count
+            total[1] += book.popularity
+        CategoryPopularity.objects.bulk_create([
+            CategoryPopularity(category=category, borrow_count=count, popularity=score)
+            for category, (count, score) in per_category.items()
+        ])
+    return len(books)
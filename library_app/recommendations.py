@@ -0,0 +1,194 @@
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .caching import RECOMMENDATIONS, bump_version_on_commit
+from .models import ArchivedTransaction, Book, BookNeighbors, BorrowTransaction, CoBorrowCount
+
+
+def top_k():
+    return settings.RECOMMENDATIONS_TOP_K
+
+
+def _rank(neighbors, k):
+    # คะแนนมากก่อน เท่ากันเรียงตามรหัสหนังสือ (ผลลัพธ์คงที่ทั้งแบบ bulk และแบบ incremental)
+    return sorted(neighbors, key=lambda item: (-item[1], item[0]))[:k]
+
+
+def borrowed_books(member_id):
+    """ หนังสือทุกเล่มที่สมาชิกเคยยืม (รวม archive) """
+    books = set(BorrowTransaction.objects.filter(member_id=member_id).values_list('book_id', flat=True))
+    books.update(ArchivedTransaction.objects.filter(member_id=member_id).values_list('book_id', flat=True))
+    return books
+
+
+# ==========================================
+# Bulk Build (NumPy)
+# ==========================================
+def _member_book_pairs():
+    """ คู่ (member, book) ที่ไม่ซ้ำจากตารางหลักและ archive เป็น int64 array สองชุด """
+    pairs = set(BorrowTransaction.objects.values_list('member_id', 'book_id').distinct().iterator(chunk_size=10_000))
+    pairs.update(ArchivedTransaction.objects.values_list('member_id', 'book_id').distinct().iterator(chunk_size=10_000))
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    members, books = np.array(sorted(pairs), dtype=np.int64).T
+    return members, books
+
+
+def co_borrow_matrix(members, books, chunk_pairs=5_000_000):
+    """
+    คำนวณ co-borrow แบบ sparse (COO): คืนค่า (book_a, book_b, count) ไม่รวมคู่ตัวเอง
+    ทำทีละกลุ่มสมาชิกเพื่อจำกัดหน่วยความจำ (จำนวนคู่ต่อสมาชิก = n^2)
+    """
+    if members.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    book_ids, book_index = np.unique(books, return_inverse=True)
+    n_books = book_ids.size
+    # ข้อมูลเรียงตาม member แล้ว: หาจุดเริ่มและขนาดของแต่ละสมาชิก
+    starts = np.flatnonzero(np.r_[True, members[1:] != members[:-1]])
+    sizes = np.diff(np.r_[starts, members.size])
+
+    keys, counts = [], []
+    group_start = 0
+    while group_start < starts.size:
+        # เลือกสมาชิกให้จำนวนคู่รวมไม่เกิน chunk_pairs (อย่างน้อย 1 คน)
+        cumulative = np.cumsum(sizes[group_start:] ** 2)
+        group_end = group_start + max(1, int(np.searchsorted(cumulative, chunk_pairs, side='right')))
+        group_sizes = sizes[group_start:group_end]
+        group_starts = starts[group_start:group_end]
+
+        # สร้างทุกคู่ (i, j) ภายในสมาชิกเดียวกันแบบ vectorized
+        left = np.repeat(np.repeat(group_starts, group_sizes) + _offsets(group_sizes), np.repeat(group_sizes, group_sizes))
+        right = np.repeat(group_starts, group_sizes ** 2) + _offsets(np.repeat(group_sizes, group_sizes))
+        a, b = book_index[left], book_index[right]
+        mask = a != b
+        chunk_keys, chunk_counts = np.unique(a[mask] * n_books + b[mask], return_counts=True)
+        keys.append(chunk_keys)
+        counts.append(chunk_counts)
+        group_start = group_end
+
+    all_keys = np.concatenate(keys)
+    all_counts = np.concatenate(counts)
+    unique_keys, inverse = np.unique(all_keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=all_counts).astype(np.int64)
+    return book_ids[unique_keys // n_books], book_ids[unique_keys % n_books], totals
+
+
+def _offsets(sizes):
+    """ [0..n1-1, 0..n2-1, ...] สำหรับแต่ละขนาดใน sizes """
+    if sizes.size == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = np.cumsum(sizes)
+    return np.arange(ends[-1]) - np.repeat(ends - sizes, sizes)
+
+
+def neighbors_from_matrix(book_a, book_b, counts, k):
+    """ Top-K ต่อหนังสือจาก COO: คืนค่า dict {book_id: [[other_id, count], ...]} """
+    order = np.lexsort((book_b, -counts, book_a))
+    book_a, book_b, counts = book_a[order], book_b[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, book_a[1:] != book_a[:-1]]) if book_a.size else np.empty(0, dtype=np.int64)
+    rank = np.arange(book_a.size) - np.repeat(starts, np.diff(np.r_[starts, book_a.size]))
+    keep = rank < k
+
+    result = {}
+    for a, b, count in zip(book_a[keep].tolist(), book_b[keep].tolist(), counts[keep].tolist()):
+        result.setdefault(a, []).append([b, count])
+    return result
+
+
+def rebuild(batch_size=50_000):
+    """ คำนวณ co-borrow matrix และ top-K ใหม่ทั้งหมดจากประวัติการยืม คืนค่า (จำนวนคู่, จำนวนหนังสือ) """
+    members, books = _member_book_pairs()
+    book_a, book_b, counts = co_borrow_matrix(members, books)
+    neighbors = neighbors_from_matrix(book_a, book_b, counts, top_k())
+
+    meta = CoBorrowCount._meta
+    qn = connection.ops.quote_name
+    columns = [meta.get_field(name).column for name in ('book', 'other', 'count')]
+    sql = 'INSERT INTO {} ({}) VALUES (%s, %s, %s)'.format(qn(meta.db_table), ', '.join(qn(c) for c in columns))
+
+    with transaction.atomic():
+        CoBorrowCount.objects.all().delete()
+        BookNeighbors.objects.all().delete()
+        # matrix อาจมีหลายล้านคู่ จึงเขียนด้วย executemany โดยตรง (เร็วกว่า bulk_create หลายเท่า)
+        with connection.cursor() as cursor:
+            for start in range(0, book_a.size, batch_size):
+                end = start + batch_size
+                cursor.executemany(sql, list(zip(book_a[start:end].tolist(), book_b[start:end].tolist(),
+                                                 counts[start:end].tolist())))
+        BookNeighbors.objects.bulk_create(
+            [BookNeighbors(book_id=book_id, neighbors=items) for book_id, items in neighbors.items()],
+            batch_size=batch_size,
+        )
+        bump_version_on_commit(RECOMMENDATIONS)
+    return int(book_a.size), len(neighbors)
+
+
+# ==========================================
+# Incremental Update (เรียกจาก circulation.checkout)
+# ==========================================
+def record_checkout(member_id, book_id, previous_books=None):
+    """
+    อัปเดต matrix และ top-K หลังสมาชิกยืมหนังสือ (ต้องเรียกก่อนสร้างรายการยืมใหม่ หรือส่ง previous_books มา)
+    นับเฉพาะครั้งแรกที่สมาชิกยืมเล่มนี้ และแก้ top-K ของหนังสือเล่มอื่นเฉพาะตำแหน่งของเล่มนี้
+    """
+    previous = borrowed_books(member_id) if previous_books is None else set(previous_books)
+    if book_id in previous or not previous:
+        return
+    others = sorted(previous)
+    k = top_k()
+
+    with transaction.atomic():
+        # สร้างคู่ที่ยังไม่มีด้วย count=0 ก่อนแล้วค่อย +1 ทั้งหมด (ปลอดภัยเมื่อมีการยืมพร้อมกัน)
+        CoBorrowCount.objects.bulk_create(
+            [CoBorrowCount(book_id=book_id, other_id=other) for other in others]
+            + [CoBorrowCount(book_id=other, other_id=book_id) for other in others],
+            ignore_conflicts=True,
+        )
+        CoBorrowCount.objects.filter(
+            Q(book_id=book_id, other_id__in=others) | Q(book_id__in=others, other_id=book_id)
+        ).update(count=F('count') + 1)
+
+        # top-K ของเล่มที่ยืม: คะแนนเปลี่ยนหลายคู่ จึงดึงแถวบนสุดใหม่ (ใช้ unique index ของ book)
+        top = list(
+            CoBorrowCount.objects.filter(book_id=book_id)
+            .order_by('-count', 'other_id')
+            .values_list('other_id', 'count')[:k]
+        )
+        BookNeighbors.objects.update_or_create(book_id=book_id, defaults={'neighbors': [list(row) for row in top]})
+
+        # top-K ของเล่มอื่น: เปลี่ยนเฉพาะคะแนนของ book_id จึงแก้ใน list เดิมได้เลยโดยไม่ต้อง query matrix
+        new_counts = dict(
+            CoBorrowCount.objects.filter(book_id__in=others, other_id=book_id).values_list('book_id', 'count')
+        )
+        existing = {row.book_id: row for row in BookNeighbors.objects.filter(book_id__in=others)}
+        changed, created = [], []
+        for other in others:
+            row = existing.get(other)
+            current = row.neighbors if row else []
+            updated = _rank([item for item in current if item[0] != book_id] + [[book_id, new_counts[other]]], k)
+            if row is None:
+                created.append(BookNeighbors(book_id=other, neighbors=updated))
+            elif updated != current:
+                row.neighbors = updated
+                changed.append(row)
+        BookNeighbors.objects.bulk_create(created)
+        BookNeighbors.objects.bulk_update(changed, ['neighbors'])
+        bump_version_on_commit(RECOMMENDATIONS)
+
+
+# ==========================================
+# Read Path
+# ==========================================
+def also_borrowed(book_id, limit=None):
+    """ หนังสือที่ผู้อ่านเล่มนี้ยืมด้วย: อ่าน top-K ที่คำนวณไว้ (PK lookup) + ข้อมูลหนังสือตาม PK """
+    row = BookNeighbors.objects.filter(book_id=book_id).values_list('neighbors', flat=True).first()
+    if not row:
+        return []
+    ids = [other for other, _ in row[:limit or top_k()]]
+    books = Book.objects.in_bulk(ids)
+    # ข้ามเล่มที่ถูกลบไปแล้ว โดยคงลำดับตามคะแนน
+    return [books[other] for other in ids if other in books]
@@ -0,0 +1,135 @@
+import logging
+import time
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Case, CharField, Exists, OuterRef, Value, When
+from django.template.loader import get_template
+from django.utils import timezone
+
+from . import metrics
+from .circulation import OPEN_STATUSES
+from .models import BorrowTransaction, ReminderLog
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# Overdue / Due-soon Reminders (อีเมลแจ้งเตือน)
+# ==========================================
+# ดึงรายการที่ต้องแจ้งด้วย query เดียว (เรียงตามสมาชิก) รวมเป็นอีเมล 1 ฉบับต่อสมาชิก
+# ส่งทีละ batch ผ่าน connection เดียวของ email backend และจำกัดอัตราส่ง แล้วบันทึก ReminderLog กันส่งซ้ำ
+
+FIELDS = ('tx_id', 'kind', 'due_date', 'fine_amount', 'member_id', 'member__full_name', 'member__email', 'book__title')
+
+
+def pending_reminders(now=None):
+    """ รายการยืมที่ยังไม่คืนซึ่งเลยกำหนด หรือจะถึงกำหนดภายใน REMINDER_DUE_SOON_DAYS และยังไม่เคยแจ้งในประเภทนั้น """
+    now = now or timezone.now()
+    kind = Case(When(due_date__lt=now, then=Value('OVERDUE')), default=Value('DUE_SOON'), output_field=CharField())
+    already_sent = ReminderLog.objects.filter(tx_id=OuterRef('tx_id'), kind=OuterRef('kind'))
+    return (
+        BorrowTransaction.objects
+        .filter(status__in=OPEN_STATUSES, due_date__lt=now + timedelta(days=settings.REMINDER_DUE_SOON_DAYS))
+        .exclude(member__email='')
+        .annotate(kind=kind)
+        .exclude(Exists(already_sent))
+        .order_by('member_id', 'due_date', 'tx_id')
+        .values_list(*FIELDS)
+    )
+
+
+class Throttle:
+    """ เว้นระยะให้ส่งไม่เกิน rate ฉบับต่อวินาที (0 = ไม่จำกัด) """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.perf_counter()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + self.interval
+
+
+class Renderer:
+    """ โหลด template ครั้งเดียวแล้วใช้สร้างอีเมลทุกฉบับ """
+
+    def __init__(self):
+        self.subject = get_template('library_app/email/reminder_subject.txt')
+        self.text = get_template('library_app/email/reminder.txt')
+        self.html = get_template('library_app/email/reminder.html')
+
+    def message(self, rows):
+        first = dict(zip(FIELDS, rows[0]))
+        loans = [dict(zip(FIELDS, row), title=row[-1]) for row in rows]
+        context = {
+            'full_name': first['member__full_name'],
+            'overdue': [loan for loan in loans if loan['kind'] == 'OVERDUE'],
+            'due_soon': [loan for loan in loans if loan['kind'] == 'DUE_SOON'],
+        }
+        message = EmailMultiAlternatives(
+            subject=' '.join(self.subject.render(context).split()),
+            body=self.text.render(context),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[first['member__email']],
+        )
+        message.attach_alternative(self.html.render(context), 'text/html')
+        return message
+
+
+def send_reminders(now=None, batch_size=None, rate=None, dry_run=False):
+    """
+    ส่งอีเมลแจ้งเตือนทั้งหมดที่ค้างอยู่ คืนค่า dict จำนวนสมาชิก/รายการ/ฉบับที่ส่งได้/ล้มเหลว
+    บันทึก ReminderLog หลังส่งแต่ละ batch: ถ้าหยุดกลาง batch การรันครั้งถัดไปอาจส่งซ้ำได้ไม่เกิน batch_size ฉบับ
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    rate = settings.REMINDER_RATE_PER_SECOND if rate is None else rate
+    stats = {'members': 0, 'loans': 0, 'sent': 0, 'failed': 0}
+    renderer = Renderer()
+    throttle = Throttle(rate)
+
+    batch = []
+    rows = pending_reminders(now).iterator(chunk_size=batch_size)
+    for member_id, loans in groupby(rows, key=itemgetter(FIELDS.index('member_id'))):
+        loans = list(loans)
+        stats['members'] += 1
+        stats['loans'] += len(loans)
+        if dry_run:
+            continue
+        batch.append((renderer.message(loans), loans))
+        if len(batch) >= batch_size:
+            _send_batch(batch, throttle, stats, now)
+            batch = []
+    if batch:
+        _send_batch(batch, throttle, stats, now)
+    return stats
+
+
+def _send_batch(batch, throttle, stats, now):
+    """ เปิด connection ครั้งเดียวต่อ batch และส่งทีละฉบับ (ฉบับที่ล้มเหลวไม่ทำให้ทั้ง batch ล้ม) """
+    logs = []
+    sent = 0
+    with get_connection() as connection:
+        for message, loans in batch:
+            throttle.wait()
+            try:
+                connection.send_messages([message])
+            except Exception:
+                logger.exception('Reminder to %s failed', message.to[0])
+                stats['failed'] += 1
+                metrics.incr('reminders_failed')
+                continue
+            sent += 1
+            logs += [
+                ReminderLog(tx_id=row[0], kind=row[1], member_id=row[4], email=row[6], sent_at=now) for row in loans
+            ]
+    ReminderLog.objects.bulk_create(logs, ignore_conflicts=True)
+    stats['sent'] += sent
+    metrics.incr('reminders_sent', sent)
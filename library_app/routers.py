@@ -0,0 +1,154 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+ARCHIVE_MODEL = 'library_app.archivedtransaction'
+
+
+def archive_alias():
+    """ ชื่อ alias ของฐานข้อมูลที่เก็บ ArchivedTransaction (ค่าเริ่มต้นคือฐานข้อมูลหลัก) """
+    return getattr(settings, 'ARCHIVE_DB_ALIAS', DEFAULT_DB_ALIAS)
+
+
+def _is_archive(model):
+    return model._meta.label_lower == ARCHIVE_MODEL
+
+
+class ArchiveRouter:
+    """
+    ส่งการอ่าน/เขียน ArchivedTransaction ไปยังฐานข้อมูล archive
+    ส่วน Member/Book ที่ถูกอ้างอิงจากแถว archive จะยังอ่านจากฐานข้อมูลหลักเสมอ
+    """
+
+    def _route(self, model, **hints):
+        if _is_archive(model):
+            return archive_alias()
+        instance = hints.get('instance')
+        if instance is not None and _is_archive(type(instance)) and archive_alias() != DEFAULT_DB_ALIAS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if _is_archive(type(obj1)) or _is_archive(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        alias = archive_alias()
+        if alias == DEFAULT_DB_ALIAS:
+            return None
+        if app_label == 'library_app' and model_name == 'archivedtransaction':
+            return db == alias
+        if db == alias:
+            return False
+        return None
+
+
+# ==========================================
+# Read Replicas (ส่งการอ่านของหน้าที่ read-only ไปยัง replica)
+# ==========================================
+# replica ที่เลือกไว้สำหรับ request ปัจจุบัน (ใช้ตัวเดียวตลอดทั้ง request เพื่อให้ข้อมูลสอดคล้องกัน)
+_current_replica = ContextVar('current_replica', default=None)
+
+# session key / cache key สำหรับ read-your-writes หลังการยืม/คืน
+PRIMARY_PIN_SESSION_KEY = 'db_primary_until'
+PRIMARY_PIN_MEMBER_KEY = 'db:primary-pin:member:{}'
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def use_replica(alias=None):
+    """ เปิดการอ่านจาก replica (สุ่มหนึ่งตัวถ้าไม่ระบุ) เฉพาะโค้ดที่อยู่ภายใน block นี้ """
+    replicas = replica_aliases()
+    if alias is None and replicas:
+        alias = random.choice(replicas)
+    token = _current_replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_replica.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """ อ่านจาก primary ภายใน block นี้ แม้ view จะอยู่ใต้ replica_reads """
+    token = _current_replica.set(None)
+    try:
+        yield
+    finally:
+        _current_replica.reset(token)
+
+
+def reading_from_replica():
+    return _current_replica.get() is not None
+
+
+def pin_to_primary(request, member_ssid=None):
+    """
+    เรียกหลังการเขียน (ยืม/คืน) เพื่อให้ผู้ใช้คนนั้น และสมาชิกเจ้าของรายการ
+    อ่านจาก primary ต่อไปอีก REPLICA_STICKY_SECONDS วินาที (กันอ่านข้อมูลเก่าจาก replica ที่ยังตามไม่ทัน)
+    """
+    seconds = settings.REPLICA_STICKY_SECONDS
+    if not replica_aliases() or seconds <= 0:
+        return
+    request.session[PRIMARY_PIN_SESSION_KEY] = time.time() + seconds
+    if member_ssid is not None:
+        pin_member_to_primary(member_ssid)
+
+
+def pin_member_to_primary(member_ssid):
+    """ เฉพาะฝั่งสมาชิกเจ้าของรายการ (ใช้กับ request ที่ไม่มี session เช่น JSON API ของเครื่องสแกน) """
+    seconds = settings.REPLICA_STICKY_SECONDS
+    if replica_aliases() and seconds > 0:
+        cache.set(PRIMARY_PIN_MEMBER_KEY.format(member_ssid), True, seconds)
+
+
+def is_pinned_to_primary(request):
+    if request.session.get(PRIMARY_PIN_SESSION_KEY, 0) > time.time():
+        return True
+    member_id = request.session.get('member_id')
+    return member_id is not None and cache.get(PRIMARY_PIN_MEMBER_KEY.format(member_id), False)
+
+
+def replica_reads(view):
+    """ decorator สำหรับ view ที่อ่านอย่างเดียว: query ทั้งหมด (รวมตอน render template) จะไปที่ replica """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replica_aliases() or is_pinned_to_primary(request):
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """ อ่านจาก replica เมื่ออยู่ใน use_replica() เท่านั้น การเขียนทั้งหมดไปที่ primary เสมอ """
+
+    def db_for_read(self, model, **hints):
+        return _current_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS if replica_aliases() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        primary_group = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in primary_group and obj2._state.db in primary_group:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
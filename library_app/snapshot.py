@@ -0,0 +1,286 @@
+import heapq
+import json
+import os
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from .archive import ARCHIVE_FIELDS
+from .models import ArchivedTransaction, Book, BorrowTransaction
+
+# ==========================================
+# Columnar Transaction Snapshot (ไฟล์คอลัมน์สำหรับงานวิเคราะห์แบบ offline)
+# ==========================================
+# แต่ละคอลัมน์เป็นไฟล์ไบนารีดิบ <name>.bin (little-endian) ต่อท้ายได้ และเปิดด้วย np.memmap โดยไม่ต้องอ่านทั้งไฟล์
+# manifest.json บอกจำนวนแถวที่ใช้ได้, tx_id ล่าสุด และพจนานุกรมของคอลัมน์ที่เก็บเป็นรหัส (category, status, branch)
+# open.npy เก็บ tx_id ของรายการที่ยังไม่คืน รอบถัดไปจะเขียนแถวเหล่านั้นทับในตำแหน่งเดิม
+# ไฟล์คอลัมน์ไม่เคยถูกย่อให้สั้นกว่าจำนวนแถวใน manifest ผู้อ่านที่ map ไฟล์ค้างไว้จึงไม่พังระหว่างการต่อท้าย
+
+COLUMNS = {
+    'tx_id': np.dtype('<i8'),
+    'member_id': np.dtype('<i8'),
+    'book_id': np.dtype('<i8'),
+    'category': np.dtype('<u2'),
+    'start': np.dtype('<i8'),        # epoch วินาที (UTC)
+    'due': np.dtype('<i8'),
+    'returned': np.dtype('<i8'),     # NOT_RETURNED ถ้ายังไม่คืน
+    'fine_satang': np.dtype('<i8'),  # ค่าปรับเป็นสตางค์
+    'status': np.dtype('u1'),
+    'branch': np.dtype('<u2'),
+}
+DICTIONARY_COLUMNS = ('category', 'status', 'branch')
+TIME_COLUMNS = ('start', 'due', 'returned')
+NOT_RETURNED = -1
+FORMAT_VERSION = 2
+
+# ลำดับเดียวกับ ARCHIVE_FIELDS แต่มีหมวดหมู่ของหนังสือแทรกหลัง book_id
+HOT_FIELDS = ('tx_id', 'member_id', 'book_id', 'book__category',
+              'start_date', 'due_date', 'returned_at', 'fine_amount', 'status', 'branch_id')
+STATUS_INDEX = HOT_FIELDS.index('status')
+
+
+def snapshot_path(path=None):
+    return Path(path or settings.SNAPSHOT_DIR)
+
+
+# ==========================================
+# Loader
+# ==========================================
+class Snapshot:
+    """
+    เปิด snapshot แบบอ่านอย่างเดียว: คอลัมน์เป็น np.memmap จึงใช้เวลาเปิดไม่กี่มิลลิวินาทีไม่ว่าจะมีกี่ล้านแถว
+    ข้อมูลถูกอ่านจากดิสก์เมื่อใช้งานจริงเท่านั้น และไม่แตะฐานข้อมูลเลย
+    """
+
+    def __init__(self, path=None):
+        self.path = snapshot_path(path)
+        manifest = _read_manifest(self.path)
+        if manifest is None:
+            raise FileNotFoundError(f'No snapshot in {self.path} (run manage.py snapshot_transactions)')
+        self.rows = manifest['rows']
+        self.last_tx_id = manifest['last_tx_id']
+        self.exported_at = manifest['exported_at']
+        self.dictionaries = manifest['dictionaries']
+        self.columns = {name: _map_column(self.path, name, self.rows) for name in COLUMNS}
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def decode(self, name, codes=None):
+        """ แปลงรหัสของคอลัมน์ category / status / branch กลับเป็นข้อความ """
+        codes = self.columns[name] if codes is None else codes
+        return np.asarray(self.dictionaries[name], dtype=object)[codes]
+
+    def to_frame(self, columns=None):
+        """ DataFrame ของคอลัมน์ที่เลือก: category/status/branch เป็น Categorical, เวลาเป็น datetime64 (UTC, NaT = ยังไม่คืน) """
+        data = {}
+        for name in columns or COLUMNS:
+            values = self.columns[name]
+            if name in DICTIONARY_COLUMNS:
+                data[name] = pd.Categorical.from_codes(values, categories=self.dictionaries[name])
+            elif name in TIME_COLUMNS:
+                times = values.astype('datetime64[s]')
+                times[values == NOT_RETURNED] = np.datetime64('NaT')
+                data[name] = times
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+def _read_manifest(path):
+    try:
+        manifest = json.loads((path / 'manifest.json').read_text())
+    except FileNotFoundError:
+        return None
+    if manifest.get('version') != FORMAT_VERSION or manifest.get('columns') != {
+        name: dtype.str for name, dtype in COLUMNS.items()
+    }:
+        raise ValueError(f'Snapshot in {path} has an old format (run snapshot_transactions --full)')
+    return manifest
+
+
+def _map_column(path, name, rows, mode='r'):
+    if not rows:
+        # mmap ไฟล์ว่างไม่ได้
+        return np.empty(0, dtype=COLUMNS[name])
+    return np.memmap(path / f'{name}.bin', dtype=COLUMNS[name], mode=mode, shape=(rows,))
+
+
+# ==========================================
+# Writer
+# ==========================================
+class _Dictionary:
+    """ พจนานุกรมของคอลัมน์ที่เข้ารหัส: ค่าใหม่ได้รหัสถัดไป รหัสเดิมไม่เปลี่ยน """
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+        self.limit = np.iinfo(COLUMNS[name]).max
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > self.limit:
+                raise ValueError(f'Too many distinct values for snapshot column {self.name!r}')
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def _archive_rows(archived, chunk_size):
+    # archive อาจอยู่คนละฐานข้อมูล จึงดึงหมวดหมู่หนังสือแยกทีละ chunk
+    rows = archived.order_by('tx_id').values_list(*ARCHIVE_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        categories = dict(Book.objects.filter(book_id__in={r[2] for r in chunk}).values_list('book_id', 'category'))
+        for tx_id, member_id, book_id, *rest in chunk:
+            yield (tx_id, member_id, book_id, categories.get(book_id, ''), *rest)
+
+
+def source_rows(after=0, tx_ids=None, chunk_size=None):
+    """
+    รายการจากตารางหลักและ archive รวมกันเรียงตาม tx_id (ลำดับ HOT_FIELDS)
+    แถวที่อยู่ทั้งสองที่ระหว่างการย้ายไป archive จะถูกส่งออกครั้งเดียว
+    """
+    chunk_size = chunk_size or settings.SNAPSHOT_CHUNK_SIZE
+    hot = BorrowTransaction.objects.filter(tx_id__gt=after)
+    archived = ArchivedTransaction.objects.filter(tx_id__gt=after)
+    if tx_ids is not None:
+        hot, archived = hot.filter(tx_id__in=tx_ids), archived.filter(tx_id__in=tx_ids)
+
+    previous = None
+    for row in heapq.merge(
+        _archive_rows(archived, chunk_size),
+        hot.order_by('tx_id').values_list(*HOT_FIELDS).iterator(chunk_size=chunk_size),
+        key=itemgetter(0),
+    ):
+        if row[0] != previous:
+            yield row
+        previous = row[0]
+
+
+def _epoch(values):
+    return np.fromiter(
+        (int(value.timestamp()) if value else NOT_RETURNED for value in values), dtype=np.int64, count=len(values),
+    )
+
+
+def _to_columns(rows, dictionaries):
+    tx_id, member_id, book_id, category, start, due, returned, fine, status, branch = zip(*rows)
+    return {
+        'tx_id': np.array(tx_id, dtype=COLUMNS['tx_id']),
+        'member_id': np.array(member_id, dtype=COLUMNS['member_id']),
+        'book_id': np.array(book_id, dtype=COLUMNS['book_id']),
+        'category': np.array([dictionaries['category'].encode(v) for v in category], dtype=COLUMNS['category']),
+        'start': _epoch(start),
+        'due': _epoch(due),
+        'returned': _epoch(returned),
+        'fine_satang': np.array([int(v * 100) for v in fine], dtype=COLUMNS['fine_satang']),
+        'status': np.array([dictionaries['status'].encode(v) for v in status], dtype=COLUMNS['status']),
+        'branch': np.array([dictionaries['branch'].encode(v) for v in branch], dtype=COLUMNS['branch']),
+    }
+
+
+def _open_tx_ids(rows):
+    return np.array([row[0] for row in rows if row[STATUS_INDEX] != 'RETURNED'], dtype=np.int64)
+
+
+def _replace(target, write):
+    """ เขียนไฟล์ชั่วคราวแล้ว os.replace (ผู้อ่านเห็นไฟล์เก่าหรือใหม่ทั้งไฟล์เท่านั้น) """
+    temporary = target.with_name(target.name + '.tmp')
+    with open(temporary, 'wb') as handle:
+        write(handle)
+    os.replace(temporary, target)
+
+
+def write_snapshot(path=None, full=False, chunk_size=None):
+    """
+    ส่งออกรายการยืมทั้งหมด (รวม archive) ลง snapshot หรือต่อท้ายเฉพาะรายการที่ tx_id ใหม่กว่ารอบก่อน
+    รายการที่ยังไม่คืนในรอบก่อนจะถูกอ่านใหม่และเขียนทับในที่เดิม (สถานะ, วันคืน, ค่าปรับ)
+    ถ้าหยุดกลางคัน รันใหม่ได้ทันที ควรรันทีละ process (เช่นจาก cron)
+    คืนค่า dict จำนวนแถวทั้งหมด / ต่อท้าย / อัปเดต
+    """
+    path = snapshot_path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    chunk_size = chunk_size or settings.SNAPSHOT_CHUNK_SIZE
+
+    manifest = None if full else _read_manifest(path)
+    if manifest is None:
+        # ลบไฟล์เดิม (ผู้อ่านที่เปิดไว้ยังใช้ไฟล์เก่าต่อได้จนปิด)
+        for filename in (*(f'{name}.bin' for name in COLUMNS), 'open.npy', 'manifest.json'):
+            (path / filename).unlink(missing_ok=True)
+        manifest = {'rows': 0, 'last_tx_id': 0, 'dictionaries': {name: [] for name in DICTIONARY_COLUMNS}}
+        open_tx_ids = np.empty(0, dtype=np.int64)
+    else:
+        open_tx_ids = np.load(path / 'open.npy')
+        # tx_id ที่เกิน manifest มาจากรอบที่ล้มเหลว: จะถูกส่งออกใหม่ในขั้นต่อท้าย
+        open_tx_ids = open_tx_ids[open_tx_ids <= manifest['last_tx_id']]
+
+    rows, last_tx_id = manifest['rows'], manifest['last_tx_id']
+    dictionaries = {name: _Dictionary(name, manifest['dictionaries'][name]) for name in DICTIONARY_COLUMNS}
+    stats = {'rows': rows, 'appended': 0, 'refreshed': 0}
+
+    for name, dtype in COLUMNS.items():
+        # ตัดข้อมูลที่เขียนค้างไว้จากรอบที่ล้มเหลว (อยู่หลังจำนวนแถวใน manifest จึงไม่มีผู้อ่าน map ส่วนนี้)
+        with open(path / f'{name}.bin', 'ab') as handle:
+            handle.truncate(rows * dtype.itemsize)
+
+    still_open = []
+    if open_tx_ids.size:
+        columns = {name: _map_column(path, name, rows, mode='r+') for name in COLUMNS}
+        for start in range(0, open_tx_ids.size, chunk_size):
+            batch = list(source_rows(tx_ids=open_tx_ids[start:start + chunk_size].tolist(), chunk_size=chunk_size))
+            if not batch:
+                # แถวที่ถูกลบจากฐานข้อมูลไปแล้วคงค่าล่าสุดไว้
+                continue
+            values = _to_columns(batch, dictionaries)
+            positions = np.searchsorted(columns['tx_id'], values['tx_id'])
+            for name, column in columns.items():
+                column[positions] = values[name]
+            still_open.append(_open_tx_ids(batch))
+            stats['refreshed'] += len(batch)
+        for column in columns.values():
+            column.flush()
+        del columns
+
+    handles = {name: open(path / f'{name}.bin', 'ab') for name in COLUMNS}
+    try:
+        new_rows = source_rows(after=last_tx_id, chunk_size=chunk_size)
+        while chunk := list(islice(new_rows, chunk_size)):
+            values = _to_columns(chunk, dictionaries)
+            for name, handle in handles.items():
+                handle.write(values[name].tobytes())
+            still_open.append(_open_tx_ids(chunk))
+            rows += len(chunk)
+            last_tx_id = chunk[-1][0]
+            stats['appended'] += len(chunk)
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    # open.npy ก่อน manifest: ถ้าหยุดระหว่างนี้ tx_id ที่เกิน manifest จะถูกกรองทิ้งในรอบถัดไป
+    open_tx_ids = np.concatenate(still_open) if still_open else np.empty(0, dtype=np.int64)
+    _replace(path / 'open.npy', lambda handle: np.save(handle, open_tx_ids))
+    manifest = {
+        'version': FORMAT_VERSION,
+        'rows': rows,
+        'last_tx_id': last_tx_id,
+        'exported_at': timezone.now().isoformat(),
+        'columns': {name: dtype.str for name, dtype in COLUMNS.items()},
+        'dictionaries': {name: dictionary.values for name, dictionary in dictionaries.items()},
+    }
+    _replace(path / 'manifest.json', lambda handle: handle.write(json.dumps(manifest, ensure_ascii=False).encode()))
+    stats['rows'] = rows
+    return stats
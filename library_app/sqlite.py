@@ -0,0 +1,19 @@
+from django.conf import settings
+
+# ลำดับมีผล: journal_mode ต้องมาก่อน synchronous และ busy_timeout ต้องตั้งก่อนคำสั่งที่อาจรอ lock
+PRAGMA_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store')
+
+
+def pragma_statements(pragmas):
+    ordered = sorted(pragmas.items(), key=lambda item: PRAGMA_ORDER.index(item[0]) if item[0] in PRAGMA_ORDER else len(PRAGMA_ORDER))
+    return [f'PRAGMA {name} = {value}' for name, value in ordered]
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """ receiver ของ connection_created: ตั้งค่า PRAGMA ตาม settings.SQLITE_PRAGMAS ให้การเชื่อมต่อใหม่ """
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
@@ -0,0 +1,155 @@
+/*
+ * คิวสแกนของหน้าเคาน์เตอร์ (ยืม/คืน)
+ * ฟอร์มที่มี data-queue-op="borrow|return" ไม่ส่งทีละรายการ: เก็บรายการไว้ใน localStorage แล้วทยอยส่งเป็นชุดไปที่
+ * /counter/sync/ (ดู library_app/sync.py) บรรณารักษ์สแกนเล่มต่อไปได้ทันทีโดยไม่ต้องรอเครือข่าย
+ * แต่ละรายการมี id ของตัวเอง ถ้าส่งชุดเดิมซ้ำ (เครือข่ายหลุดก่อนได้คำตอบ) เซิร์ฟเวอร์ตอบผลเดิมโดยไม่ทำรายการซ้ำ
+ * ถ้าเบราว์เซอร์ปิด JavaScript ฟอร์มจะส่งแบบเดิม (POST ทีละรายการ + idempotency_key)
+ */
+(function () {
+    'use strict';
+
+    var STORAGE_KEY = 'counterQueue';
+    var BATCH_SIZE = 50;
+    var RETRY_SECONDS = [1, 2, 5, 10, 30];
+    var MAX_RESULTS = 20;
+
+    var panel, syncUrl, csrfToken;
+    var sending = false;
+    var failures = 0;
+    var retryTimer = null;
+
+    function load() {
+        try {
+            return JSON.parse(localStorage.getItem(STORAGE_KEY)) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function save(queue) {
+        localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+    }
+
+    function newId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+    }
+
+    function render(status) {
+        var count = load().length;
+        panel.querySelector('[data-queue-count]').textContent = count;
+        panel.querySelector('[data-queue-status]').textContent = status || (count ? '⏳ กำลังส่ง...' : '✅ ส่งครบแล้ว');
+    }
+
+    function showResult(item, result) {
+        var list = panel.querySelector('[data-queue-results]');
+        var row = document.createElement('li');
+        var text = (item.op === 'borrow' ? '📗 ' : '📥 ') + 'Book ' + item.book_id + ': ';
+        if (result.ok) {
+            text += item.op === 'borrow' ? '✅ ' + result.title + ' (คืน ' + result.due_date.slice(0, 10) + ')'
+                : (parseFloat(result.fine) > 0 ? '⚠️ รับคืนแล้ว ค่าปรับ ' + result.fine + ' บาท' : '✅ รับคืนเรียบร้อยแล้ว');
+            if (result.warning) {
+                text += ' ' + result.warning;
+            }
+        } else {
+            text += result.error;
+        }
+        row.textContent = text;
+        row.className = panel.dataset[result.ok && !(parseFloat(result.fine) > 0) ? 'okClass' : 'errorClass'];
+        list.insertBefore(row, list.firstChild);
+        while (list.children.length > MAX_RESULTS) {
+            list.removeChild(list.lastChild);
+        }
+    }
+
+    function retryLater() {
+        var seconds = RETRY_SECONDS[Math.min(failures, RETRY_SECONDS.length - 1)];
+        failures += 1;
+        render('📡 เชื่อมต่อไม่ได้ จะลองใหม่ใน ' + seconds + ' วินาที');
+        clearTimeout(retryTimer);
+        retryTimer = setTimeout(flush, seconds * 1000);
+    }
+
+    function flush() {
+        var batch = load().slice(0, BATCH_SIZE);
+        if (sending || !batch.length) {
+            render();
+            return;
+        }
+        sending = true;
+        render();
+        fetch(syncUrl, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken},
+            body: JSON.stringify({items: batch})
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        }).then(function (data) {
+            var sent = {};
+            batch.forEach(function (item) { sent[item.id] = item; });
+            data.results.forEach(function (result) {
+                if (sent[result.id]) {
+                    showResult(sent[result.id], result);
+                }
+            });
+            // ลบเฉพาะรายการที่ส่งไปแล้ว (ระหว่างรอคำตอบอาจมีสแกนใหม่เข้าคิว)
+            save(load().filter(function (item) { return !sent[item.id]; }));
+            failures = 0;
+            sending = false;
+            flush();
+        }).catch(function () {
+            sending = false;
+            retryLater();
+        });
+    }
+
+    function enqueue(form) {
+        var data = new FormData(form);
+        var item = {
+            id: newId(),
+            op: form.dataset.queueOp,
+            book_id: data.get('book_id'),
+            scanned_at: new Date().toISOString()
+        };
+        if (item.op === 'borrow') {
+            item.ssid = data.get('ssid');
+            item.days = data.get('duration') || 7;
+        }
+        var queue = load();
+        queue.push(item);
+        save(queue);
+
+        // เก็บ SSID ไว้ (สมาชิกคนเดิมมักยืมหลายเล่ม) แล้วรอสแกนเล่มถัดไป
+        form.elements.book_id.value = '';
+        form.elements.book_id.focus();
+        flush();
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        panel = document.querySelector('[data-queue-panel]');
+        if (!panel || !window.fetch || !window.localStorage) {
+            return;
+        }
+        syncUrl = panel.dataset.syncUrl;
+        panel.hidden = false;
+
+        document.querySelectorAll('form[data-queue-op]').forEach(function (form) {
+            csrfToken = form.elements.csrfmiddlewaretoken.value;
+            // ฟอร์มที่ใช้ได้เฉพาะกับคิว (เช่น รับคืนด้วย Book ID) ซ่อนไว้จนกว่าสคริปต์จะทำงาน
+            form.hidden = false;
+            form.addEventListener('submit', function (event) {
+                event.preventDefault();
+                enqueue(form);
+            });
+        });
+        window.addEventListener('online', flush);
+        // ส่งรายการที่ค้างจากครั้งก่อน (เช่น ปิดหน้าไปตอนเครือข่ายหลุด)
+        flush();
+    });
+})();
@@ -0,0 +1,72 @@
+/*
+ * สลับเฉพาะส่วนที่เปลี่ยนของหน้าเคาน์เตอร์ (progressive enhancement)
+ * ฟอร์มที่มี data-fragment-target="#id" ส่งด้วย fetch พร้อม header X-Fragment: 1 แล้วเซิร์ฟเวอร์ตอบเฉพาะ fragment
+ * (แถวรายการยืม / ข้อมูลสมาชิก / ข้อความแจ้งผล) แทน redirect แล้ว render ทั้งหน้า
+ *   data-fragment-swap="outer" (ค่าเริ่มต้น) แทนที่ทั้ง element, "inner" แทนที่เฉพาะเนื้อหาข้างใน
+ *   data-fragment-clear="book_id" ล้างช่องที่ระบุหลังสำเร็จ แล้วรอสแกนรายการถัดไป
+ * ถ้าคำตอบไม่ใช่ fragment (เช่น session หมดอายุแล้วถูก redirect) หรือเครือข่ายผิดพลาด จะส่งฟอร์มแบบปกติแทน
+ */
+(function () {
+    'use strict';
+
+    function swap(form, html) {
+        var target = document.querySelector(form.dataset.fragmentTarget);
+        if (form.dataset.fragmentSwap === 'inner') {
+            target.innerHTML = html;
+        } else {
+            target.outerHTML = html;
+        }
+    }
+
+    function submit(form) {
+        var method = (form.getAttribute('method') || 'get').toUpperCase();
+        var url = form.action;
+        var options = {method: method, credentials: 'same-origin', headers: {'X-Fragment': '1'}};
+        if (method === 'GET') {
+            url += '?' + new URLSearchParams(new FormData(form)).toString();
+        } else {
+            options.body = new FormData(form);
+        }
+
+        fetch(url, options).then(function (response) {
+            if (!response.ok || response.headers.get('X-Fragment') !== '1') {
+                throw new Error(response.status);
+            }
+            // key ของฟอร์มใช้ได้ครั้งเดียว: หน้าไม่ได้โหลดใหม่จึงรับ key ถัดไปจาก header
+            var nextKey = response.headers.get('X-Next-Idempotency-Key');
+            return response.text().then(function (html) {
+                swap(form, html);
+                if (nextKey && form.elements.idempotency_key) {
+                    form.elements.idempotency_key.value = nextKey;
+                }
+                if (method === 'GET') {
+                    history.replaceState(null, '', url);
+                }
+                (form.dataset.fragmentClear || '').split(' ').forEach(function (name) {
+                    if (name && form.elements[name]) {
+                        form.elements[name].value = '';
+                        form.elements[name].focus();
+                    }
+                });
+            });
+        }).catch(function () {
+            form.submit();
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        if (!window.fetch) {
+            return;
+        }
+        // ฟอร์มในแถวถูกแทนที่ได้ จึงดักที่ document แทนการผูกกับฟอร์มทีละอัน
+        document.addEventListener('submit', function (event) {
+            var form = event.target;
+            // ถูกยกเลิกแล้ว (กด Cancel ที่ confirm) หรือคิวสแกนรับไปทำแล้ว (counter_queue.js)
+            if (event.defaultPrevented || !form.dataset.fragmentTarget) {
+                return;
+            }
+            event.preventDefault();
+            submit(form);
+        });
+    });
+})();
@@ -0,0 +1,174 @@
+import re
+import zlib
+from itertools import islice
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.utils import timezone
+
+from .caching import CATALOG, bump_version_on_commit
+from .models import Book, Stocktake
+
+# ==========================================
+# Stocktake (ตรวจนับหนังสือบนชั้นด้วย set operation)
+# ==========================================
+# รหัสที่สแกนเก็บเป็น array ของ int64 ที่ไม่ซ้ำและเรียงลำดับ (รหัสหนังสือส่วนใหญ่เรียงติดกัน ผลต่างจึงบีบอัดได้ดีมาก)
+# การเทียบกับแคตตาล็อกทำด้วย numpy ทั้งชุด แล้วปรับสถานะด้วย UPDATE ... WHERE book_id IN (...) ทีละก้อนใหญ่
+
+# กลุ่มผลการตรวจนับที่ถือว่าคลาดเคลื่อน (ลำดับเดียวกับในรายงาน)
+FINDINGS = {
+    'missing': 'ไม่พบบนชั้น (ปรับสถานะเป็น LOST)',
+    'found': 'พบหนังสือที่เคยหาย (ปรับสถานะเป็น AVAILABLE)',
+    'on_loan': 'สแกนพบ แต่ระบบยังบันทึกว่าถูกยืม',
+    'maintenance': 'สแกนพบ แต่ระบบบันทึกว่าอยู่ระหว่างซ่อม',
+    'changed': 'ไม่พบบนชั้น แต่สถานะเปลี่ยนระหว่างตรวจนับ (ไม่ปรับสถานะให้)',
+    'unknown': 'รหัสไม่อยู่ในแคตตาล็อกของรอบนี้ (ไม่มีในระบบหรือเป็นของสาขาอื่น)',
+}
+
+REPORT_HEADER = ('book_id', 'title', 'location', 'branch', 'status', 'finding')
+
+MAX_BOOK_ID_DIGITS = 18  # ไม่เกินช่วงของ int64
+
+
+class StocktakeError(Exception):
+    """ ทำรายการกับรอบตรวจนับนี้ไม่ได้ (ข้อความเป็นภาษาไทยสำหรับแสดงผล) """
+
+
+def encode_ids(ids):
+    """ array รหัสที่ไม่ซ้ำและเรียงแล้ว -> bytes (เก็บผลต่างระหว่างรหัสติดกัน แล้วบีบอัด) """
+    return zlib.compress(np.diff(ids, prepend=0).astype('<i8').tobytes())
+
+
+def decode_ids(blob):
+    if not blob:
+        return np.empty(0, dtype=np.int64)
+    return np.cumsum(np.frombuffer(zlib.decompress(bytes(blob)), dtype='<i8'), dtype=np.int64)
+
+
+def parse_scans(text):
+    """
+    แยกรหัสจากข้อความที่เครื่องสแกนส่งมา (คั่นด้วยขึ้นบรรทัดใหม่ / ช่องว่าง / , / ;)
+    คืนค่า (array รหัสตามลำดับที่สแกน รวมรหัสซ้ำ, รายการข้อความที่ไม่ใช่รหัสหนังสือ)
+    """
+    valid, rejected = [], []
+    for token in re.split(r'[\s,;]+', text):
+        if token.isascii() and token.isdigit() and len(token) <= MAX_BOOK_ID_DIGITS:
+            valid.append(token)
+        elif token:
+            rejected.append(token)
+    return np.array(valid, dtype=np.int64), rejected
+
+
+def add_scans(stocktake, ids):
+    """ รวมรหัสที่สแกนเพิ่มเข้ากับของเดิม (ล็อกแถวไว้ เครื่องสแกนหลายเครื่องส่งพร้อมกันได้) คืนค่าเป็นรอบที่อัปเดตแล้ว """
+    with transaction.atomic():
+        stocktake = Stocktake.objects.select_for_update().get(pk=stocktake.pk)
+        if stocktake.status != 'OPEN':
+            raise StocktakeError('⚠️ รอบตรวจนับนี้ปิดไปแล้ว')
+        merged = np.union1d(decode_ids(stocktake.scanned), ids)
+        stocktake.scanned = encode_ids(merged)
+        stocktake.scanned_count = len(merged)
+        stocktake.scan_events += len(ids)
+        stocktake.save(update_fields=['scanned', 'scanned_count', 'scan_events'])
+    return stocktake
+
+
+def catalog_arrays(stocktake):
+    """ book_id / status / แก้ไขหลังเริ่มตรวจนับหรือไม่ ของหนังสือทั้งหมดในขอบเขตของรอบนี้ เรียงตาม book_id """
+    # ให้ฐานข้อมูลเทียบเวลาเอง ไม่ต้องแปลง datetime ทีละแถวใน Python
+    changed = ExpressionWrapper(Q(updated_at__gte=stocktake.started_at), output_field=BooleanField())
+    rows = list(
+        Book.objects.in_branch(stocktake.branch_id or '').order_by('book_id')
+        .values_list('book_id', 'status', changed)
+    )
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype='U20'), np.empty(0, dtype=bool)
+    book_ids, statuses, changed = zip(*rows)
+    return np.array(book_ids, dtype=np.int64), np.array(statuses, dtype='U20'), np.array(changed, dtype=bool)
+
+
+def reconcile(stocktake):
+    """ เทียบรหัสที่สแกนกับแคตตาล็อก คืนค่า dict ของกลุ่มใน FINDINGS -> array รหัส พร้อม 'confirmed' (พบตรงตามระบบ) """
+    scanned = decode_ids(stocktake.scanned)
+    book_ids, statuses, changed = catalog_arrays(stocktake)
+    on_shelf = np.isin(book_ids, scanned, assume_unique=True)
+    available = statuses == 'AVAILABLE'
+
+    return {
+        'confirmed': book_ids[on_shelf & available],
+        'missing': book_ids[~on_shelf & available & ~changed],
+        'found': book_ids[on_shelf & (statuses == 'LOST')],
+        'on_loan': book_ids[on_shelf & (statuses == 'BORROWED')],
+        'maintenance': book_ids[on_shelf & (statuses == 'MAINTENANCE')],
+        'changed': book_ids[~on_shelf & available & changed],
+        'unknown': np.setdiff1d(scanned, book_ids, assume_unique=True),
+    }
+
+
+def summary(findings):
+    return {name: len(ids) for name, ids in findings.items()}
+
+
+def _chunks(ids):
+    # ส่ง IN (...) ครั้งละมากที่สุดที่ฐานข้อมูลรับได้ (SQLite จำกัดจำนวน parameter ต่อคำสั่ง)
+    size = (connection.features.max_query_params or 50000) - 10
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size].tolist()
+
+
+def apply_stocktake(stocktake, now=None):
+    """
+    ปิดรอบตรวจนับ: เปลี่ยน missing -> LOST และ found -> AVAILABLE ด้วย UPDATE ตามชุดรหัส
+    เงื่อนไขสถานะเดิมอยู่ใน UPDATE ด้วย หนังสือที่ถูกยืม/คืนระหว่างนั้นจึงไม่ถูกเขียนทับ คืนค่าเป็นผลที่บันทึกไว้
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        stocktake = Stocktake.objects.select_for_update().get(pk=stocktake.pk)
+        if stocktake.status != 'OPEN':
+            raise StocktakeError('⚠️ รอบตรวจนับนี้ปรับสถานะไปแล้ว')
+
+        findings = reconcile(stocktake)
+        lost = sum(
+            Book.objects.filter(book_id__in=chunk, status='AVAILABLE', updated_at__lt=stocktake.started_at)
+            .update(status='LOST', updated_at=now)
+            for chunk in _chunks(findings['missing'])
+        )
+        found = sum(
+            Book.objects.filter(book_id__in=chunk, status='LOST').update(status='AVAILABLE', updated_at=now)
+            for chunk in _chunks(findings['found'])
+        )
+
+        stocktake.status = 'APPLIED'
+        stocktake.applied_at = now
+        stocktake.result = {
+            'counts': summary(findings),
+            'marked_lost': lost,
+            'marked_available': found,
+            'ids': {name: findings[name].tolist() for name in FINDINGS},
+        }
+        stocktake.save(update_fields=['status', 'applied_at', 'result'])
+    # update() ไม่ส่ง post_save จึงต้องเปลี่ยน version ของแคตตาล็อกเอง (หลัง commit ของผู้เรียก)
+    bump_version_on_commit(CATALOG)
+    return stocktake.result
+
+
+def discrepancy_rows(stocktake, chunk_size=2000):
+    """
+    แถวของรายงานความคลาดเคลื่อนตามลำดับ REPORT_HEADER (ทุกกลุ่มยกเว้น confirmed)
+    รอบที่ปรับสถานะแล้วใช้ผลที่บันทึกไว้ รอบที่ยังเปิดอยู่คำนวณจากข้อมูลปัจจุบัน
+    """
+    if stocktake.status == 'APPLIED':
+        findings = stocktake.result['ids']
+    else:
+        findings = {name: ids.tolist() for name, ids in reconcile(stocktake).items()}
+
+    for name in FINDINGS:
+        ids = iter(findings[name])
+        while chunk := list(islice(ids, chunk_size)):
+            books = {
+                row[0]: row for row in
+                Book.objects.filter(book_id__in=chunk).values_list('book_id', 'title', 'location', 'branch_id', 'status')
+            }
+            for book_id in chunk:
+                yield (*books.get(book_id, (book_id, '', '', '', '')), name)
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .api import MAX_LOAN_DAYS
+from .circulation import OPEN_STATUSES, CheckoutError, checkout, return_loan
+from .idempotency import KEY_MAX_LENGTH, IdempotencyError, request_hash, run_once
+from .models import Book, BorrowTransaction, Member
+from .routers import pin_member_to_primary
+
+# ==========================================
+# Offline Counter Sync (คิวสแกนของหน้าเคาน์เตอร์ที่ส่งมาเป็นชุด)
+# ==========================================
+# หน้าเคาน์เตอร์เก็บรายการสแกนไว้ในเครื่อง (localStorage) แล้วส่งมาทีละชุด ดู static/library_app/js/counter_queue.js
+# ทำทุกรายการตามลำดับใน transaction เดียว รายการที่ชนกัน (เช่น หนังสือถูกยืมอยู่แล้ว) ได้ผลเป็นข้อผิดพลาดเฉพาะรายการนั้น
+# id ของแต่ละรายการเป็น idempotency key: ส่งชุดเดิมซ้ำหลังเครือข่ายหลุดจะได้ผลเดิมโดยไม่ทำรายการซ้ำ
+
+# จำกัดขนาดชุด: SQLite ล็อกการเขียนทั้งฐานข้อมูลตลอด transaction
+MAX_ITEMS = 100
+OPERATIONS = ('borrow', 'return')
+
+
+def _integer(value, name):
+    if isinstance(value, (bool, list, dict)) or value is None:
+        raise ValueError(f'{name} must be an integer')
+    return int(value)
+
+
+def clean_item(raw, now):
+    """ ตรวจรายการ 1 รายการจาก client -> dict ที่ใช้ทำรายการ (ValueError ถ้าไม่ถูกต้อง) """
+    if not isinstance(raw, dict):
+        raise ValueError('item must be an object')
+    item_id = raw.get('id')
+    if not isinstance(item_id, str) or not 0 < len(item_id) <= KEY_MAX_LENGTH:
+        raise ValueError('id is required')
+    if raw.get('op') not in OPERATIONS:
+        raise ValueError(f'op must be one of {", ".join(OPERATIONS)}')
+
+    # ใช้เวลาที่สแกนจริง (ค่าปรับ/วันครบกำหนดไม่ขึ้นกับว่าส่งถึงเซิร์ฟเวอร์ช้าแค่ไหน) แต่ไม่เกินเวลาปัจจุบัน
+    at = now
+    if raw.get('scanned_at'):
+        scanned_at = parse_datetime(str(raw['scanned_at']))
+        if scanned_at is None or timezone.is_naive(scanned_at):
+            raise ValueError('scanned_at must be an ISO 8601 time with timezone')
+        # เก่ากว่าอายุของ idempotency key จะตรวจการส่งซ้ำไม่ได้แล้ว ให้บรรณารักษ์ทำรายการเองที่เคาน์เตอร์
+        if now - scanned_at > timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS):
+            raise ValueError('⚠️ รายการสแกนเก่าเกินไป กรุณาทำรายการใหม่ที่เคาน์เตอร์')
+        at = min(scanned_at, now)
+
+    item = {'id': item_id, 'op': raw['op'], 'book_id': _integer(raw.get('book_id'), 'book_id'), 'at': at}
+    if item['op'] == 'borrow':
+        item['ssid'] = _integer(raw.get('ssid'), 'ssid')
+        item['days'] = _integer(raw.get('days', 7), 'days')
+        if not 1 <= item['days'] <= MAX_LOAN_DAYS:
+            raise ValueError(f'days must be between 1 and {MAX_LOAN_DAYS}')
+    return item
+
+
+def _borrow(item, branch):
+    member = Member.objects.filter(ssid=item['ssid']).first()
+    book = Book.objects.filter(book_id=item['book_id']).first()
+    if member is None or book is None:
+        return 404, {'ok': False, 'error': '⚠️ ไม่พบสมาชิกหรือหนังสือในระบบ'}
+    try:
+        tx = checkout(member, book, days=item['days'], now=item['at'])
+    except CheckoutError as error:
+        return 409, {'ok': False, 'error': str(error)}
+    pin_member_to_primary(member.ssid)
+
+    result = {'ok': True, 'tx_id': tx.tx_id, 'title': book.title, 'due_date': tx.due_date.isoformat()}
+    if branch and book.branch_id != branch:
+        result['warning'] = f'📍 หนังสือเล่มนี้เป็นของสาขา {book.branch_id}'
+    return 200, result
+
+
+def _return(item):
+    tx = BorrowTransaction.objects.filter(book_id=item['book_id'], status__in=OPEN_STATUSES).first()
+    if tx is None:
+        return 409, {'ok': False, 'error': '⚠️ หนังสือเล่มนี้ไม่มีรายการยืมที่ยังไม่คืน'}
+    tx = return_loan(tx, returned_at=item['at'])
+    pin_member_to_primary(tx.member_id)
+    return 200, {'ok': True, 'tx_id': tx.tx_id, 'ssid': tx.member_id, 'fine': str(tx.fine_amount)}
+
+
+def apply_batch(items, scope, branch='', now=None):
+    """
+    ทำรายการยืม/คืนตามลำดับใน transaction เดียว คืนค่าผลรายรายการตามลำดับเดียวกับที่ส่งมา
+    {'id', 'ok', ...} โดยรายการที่ทำไม่ได้มี 'error' เป็นข้อความภาษาไทยสำหรับแสดงที่เคาน์เตอร์
+    """
+    now = now or timezone.now()
+    results = []
+    with transaction.atomic():
+        for raw in items:
+            try:
+                item = clean_item(raw, now)
+                fingerprint = request_hash(item['op'], item['book_id'], item.get('ssid'), item.get('days'))
+                action = (lambda item=item: _borrow(item, branch)) if item['op'] == 'borrow' else (
+                    lambda item=item: _return(item))
+                _, result, _ = run_once(scope, item['id'], fingerprint, action)
+            except (ValueError, IdempotencyError) as error:
+                result = {'ok': False, 'error': str(error)}
+            results.append({'id': raw.get('id') if isinstance(raw, dict) else None, **result})
+    return results
@@ -0,0 +1,27 @@
+from django.conf import settings
+
+from . import journal, recommendations, reminders
+from .jobs import task
+
+# ==========================================
+# งานเบื้องหลังที่ลงทะเบียนไว้ (import ตอน AppConfig.ready)
+# ==========================================
+
+
+@task('recommendations.record_checkout', priority=10)
+def record_checkout(member_id, book_id, previous_books):
+    # previous_books ถูกเก็บตอนยืม (ก่อนสร้างรายการใหม่) จึงไม่ขึ้นกับเวลาที่ worker มาทำ
+    recommendations.record_checkout(member_id, book_id, previous_books)
+
+
+@task('journal.project')
+def project_journal():
+    # eager: ทำทันทีหลัง commit ของรายการยืม-คืน เหตุการณ์ที่เพิ่งบันทึกยังไม่พ้น settle window จึงไม่รอ
+    # (มิฉะนั้น projection จะช้ากว่าจริงหนึ่งรายการเสมอตอนพัฒนา/ทดสอบ)
+    for projector in journal.PROJECTORS.values():
+        journal.project(projector, settle=not settings.JOBS_EAGER)
+
+
+@task('reminders.send', priority=-5)
+def send_reminders():
+    reminders.send_reminders()
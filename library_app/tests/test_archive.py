@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+
+from library_app.archive import archive_returned_transactions
+from library_app.models import Member, Book, BorrowTransaction, ArchivedTransaction
+
+
+class TransactionArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(
+            ssid=10000001, full_name="Member A", email="a@test.com", phone_number="0811111111",
+        )
+        cls.book = Book.objects.create(
+            book_id=2001, title="Django for Beginners", author="William",
+            category="Technology", location="A1", status="AVAILABLE",
+        )
+        now = timezone.now()
+
+        # รายการเก่า 3 รายการ (คืนแล้วเกิน 1 ปี) + รายการใหม่ที่ต้องอยู่ในตารางหลัก
+        cls.old_txs = [
+            BorrowTransaction.objects.create(
+                member=cls.member, book=cls.book,
+                start_date=now - timedelta(days=500 + i), due_date=now - timedelta(days=493 + i),
+                returned_at=now - timedelta(days=495 + i), status="RETURNED",
+            )
+            for i in range(3)
+        ]
+        cls.recent_returned = BorrowTransaction.objects.create(
+            member=cls.member, book=cls.book,
+            start_date=now - timedelta(days=10), due_date=now - timedelta(days=3),
+            returned_at=now - timedelta(days=5), status="RETURNED",
+        )
+        cls.active = BorrowTransaction.objects.create(
+            member=cls.member, book=cls.book, due_date=now + timedelta(days=7), status="ACTIVE",
+        )
+
+    def _login_as_admin(self):
+        session = self.client.session
+        session["member_id"] = 90000001
+        session["is_admin"] = True
+        session.save()
+
+    def test_archive_moves_only_old_returned_rows(self):
+        moved = archive_returned_transactions(older_than_days=365, batch_size=2)
+
+        self.assertEqual(moved, 3)
+        self.assertEqual(ArchivedTransaction.objects.count(), 3)
+        self.assertEqual(
+            set(BorrowTransaction.objects.values_list("tx_id", flat=True)),
+            {self.recent_returned.tx_id, self.active.tx_id},
+        )
+
+    def test_archive_is_resumable(self):
+        # หยุดหลัง batch แรก แล้วรันต่อได้โดยไม่เกิดข้อมูลซ้ำ
+        self.assertEqual(archive_returned_transactions(older_than_days=365, batch_size=2, max_batches=1), 2)
+        self.assertEqual(archive_returned_transactions(older_than_days=365, batch_size=2), 1)
+        self.assertEqual(ArchivedTransaction.objects.count(), 3)
+
+    def test_failed_archive_write_keeps_hot_rows(self):
+        with mock.patch('django.db.models.query.QuerySet.bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                archive_returned_transactions(older_than_days=365, batch_size=2)
+        self.assertEqual(BorrowTransaction.objects.filter(status="RETURNED").count(), 4)
+        self.assertFalse(ArchivedTransaction.objects.exists())
+
+    def test_history_excludes_archive_unless_requested(self):
+        archive_returned_transactions(older_than_days=365)
+        self._login_as_admin()
+
+        response = self.client.get("/transaction/")
+        self.assertEqual(len(response.context["transactions"]), 2)
+
+        response = self.client.get("/transaction/?archive=1")
+        transactions = response.context["transactions"]
+        self.assertEqual(len(transactions), 5)
+        start_dates = [tx.start_date for tx in transactions]
+        self.assertEqual(start_dates, sorted(start_dates, reverse=True))
+
+    def test_member_profile_unions_archive(self):
+        archive_returned_transactions(older_than_days=365)
+
+        response = self.client.get(f"/{self.member.ssid}/?archive=1")
+        self.assertEqual(len(response.context["transactions"]), 5)
+        self.assertContains(response, "Django for Beginners")
@@ -0,0 +1,50 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from library_app.benchmarks import micro
+
+
+class CompareTests(SimpleTestCase):
+
+    def test_flags_only_slowdowns_beyond_threshold(self):
+        baseline = {'results': {'a@10': {'median_ms': 10.0}, 'b@10': {'median_ms': 10.0}, 'c@10': {'median_ms': 10.0}}}
+        report = {'results': {'a@10': {'median_ms': 11.5}, 'b@10': {'median_ms': 13.0}, 'c@10': {'median_ms': 5.0},
+                              'new@10': {'median_ms': 99.0}}}
+
+        regressions = micro.compare(report, baseline, threshold=0.2)
+
+        self.assertEqual([item['case'] for item in regressions], ['b@10'])
+        self.assertEqual(regressions[0]['change'], 0.3)
+
+    def test_missing_baseline_reports_nothing(self):
+        self.assertEqual(micro.compare({'results': {'a@10': {'median_ms': 1.0}}}, None), [])
+
+
+class MicroSuiteTests(TestCase):
+
+    def test_all_cases_run_on_small_dataset(self):
+        context = micro.seed(20)
+        results = micro.run_cases(context, repeat=1)
+
+        self.assertEqual(len(results), len(micro.CASES))
+        self.assertIn('member.check_password', results)
+        self.assertIn('view.admin_dashboard@20', results)
+        self.assertTrue(all(stats['median_ms'] > 0 for stats in results.values()))
+
+    def test_first_run_saves_baseline(self):
+        report = {'results': {'a@10': {'median_ms': 1.0}}}
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.object(micro, 'run', return_value=report):
+            path = Path(tmp_dir) / 'micro.json'
+            out = StringIO()
+            call_command('bench_micro', '--baseline', str(path), stdout=out)
+            self.assertIn('No baseline found', out.getvalue())
+            self.assertEqual(micro.load_baseline(path), report)
+
+            out = StringIO()
+            call_command('bench_micro', '--baseline', str(path), stdout=out)
+            self.assertIn('No regressions against baseline', out.getvalue())
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from library_app.archive import archive_returned_transactions
+from library_app.branches import branch_counters
+from library_app.circulation import checkout
+from library_app.models import ArchivedTransaction, Book, BorrowTransaction, Branch, Member
+
+
+class BranchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.north = Branch.objects.create(code="NORTH", name="สาขาเหนือ")
+        cls.librarian = Member.objects.create(
+            ssid=90000001, full_name="Librarian", email="lib@test.com", phone_number="08", is_admin=True,
+            branch=cls.north,
+        )
+        cls.librarian.set_password("admin123")
+        cls.librarian.save()
+        cls.member = Member.objects.create(ssid=10000001, full_name="Reader", email="r@test.com", phone_number="08")
+        cls.main_book = Book.objects.create(book_id=1001, title="Main Shelf Book", author="A", category="X", location="A1")
+        cls.north_book = Book.objects.create(book_id=2001, title="North Shelf Book", author="B", category="X",
+                                             location="N1", branch=cls.north)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_default_branch_exists_and_is_used(self):
+        self.assertTrue(Branch.objects.filter(code="MAIN").exists())
+        self.assertEqual(self.main_book.branch_id, "MAIN")
+
+    def test_counter_starts_at_librarians_branch(self):
+        self.client.post("/", {"ssid": "90000001", "password": "admin123"})
+        self.assertEqual(self.client.session["branch"], "NORTH")
+
+        response = self.client.get("/manage/")
+        self.assertContains(response, "North Shelf Book")
+        self.assertNotContains(response, "Main Shelf Book")
+
+        self.client.post("/branch/", {"branch": "", "next": "/manage/"})
+        response = self.client.get("/manage/")
+        self.assertContains(response, "Main Shelf Book")
+
+    def test_switch_branch_validates_code_and_next(self):
+        session = self.client.session
+        session["member_id"], session["is_admin"], session["branch"] = 90000001, True, "NORTH"
+        session.save()
+
+        response = self.client.post("/branch/", {"branch": "NOPE", "next": "https://evil.example/"})
+        self.assertRedirects(response, "/dashboard/", fetch_redirect_response=False)
+        self.assertEqual(self.client.session["branch"], "NORTH")
+
+        response = self.client.post("/branch/", {"branch": "MAIN", "next": "/transaction/"})
+        self.assertRedirects(response, "/transaction/", fetch_redirect_response=False)
+        self.assertEqual(self.client.session["branch"], "MAIN")
+
+    def test_loans_are_partitioned_by_book_branch(self):
+        north_tx = checkout(self.member, self.north_book)
+        checkout(self.member, self.main_book)
+        self.assertEqual(north_tx.branch_id, "NORTH")
+        BorrowTransaction.objects.filter(pk=north_tx.pk).update(status="OVERDUE")
+
+        self.assertEqual(list(BorrowTransaction.objects.in_branch("NORTH")), [north_tx])
+        self.assertEqual(BorrowTransaction.objects.in_branch("").count(), 2)
+        counters = {row["code"]: row for row in branch_counters()}
+        self.assertEqual((counters["NORTH"]["books"], counters["NORTH"]["overdue"]), (1, 1))
+        self.assertEqual((counters["MAIN"]["active"], counters["MAIN"]["overdue"]), (1, 0))
+
+        session = self.client.session
+        session["member_id"], session["is_admin"], session["branch"] = 90000001, True, "MAIN"
+        session.save()
+        response = self.client.get("/dashboard/")
+        self.assertEqual((response.context["active_borrows"], response.context["overdue_count"]), (1, 0))
+        self.assertContains(response, "🏢 Branches")
+
+        lines = b"".join(self.client.get("/transaction/export/").streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].endswith(",branch"))
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith(",MAIN"))
+
+    def test_archive_keeps_branch(self):
+        old = timezone.now() - timedelta(days=500)
+        tx = BorrowTransaction.objects.create(member=self.member, book=self.north_book, branch=self.north,
+                                              start_date=old, due_date=old, returned_at=old, status="RETURNED")
+        archive_returned_transactions(older_than_days=365)
+        self.assertEqual(ArchivedTransaction.objects.in_branch("NORTH").get().tx_id, tx.tx_id)
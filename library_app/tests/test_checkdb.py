@@ -0,0 +1,48 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from library_app import diagnostics
+from library_app.models import Book
+
+
+class CheckDbTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Book.objects.create(book_id=1001, title="Data Science", author="A", category="Science", location="A1")
+
+    def test_json_report(self):
+        out = StringIO()
+        call_command('checkdb', '--json', '--ping', '5', '--iterations', '5', '--batch-size', '10', stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['connection']['vendor'], connection.vendor)
+        self.assertEqual(report['ping']['count'], 5)
+        tables = {table['table']: table for table in report['tables']}
+        self.assertEqual(tables['library_app_book']['rows'], 1)
+        self.assertEqual(report['missing_indexes'], [])
+        self.assertEqual(set(report['explain']), set(diagnostics.key_queries()))
+        self.assertEqual(report['benchmark']['insert_batch']['rows'], 10)
+        self.assertGreater(report['benchmark']['select_pk']['ops_per_second'], 0)
+        # ตารางชั่วคราวถูกลบทิ้งแล้ว
+        self.assertNotIn(diagnostics.SCRATCH_TABLE, connection.introspection.table_names())
+
+    def test_reports_missing_index(self):
+        # schema_editor ของ SQLite ใช้ใน transaction ของ TestCase ไม่ได้ จึงลบด้วย SQL ตรง (rollback เมื่อจบ test)
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX tx_status_due_idx')
+
+        self.assertIn(
+            {'table': 'library_app_borrowtransaction', 'index': 'tx_status_due_idx', 'columns': ['status', 'due_date']},
+            diagnostics.missing_indexes(),
+        )
+
+    def test_text_output(self):
+        out = StringIO()
+        call_command('checkdb', '--no-benchmark', '--no-explain', stdout=out)
+        self.assertIn('Current Engine:', out.getvalue())
+        self.assertIn('All expected indexes are present', out.getvalue())
@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from library_app import recommendations
+from library_app.circulation import bulk_return, checkout
+from library_app.models import Member, Book, BorrowTransaction
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(ssid=10000001, full_name="Alice", email="a@test.com", phone_number="0811111111")
+        cls.book = Book.objects.create(book_id=10001, title="Django Deep Dive", author="A", category="Technology",
+                                       location="A1", status="BORROWED")
+        cls.tx = BorrowTransaction.objects.create(member=cls.member, book=cls.book)
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, ssid, is_admin=False):
+        session = self.client.session
+        session["member_id"] = ssid
+        session["is_admin"] = is_admin
+        session.save()
+
+    def test_catalog_returns_304_without_running_queryset(self):
+        self.login(self.member.ssid)
+        first = self.client.get("/member/home/")
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+        self.assertIn("private", first["Cache-Control"])
+
+        # เหลือเพียงการโหลด session (ไม่มี query ของสมาชิกหรือหนังสือ)
+        with self.assertNumQueries(1):
+            second = self.client.get("/member/home/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+
+        # ค้นหาคำอื่นต้องได้ ETag ใหม่
+        self.assertEqual(self.client.get("/member/home/", {"q": "x"}, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    def test_recommendation_rebuild_invalidates_catalog(self):
+        self.login(self.member.ssid)
+        etag = self.client.get("/member/home/")["ETag"]
+        # แผง "ผู้อ่านยังยืม" / หมวดหมู่มาแรงถูกคำนวณใหม่โดย job: หน้าแคตตาล็อกต้องไม่ตอบ 304
+        with self.captureOnCommitCallbacks(execute=True):
+            recommendations.rebuild()
+        self.assertEqual(self.client.get("/member/home/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_book_change_invalidates_catalog_and_admin_table(self):
+        self.login(90000001, is_admin=True)
+        etag = self.client.get("/manage/")["ETag"]
+        self.assertEqual(self.client.get("/manage/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        old_updated_at = self.book.updated_at
+        self.book.title = "Django Deeper Dive"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.save()
+        self.assertGreater(self.book.updated_at, old_updated_at)
+
+        response = self.client.get("/manage/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Django Deeper Dive")
+
+    def test_history_changes_after_return(self):
+        self.login(self.member.ssid)
+        etag = self.client.get("/member/history/")["ETag"]
+        self.assertEqual(self.client.get("/member/history/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        bulk_return([self.tx.tx_id])
+
+        self.assertEqual(self.client.get("/member/history/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_write_inside_transaction_keeps_etag_until_commit(self):
+        book = Book.objects.create(book_id=10002, title="SQLite Internals", author="B", category="Technology",
+                                   location="A2")
+        self.login(self.member.ssid)
+        etags = {url: self.client.get(url)["ETag"] for url in ("/member/home/", "/member/history/")}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                checkout(self.member, book)
+                # คำขอที่มาก่อน commit ต้องไม่ได้ ETag ใหม่ ไม่เช่นนั้น browser จะได้ 304 กับหน้าเก่าไปตลอด
+                # (ตรวจเฉพาะแคตตาล็อกที่ ETag มาจาก version ล้วน ๆ: history_state อ่านฐานข้อมูลด้วย
+                # ซึ่งใน test เป็น connection เดียวกับ transaction จึงเห็นข้อมูลที่ยังไม่ commit)
+                response = self.client.get("/member/home/", HTTP_IF_NONE_MATCH=etags["/member/home/"])
+                self.assertEqual(response.status_code, 304)
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(self.client.get("/member/history/"), "SQLite Internals")
+
+    def test_pending_messages_skip_conditional_response(self):
+        self.login(90000001, is_admin=True)
+        etag = self.client.get("/manage/")["ETag"]
+
+        # ลบไม่สำเร็จ (ยังถูกยืมอยู่) -> มีข้อความ error แต่ข้อมูลไม่เปลี่ยน
+        self.client.get(f"/manage/delete/{self.book.book_id}/")
+        response = self.client.get("/manage/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "ไม่สามารถลบ")
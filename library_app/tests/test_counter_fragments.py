@@ -0,0 +1,64 @@
+from django.test import TestCase
+
+from library_app.models import Book, BorrowTransaction, Member
+
+FRAGMENT = {'X-Fragment': '1'}
+
+
+class CounterFragmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(ssid=10000001, full_name="Reader", email="r@test.com", phone_number="08")
+        for book_id in (1001, 1002):
+            Book.objects.create(book_id=book_id, title=f"Book {book_id}", author="A", category="Science", location="A1")
+
+    def setUp(self):
+        session = self.client.session
+        session["member_id"], session["is_admin"] = 90000001, True
+        session.save()
+
+    def borrow(self, book_id, key):
+        form = {'ssid': '10000001', 'book_id': str(book_id), 'duration': '7', 'idempotency_key': key}
+        return self.client.post("/borrow/", form, headers=FRAGMENT)
+
+    def test_borrow_returns_message_fragment_and_next_key(self):
+        response = self.borrow(1001, 'page-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Fragment'], '1')
+        self.assertContains(response, "ทำรายการสำเร็จ")
+        self.assertNotContains(response, "<html")
+        self.assertTrue(response['X-Next-Idempotency-Key'])
+
+        # ข้อความไม่ค้างไปแสดงซ้ำเมื่อโหลดหน้าเต็มครั้งถัดไป
+        self.assertNotContains(self.client.get("/borrow/"), "ทำรายการสำเร็จ")
+        self.assertContains(self.borrow(1001, 'page-1'), "ทำรายการสำเร็จ")
+        self.assertContains(self.borrow(1002, 'page-1'), "ถูกใช้กับรายการอื่นไปแล้ว")
+        self.assertEqual(BorrowTransaction.objects.count(), 1)
+
+    def test_return_swaps_row_and_lookup_swaps_panel(self):
+        self.borrow(1001, 'a')
+        self.borrow(1002, 'b')
+        panel = self.client.get("/record/", {'ssid': 10000001}, headers=FRAGMENT)
+        self.assertContains(panel, 'id="member-panel"')
+        self.assertContains(panel, "2 Active Borrows")
+        self.assertNotContains(panel, "<html")
+        self.assertIn('X-Fragment', panel['Vary'])
+        self.assertContains(self.client.get("/record/", {'ssid': 99999999}, headers=FRAGMENT), "ไม่พบรหัสสมาชิก")
+
+        tx = BorrowTransaction.objects.get(book_id=1001)
+        row = self.client.post(f"/record/{tx.tx_id}/process/", {'idempotency_key': 'r-1'}, headers=FRAGMENT)
+        self.assertContains(row, f'id="tx-{tx.tx_id}"')
+        self.assertContains(row, "รับคืนเรียบร้อยแล้ว")
+        self.assertNotContains(row, "<form")
+
+        panel = self.client.post("/record/member/10000001/return-all/", {'idempotency_key': 'r-all'}, headers=FRAGMENT)
+        self.assertContains(panel, "0 Active Borrows")
+        self.assertContains(panel, "รับคืนเรียบร้อยแล้ว 1 เล่ม")
+
+    def test_without_header_keeps_full_pages(self):
+        form = {'ssid': '10000001', 'book_id': '1001', 'duration': '7', 'idempotency_key': 'x'}
+        self.assertRedirects(self.client.post("/borrow/", form), "/borrow/")
+        page = self.client.get("/record/", {'ssid': 10000001})
+        self.assertContains(page, "<html")
+        self.assertContains(page, 'id="member-panel"')
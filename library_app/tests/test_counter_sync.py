@@ -0,0 +1,94 @@
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from library_app.models import Book, BorrowTransaction, CirculationEvent, Member
+from library_app.sync import MAX_ITEMS
+
+
+class CounterSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(ssid=10000001, full_name="Reader", email="r@test.com", phone_number="08")
+        for book_id in (1001, 1002):
+            Book.objects.create(book_id=book_id, title=f"Book {book_id}", author="A", category="Science", location="A1")
+
+    def setUp(self):
+        cache.clear()
+        session = self.client.session
+        session["member_id"], session["is_admin"] = 90000001, True
+        session.save()
+
+    def sync(self, items):
+        return self.client.post("/counter/sync/", json.dumps({'items': items}), content_type='application/json')
+
+    def test_applies_batch_in_order_with_per_item_conflicts(self):
+        items = [
+            {'id': 'a', 'op': 'borrow', 'ssid': 10000001, 'book_id': 1001, 'days': 3},
+            {'id': 'b', 'op': 'borrow', 'ssid': 10000001, 'book_id': 1001},
+            {'id': 'c', 'op': 'return', 'book_id': 1001},
+            {'id': 'd', 'op': 'return', 'book_id': 1002},
+            {'id': 'e', 'op': 'borrow', 'ssid': 99999999, 'book_id': 1002},
+        ]
+        response = self.sync(items)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['id'] for result in results], ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual([result['ok'] for result in results], [True, False, True, False, False])
+        self.assertIn("ไม่พร้อมให้ยืม", results[1]['error'])
+
+        tx = BorrowTransaction.objects.get()
+        self.assertEqual((results[0]['tx_id'], results[2]['tx_id']), (tx.tx_id, tx.tx_id))
+        self.assertEqual(tx.status, 'RETURNED')
+        self.assertEqual(tx.due_date - tx.start_date, timedelta(days=3))
+
+    def test_catalog_fragment_reflects_batch(self):
+        self.assertContains(self.client.get("/manage/"), "AVAILABLE", count=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sync([
+                {'id': 'a', 'op': 'borrow', 'ssid': 10000001, 'book_id': 1001},
+                {'id': 'b', 'op': 'borrow', 'ssid': 10000001, 'book_id': 1002},
+            ])
+
+        response = self.client.get("/manage/")
+        self.assertContains(response, "BORROWED", count=2)
+        self.assertNotContains(response, "AVAILABLE")
+
+    def test_resent_batch_replays_results(self):
+        items = [{'id': 'scan-1', 'op': 'borrow', 'ssid': 10000001, 'book_id': 1001}]
+        first = self.sync(items).json()
+        self.assertEqual(self.sync(items).json(), first)
+        self.assertEqual(BorrowTransaction.objects.count(), 1)
+        self.assertEqual(CirculationEvent.objects.filter(kind='CHECKOUT').count(), 1)
+
+        # id เดิมแต่รายการไม่ตรงกัน: ผิดพลาดเฉพาะรายการนั้น
+        result = self.sync([{**items[0], 'book_id': 1002}]).json()['results'][0]
+        self.assertFalse(result['ok'])
+
+    def test_scanned_at_and_invalid_items(self):
+        scanned_at = timezone.now() - timedelta(hours=2)
+        results = self.sync([
+            {'id': 'a', 'op': 'borrow', 'ssid': 10000001, 'book_id': 1001, 'scanned_at': scanned_at.isoformat()},
+            {'id': 'b', 'op': 'renew', 'book_id': 1001},
+            {'id': 'c', 'op': 'borrow', 'ssid': 'abc', 'book_id': 1002},
+            {'id': 'd', 'op': 'borrow', 'ssid': 10000001, 'book_id': 1002, 'days': 0},
+            {'id': 'e', 'op': 'return', 'book_id': 1001, 'scanned_at': '2020-01-01T00:00:00+00:00'},
+            {'op': 'return', 'book_id': 1001},
+            'junk',
+        ]).json()['results']
+        self.assertEqual([result['ok'] for result in results], [True] + [False] * 6)
+        self.assertEqual(BorrowTransaction.objects.get().start_date, scanned_at)
+
+    def test_requires_admin_post_and_item_list(self):
+        self.assertEqual(self.client.get("/counter/sync/").status_code, 405)
+        self.assertEqual(self.client.post("/counter/sync/", "nope", content_type='application/json').status_code, 400)
+        self.assertEqual(self.sync([{'id': str(i)} for i in range(MAX_ITEMS + 1)]).status_code, 400)
+
+        self.client.session.flush()
+        self.client.cookies.clear()
+        self.assertEqual(self.sync([]).status_code, 403)
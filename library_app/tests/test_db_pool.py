@@ -0,0 +1,86 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3 import base as sqlite_base
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from library_app import metrics
+from library_app.db_backends.pool import PooledConnectionMixin, record_reuse
+
+
+class PooledWrapper(PooledConnectionMixin, sqlite_base.DatabaseWrapper):
+    pass
+
+
+class PooledConnectionMetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        metrics.reset()
+        # SQLite แบบ in-memory จะไม่ถูกปิดจริง จึงใช้ไฟล์ชั่วคราวแทน
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        settings_dict = {
+            **connection.settings_dict, 'NAME': os.path.join(self.tmp_dir.name, 'pool.sqlite3'),
+            'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': True,
+        }
+        self.wrapper = PooledWrapper(settings_dict, alias='pooled')
+
+    def tearDown(self):
+        self.wrapper.close()
+        self.tmp_dir.cleanup()
+
+    def test_persistent_connection_is_reused_between_requests(self):
+        for _ in range(3):
+            # หนึ่ง request: close_old_connections ทำงานทั้งตอนเริ่มและจบ แต่นับการใช้ซ้ำเฉพาะตอนเริ่ม
+            self.wrapper.close_if_unusable_or_obsolete()
+            record_reuse([self.wrapper])
+            with self.wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            self.wrapper.close_if_unusable_or_obsolete()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['db.connections_opened{alias=pooled}'], 1)
+        self.assertEqual(snapshot['counters']['db.connections_reused{alias=pooled}'], 2)
+        self.assertEqual(snapshot['gauges']['db.pool_size{alias=pooled}'], 1)
+        self.assertEqual(snapshot['timings']['db.connect_seconds{alias=pooled}']['count'], 1)
+
+    def test_close_updates_pool_size(self):
+        self.wrapper.ensure_connection()
+        self.wrapper.close()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['db.connections_closed{alias=pooled}'], 1)
+        self.assertEqual(snapshot['gauges']['db.pool_size{alias=pooled}'], 0)
+
+
+class SqliteProductionPragmaTests(SimpleTestCase):
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000})
+    def test_pragmas_applied_on_new_connection(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settings_dict = {**connection.settings_dict, 'NAME': os.path.join(tmp_dir, 'tuned.sqlite3')}
+            wrapper = sqlite_base.DatabaseWrapper(settings_dict, alias='tuned')
+            try:
+                with wrapper.cursor() as cursor:
+                    self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+                    self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+                    self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+            finally:
+                wrapper.close()
+
+
+class MetricsViewTests(TestCase):
+
+    def test_metrics_requires_admin(self):
+        response = self.client.get('/metrics/')
+        self.assertRedirects(response, '/')
+
+    def test_metrics_returns_json_for_admin(self):
+        session = self.client.session
+        session['member_id'] = 90000001
+        session['is_admin'] = True
+        session.save()
+
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('counters', response.json())
@@ -0,0 +1,59 @@
+import json
+
+from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+
+from library_app.models import Member, Book, BorrowTransaction
+
+
+class TransactionExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(
+            ssid=10000001, full_name="Member A", email="a@test.com", phone_number="0811111111",
+        )
+        cls.book_1 = Book.objects.create(
+            book_id=2001, title="Django for Beginners", author="William",
+            category="Technology", location="A1", status="BORROWED",
+        )
+        cls.book_2 = Book.objects.create(
+            book_id=2002, title="Python Advanced", author="John",
+            category="Technology", location="A2", status="AVAILABLE",
+        )
+        now = timezone.now()
+        BorrowTransaction.objects.create(
+            member=cls.member, book=cls.book_1, due_date=now + timedelta(days=7), status="ACTIVE",
+        )
+        BorrowTransaction.objects.create(
+            member=cls.member, book=cls.book_2, due_date=now - timedelta(days=2),
+            returned_at=now - timedelta(days=3), status="RETURNED",
+        )
+
+    def setUp(self):
+        session = self.client.session
+        session["member_id"] = 90000001
+        session["is_admin"] = True
+        session.save()
+
+    def test_export_requires_admin(self):
+        self.client.cookies.clear()
+        response = self.client.get("/transaction/export/")
+        self.assertRedirects(response, "/")
+
+    def test_csv_export_streams_all_rows(self):
+        response = self.client.get("/transaction/export/?format=csv")
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(lines[0].split(",")[0], "tx_id")
+        self.assertEqual(len(lines), 3)
+
+    def test_jsonl_export_respects_filters(self):
+        response = self.client.get("/transaction/export/?format=jsonl&status=RETURNED&q=Python")
+        records = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["book_title"], "Python Advanced")
+        self.assertEqual(records[0]["status"], "RETURNED")
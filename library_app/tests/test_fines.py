@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from unittest import mock
+
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from library_app.circulation import accrued_fines, bulk_return, sweep_overdue
+from library_app.fines import FinePolicy
+from library_app.models import Member, Book, BorrowTransaction
+
+# วันจันทร์ที่ 2 มี.ค. 2026 เวลา 10:00 UTC
+MONDAY = datetime(2026, 3, 2, 10, 0, tzinfo=dt_timezone.utc)
+
+
+class FinePolicyTests(SimpleTestCase):
+
+    def test_default_policy_matches_legacy_ten_baht_per_full_day(self):
+        policy = FinePolicy()
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(days=3, hours=5)), Decimal('30.00'))
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(hours=23)), Decimal('0.00'))
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY - timedelta(days=2)), Decimal('0.00'))
+
+    def test_grace_days_and_cap(self):
+        policy = FinePolicy(daily_rate=10, grace_days=2, max_fine=50)
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(days=2)), Decimal('0.00'))
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(days=4)), Decimal('20.00'))
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(days=30)), Decimal('50.00'))
+
+    def test_category_rates(self):
+        policy = FinePolicy(daily_rate=10, category_rates={'Reference': 25})
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(days=2), 'Reference'), Decimal('50.00'))
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(days=2), 'Fiction'), Decimal('20.00'))
+
+    def test_closed_days_are_not_charged(self):
+        # ปิดวันอาทิตย์ และวันหยุดพิเศษวันพุธที่ 4 มี.ค.
+        policy = FinePolicy(daily_rate=10, closed_weekdays=[6], closed_dates=['2026-03-04'])
+        # เกินกำหนด 7 วัน (อ. ถึง จ.) หักวันพุธและวันอาทิตย์ เหลือ 5 วัน
+        self.assertEqual(policy.fine_for(MONDAY, MONDAY + timedelta(days=7)), Decimal('50.00'))
+
+    def test_vectorized_matches_scalar(self):
+        policy = FinePolicy(daily_rate=10, grace_days=1, max_fine=200, closed_weekdays=[6],
+                            category_rates={'Science': 15})
+        rng = np.random.default_rng(7)
+        due = [MONDAY + timedelta(days=int(d), hours=int(h)) for d, h in zip(rng.integers(0, 60, 200), rng.integers(0, 24, 200))]
+        returned = [d + timedelta(days=int(late), hours=int(h)) for d, late, h in zip(due, rng.integers(-3, 40, 200), rng.integers(0, 24, 200))]
+        categories = rng.choice(['Science', 'History'], 200)
+
+        vectorized = policy.fines_for(due, returned, categories)
+        scalar = [float(policy.fine_for(d, r, c)) for d, r, c in zip(due, returned, categories)]
+        np.testing.assert_allclose(vectorized, scalar)
+
+
+class CirculationFineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(
+            ssid=10000001, full_name="Member A", email="a@test.com", phone_number="0811111111",
+        )
+        now = timezone.now()
+        cls.books = [
+            Book.objects.create(book_id=2001 + i, title=f"Book {i}", author="A", category="Science",
+                                location="A1", status="BORROWED")
+            for i in range(3)
+        ]
+        cls.txs = [
+            BorrowTransaction.objects.create(member=cls.member, book=book, due_date=now - timedelta(days=i * 2, hours=1))
+            for i, book in enumerate(cls.books)
+        ]
+
+    def test_sweep_marks_overdue_and_accrues_fines(self):
+        self.assertEqual(sweep_overdue(), 3)
+        fines = dict(BorrowTransaction.objects.values_list('tx_id', 'fine_amount'))
+        self.assertEqual([fines[tx.tx_id] for tx in self.txs], [Decimal('0.00'), Decimal('20.00'), Decimal('40.00')])
+        self.assertEqual(BorrowTransaction.objects.filter(status='OVERDUE').count(), 3)
+        self.assertEqual(accrued_fines(), Decimal('60.00'))
+
+    def test_sweep_batches_stay_within_parameter_limit(self):
+        self.assertEqual(sweep_overdue(batch_size=1), 3)
+        with mock.patch.object(connection.features, 'max_query_params', 12):
+            BorrowTransaction.objects.update(status='ACTIVE', fine_amount=0)
+            self.assertEqual(sweep_overdue(), 3)
+        self.assertEqual(accrued_fines(), Decimal('60.00'))
+
+    def test_bulk_return_frees_books(self):
+        returned = bulk_return([tx.tx_id for tx in self.txs])
+
+        self.assertEqual(len(returned), 3)
+        self.assertFalse(BorrowTransaction.objects.exclude(status='RETURNED').exists())
+        self.assertFalse(Book.objects.exclude(status='AVAILABLE').exists())
+        self.assertEqual(sum(tx.fine_amount for tx in returned), Decimal('60.00'))
+
+    def test_process_return_uses_policy(self):
+        session = self.client.session
+        session["member_id"] = 90000001
+        session["is_admin"] = True
+        session.save()
+
+        self.client.post(f"/record/{self.txs[2].tx_id}/process/")
+        tx = BorrowTransaction.objects.get(tx_id=self.txs[2].tx_id)
+        self.assertEqual(tx.status, 'RETURNED')
+        self.assertEqual(tx.fine_amount, Decimal('40.00'))
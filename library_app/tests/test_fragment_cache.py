@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from library_app.caching import CATALOG, get_version, history
+from library_app.circulation import bulk_return, checkout
+from library_app.models import Member, Book, BorrowTransaction
+from library_app.routers import ReplicaRouter, _current_replica
+
+
+class CatalogFragmentCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = Member.objects.create(ssid=10000001, full_name="Alice", email="a@test.com", phone_number="0811111111")
+        cls.bob = Member.objects.create(ssid=10000002, full_name="Bob", email="b@test.com", phone_number="0822222222")
+        cls.book = Book.objects.create(book_id=10001, title="Django Deep Dive", author="A", category="Technology",
+                                       location="A1")
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, member, is_admin=False):
+        session = self.client.session
+        session["member_id"] = member.ssid
+        session["is_admin"] = is_admin
+        session.save()
+
+    def test_grid_is_cached_but_header_is_per_member(self):
+        self.login(self.alice)
+        first = self.client.get("/member/home/")
+        self.assertContains(first, "Welcome, Alice")
+        self.assertContains(first, "Django Deep Dive")
+
+        self.login(self.bob)
+        # เหลือเฉพาะ query ของ session, member และรายการยืมล่าสุด (grid และจำนวนหนังสือมาจาก cache)
+        with self.assertNumQueries(3):
+            second = self.client.get("/member/home/")
+        self.assertContains(second, "Welcome, Bob")
+        self.assertContains(second, "Django Deep Dive")
+
+    # ใช้ "default" เป็น replica: query ทำงานได้ตามปกติ แต่ตรวจได้ว่าอ่านจาก replica หรือ primary
+    @override_settings(DATABASE_REPLICAS=['default'], REPLICA_STICKY_SECONDS=30)
+    def test_shared_fragments_are_filled_from_primary(self):
+        book_reads = []
+
+        def db_for_read(router, model, **hints):
+            if model is Book:
+                book_reads.append(_current_replica.get())
+            return _current_replica.get()
+
+        self.login(self.alice)
+        with mock.patch.object(ReplicaRouter, 'db_for_read', autospec=True, side_effect=db_for_read):
+            self.client.get("/member/home/")
+            # cache ว่าง: grid และจำนวนหนังสืออ่านจาก primary
+            self.assertIn(None, book_reads)
+            book_reads.clear()
+
+            self.client.get("/member/home/")
+            # มีใน cache แล้ว: ส่วนที่เหลือของหน้าอ่านจาก replica ได้
+            self.assertNotIn(None, book_reads)
+
+    def test_book_change_invalidates_grid_and_admin_table(self):
+        self.login(self.alice)
+        self.client.get("/member/home/")
+        version = get_version(CATALOG)
+
+        self.book.title = "Django Deeper Dive"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.save()
+
+        self.assertNotEqual(get_version(CATALOG), version)
+        self.assertContains(self.client.get("/member/home/"), "Django Deeper Dive")
+        self.login(self.bob, is_admin=True)
+        self.assertContains(self.client.get("/manage/"), "Django Deeper Dive")
+
+    def test_bulk_return_bumps_catalog_version(self):
+        self.book.status = "BORROWED"
+        self.book.save()
+        tx = BorrowTransaction.objects.create(member=self.alice, book=self.book)
+        catalog, loans = get_version(CATALOG), get_version(history(self.alice.ssid))
+
+        # เหมือน _counter_once: run_once ครอบ bulk_return ด้วย transaction อีกชั้น
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                bulk_return([tx.tx_id])
+                self.assertEqual((get_version(CATALOG), get_version(history(self.alice.ssid))), (catalog, loans))
+
+        self.assertNotEqual(get_version(CATALOG), catalog)
+        self.assertNotEqual(get_version(history(self.alice.ssid)), loans)
+
+    def test_checkout_bumps_versions_only_after_commit(self):
+        catalog, loans = get_version(CATALOG), get_version(history(self.alice.ssid))
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                checkout(self.alice, self.book)
+                # ยังไม่ commit: คำขออื่นยังเห็นหนังสือว่าง จึงต้องยังใช้ version เดิม
+                self.assertEqual((get_version(CATALOG), get_version(history(self.alice.ssid))), (catalog, loans))
+        self.assertNotEqual(get_version(CATALOG), catalog)
+        self.assertNotEqual(get_version(history(self.alice.ssid)), loans)
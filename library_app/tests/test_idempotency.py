@@ -0,0 +1,108 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from library_app.api import issue_token
+from library_app.idempotency import IdempotencyError, purge_expired, request_hash, run_once
+from library_app.models import Book, BorrowTransaction, CirculationEvent, IdempotencyKey, Member
+
+
+class RunOnceTests(TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+    def action(self):
+        self.calls += 1
+        return 201, {'call': self.calls}
+
+    def test_replays_stored_result(self):
+        fingerprint = request_hash('borrow', {'book_id': 1})
+        self.assertEqual(run_once('counter:1', 'k1', fingerprint, self.action), (201, {'call': 1}, False))
+        self.assertEqual(run_once('counter:1', 'k1', fingerprint, self.action), (201, {'call': 1}, True))
+        self.assertEqual(self.calls, 1)
+
+        # key เดียวกันแต่คนละผู้ส่ง / ไม่มี key = คำขอใหม่
+        run_once('counter:2', 'k1', fingerprint, self.action)
+        run_once('counter:1', '', fingerprint, self.action)
+        run_once('counter:1', '', fingerprint, self.action)
+        self.assertEqual(self.calls, 4)
+
+        with self.assertRaises(IdempotencyError):
+            run_once('counter:1', 'k1', request_hash('borrow', {'book_id': 2}), self.action)
+
+    def test_failed_action_and_expired_key_run_again(self):
+        def broken():
+            raise RuntimeError('network')
+
+        with self.assertRaises(RuntimeError):
+            run_once('device:1', 'k', 'h', broken)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        run_once('device:1', 'k', 'h', self.action)
+        later = timezone.now() + timedelta(days=2)
+        self.assertEqual(run_once('device:1', 'k', 'h', self.action, now=later), (201, {'call': 2}, False))
+
+    def test_purge_in_batches(self):
+        now = timezone.now()
+        IdempotencyKey.objects.bulk_create(
+            [IdempotencyKey(key=f'old:{i}', request_hash='h', expires_at=now - timedelta(hours=1)) for i in range(5)]
+            + [IdempotencyKey(key='live', request_hash='h', expires_at=now + timedelta(hours=1))]
+        )
+        self.assertEqual(purge_expired(batch_size=2, now=now), 5)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['live'])
+
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 0 expired', out.getvalue())
+
+
+class CounterIdempotencyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(ssid=10000001, full_name="Reader", email="r@test.com", phone_number="08")
+        cls.book = Book.objects.create(book_id=1001, title="Data Science", author="A", category="Science", location="A1")
+
+    def setUp(self):
+        session = self.client.session
+        session["member_id"], session["is_admin"] = 90000001, True
+        session.save()
+
+    def test_resent_borrow_and_return_forms(self):
+        form = {'ssid': '10000001', 'book_id': '1001', 'duration': '7', 'idempotency_key': 'page-1'}
+        first = self.client.post("/borrow/", form, follow=True)
+        again = self.client.post("/borrow/", form, follow=True)
+        self.assertEqual(BorrowTransaction.objects.count(), 1)
+        for response in (first, again):
+            self.assertContains(response, "ทำรายการสำเร็จ")
+        # หน้าใหม่ได้ key ใหม่: ยืมเล่มเดิมซ้ำจึงได้ข้อความจากการตรวจสอบตามปกติ
+        self.assertContains(self.client.post("/borrow/", {**form, 'idempotency_key': 'page-2'}, follow=True),
+                            "ไม่พร้อมให้ยืม")
+
+        tx = BorrowTransaction.objects.get()
+        for _ in range(2):
+            response = self.client.post(f"/record/{tx.tx_id}/process/", {'idempotency_key': f'page-3-{tx.tx_id}'},
+                                        follow=True)
+            self.assertContains(response, "รับคืนเรียบร้อยแล้ว")
+        self.assertEqual(CirculationEvent.objects.filter(kind='RETURN').count(), 1)
+
+    def test_scanner_retry(self):
+        _, token = issue_token("Front counter")
+        headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'scan-42'}
+
+        def post(body):
+            return self.client.post("/api/checkout/", json.dumps(body), content_type='application/json', headers=headers)
+
+        first = post({'ssid': 10000001, 'book_id': 1001})
+        again = post({'ssid': 10000001, 'book_id': 1001})
+        self.assertEqual((first.status_code, again.status_code), (201, 201))
+        self.assertEqual(first.json(), again.json())
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertEqual(BorrowTransaction.objects.count(), 1)
+
+        self.assertEqual(post({'ssid': 10000001, 'book_id': 1001, 'days': 3}).status_code, 422)
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from library_app import jobs, metrics
+from library_app.circulation import checkout
+from library_app.models import Member, Book, BookNeighbors, Job
+
+CALLS = []
+
+
+@jobs.task('tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.task('tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_BASE_SECONDS=10, JOBS_RETRY_MAX_SECONDS=25)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+        metrics.reset()
+
+    def test_enqueue_stores_job_and_deduplicates_by_key(self):
+        job = jobs.enqueue('tests.record', key='summary', value=1)
+        self.assertEqual((job.status, job.kwargs), ('QUEUED', {'value': 1}))
+        self.assertIsNone(jobs.enqueue('tests.record', key='summary', value=2))
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(CALLS, [])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(jobs.enqueue('tests.record', value=7))
+            self.assertEqual(CALLS, [])
+        self.assertEqual((CALLS, Job.objects.count()), ([7], 0))
+
+    def test_claim_orders_by_priority_and_skips_future_jobs(self):
+        low = jobs.enqueue('tests.record', value='low')
+        high = jobs.enqueue('tests.record', priority=5, value='high')
+        jobs.enqueue('tests.record', run_at=timezone.now() + timedelta(minutes=5), value='later')
+
+        claimed = jobs.claim(10)
+        self.assertEqual([job.pk for job in claimed], [high.pk, low.pk])
+        self.assertTrue(all(job.status == 'RUNNING' and job.locked_by for job in claimed))
+        self.assertEqual(jobs.claim(10), [])
+
+    @mock.patch('socket.gethostname', return_value='ip-10-0-1-23.ap-southeast-1.compute.internal')
+    def test_claim_token_fits_column_with_long_hostname(self, _):
+        jobs.enqueue('tests.record', value='x')
+        [job] = jobs.claim(1)
+        self.assertLessEqual(len(job.locked_by), Job._meta.get_field('locked_by').max_length)
+
+    def test_success_records_timing_metrics(self):
+        jobs.enqueue('tests.record', value='x')
+        job = jobs.execute(jobs.claim(1)[0])
+
+        self.assertEqual((job.status, job.attempts, CALLS), ('DONE', 1, ['x']))
+        self.assertIsNotNone(job.duration)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['jobs_completed{job=tests.record}'], 1)
+        self.assertEqual(snapshot['timings']['job_seconds{job=tests.record}']['count'], 1)
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        jobs.enqueue('tests.fail')
+        before = timezone.now()
+        job = jobs.execute(jobs.claim(1)[0])
+        self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        job = jobs.execute(jobs.claim(1, now=job.run_at)[0])
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+        self.assertEqual([jobs.backoff(n) for n in (1, 2, 3)], [10, 20, 25])
+
+    @override_settings(JOBS_LEASE_SECONDS=60)
+    def test_stale_running_jobs_are_requeued(self):
+        past = timezone.now() - timedelta(minutes=5)
+        jobs.enqueue('tests.record', run_at=past, value=1)
+        jobs.claim(1, now=past)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get().status, 'QUEUED')
+
+
+# ฐานข้อมูลทดสอบ SQLite แบบ in-memory (shared cache) ล็อกระดับตารางโดยไม่รอ busy_timeout
+# จึงใช้ thread เดียวใน worker (ฐานข้อมูลไฟล์แบบ WAL ใช้หลาย thread ได้ตามปกติ)
+@override_settings(JOBS_EAGER=False)
+class JobWorkerTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        CALLS.clear()
+
+    def test_worker_drains_queue(self):
+        for value in range(6):
+            jobs.enqueue('tests.record', value=value)
+
+        self.assertEqual(jobs.run_worker(concurrency=1, burst=True), 6)
+        self.assertEqual(sorted(CALLS), list(range(6)))
+        self.assertEqual(Job.objects.filter(status='DONE').count(), 6)
+
+    def test_checkout_moves_recommendation_update_to_worker(self):
+        member = Member.objects.create(ssid=10000001, full_name="Member", email="m@test.com", phone_number="08")
+        first = Book.objects.create(book_id=10001, title="First", author="A", category="Science", location="A1")
+        second = Book.objects.create(book_id=10002, title="Second", author="A", category="Science", location="A1")
+        checkout(member, first)
+        checkout(member, second)
+        self.assertFalse(BookNeighbors.objects.exists())
+
+        jobs.run_worker(concurrency=1, burst=True)
+        self.assertEqual(BookNeighbors.objects.get(book=second).neighbors, [[first.book_id, 1]])
@@ -0,0 +1,140 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from library_app import journal
+from library_app.circulation import CheckoutError, bulk_return, checkout, return_loan, sweep_overdue
+from library_app.models import (
+    Member, Book, CirculationEvent, DailyCirculation, MemberCirculationStats, ProjectorCheckpoint,
+)
+
+
+# projection ถูกเรียกเองในแต่ละ test จึงไม่ให้คิวงานทำแบบ eager ระหว่างยืม-คืน
+@override_settings(JOURNAL_SETTLE_SECONDS=0, JOBS_EAGER=False)
+class CirculationJournalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.members = [
+            Member.objects.create(ssid=10000001 + i, full_name=f"Member {i}", email=f"m{i}@test.com", phone_number="08")
+            for i in range(2)
+        ]
+        cls.books = [
+            Book.objects.create(book_id=10001 + i, title=f"Book {i}", author="A", category="Science", location="A1")
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def circulate(self):
+        """ ยืม 4 เล่ม: คืนตรงเวลา 1, คืนช้าหลัง sweep 1 (มีค่าปรับ), คืนพร้อมกัน 1, ค้างไว้ 1 """
+        a, b = self.members
+        started = self.now - timedelta(days=10)
+        on_time = checkout(a, self.books[0], days=14, now=started)
+        late = checkout(a, self.books[1], days=3, now=started)
+        bulk_one = checkout(b, self.books[2], days=14, now=started)
+        checkout(b, self.books[3], days=14, now=started)
+
+        return_loan(on_time, returned_at=self.now - timedelta(days=5))
+        sweep_overdue(now=self.now - timedelta(days=2))
+        return_loan(late, returned_at=self.now)
+        bulk_return([bulk_one.tx_id], returned_at=self.now)
+
+    def projections(self):
+        daily = list(DailyCirculation.objects.order_by('day').values())
+        stats = list(MemberCirculationStats.objects.order_by('member_id').values())
+        return daily, stats
+
+    def test_changes_append_events_in_order(self):
+        self.circulate()
+        kinds = list(CirculationEvent.objects.order_by('pk').values_list('kind', flat=True))
+        self.assertEqual(kinds, [
+            'CHECKOUT', 'CHECKOUT', 'CHECKOUT', 'CHECKOUT',
+            'RETURN', 'STATUS_CHANGE', 'RETURN', 'FINE_ASSESSED', 'RETURN',
+        ])
+        self.assertEqual(CirculationEvent.objects.get(kind='RETURN', book=self.books[1]).payload,
+                         {'previous_status': 'OVERDUE', 'late': True})
+
+    def test_failed_checkout_writes_no_event(self):
+        checkout(self.members[0], self.books[0])
+        with self.assertRaises(CheckoutError):
+            checkout(self.members[1], self.books[0])
+        self.assertEqual(CirculationEvent.objects.count(), 1)
+
+    def test_projectors_build_daily_and_member_tables(self):
+        self.circulate()
+        for projector in journal.PROJECTORS.values():
+            self.assertEqual(journal.project(projector, batch_size=2), 9)
+            self.assertEqual(journal.project(projector), 0)
+
+        a_stats = MemberCirculationStats.objects.get(member=self.members[0])
+        b_stats = MemberCirculationStats.objects.get(member=self.members[1])
+        self.assertEqual((a_stats.checkouts, a_stats.returns, a_stats.open_loans, a_stats.overdue_loans), (2, 2, 0, 0))
+        self.assertEqual((b_stats.checkouts, b_stats.returns, b_stats.open_loans), (2, 1, 1))
+        self.assertGreater(a_stats.fines_total, Decimal('0'))
+
+        today = DailyCirculation.objects.get(day=timezone.localdate(self.now))
+        self.assertEqual((today.returns, today.late_returns), (2, 1))
+        self.assertEqual(today.fines_assessed, a_stats.fines_total)
+        self.assertEqual(sum(DailyCirculation.objects.values_list('checkouts', flat=True)), 4)
+        self.assertEqual(ProjectorCheckpoint.objects.get(name='member_stats').position,
+                         CirculationEvent.objects.order_by('pk').last().pk)
+
+    def test_replay_matches_incremental_projection(self):
+        self.circulate()
+        for projector in journal.PROJECTORS.values():
+            journal.project(projector, batch_size=3)
+        incremental = self.projections()
+
+        for projector in journal.PROJECTORS.values():
+            journal.replay(projector, batch_size=4)
+        self.assertEqual(self.projections(), incremental)
+
+    def test_lag_counts_unprojected_events(self):
+        projector = journal.PROJECTORS['daily_circulation']
+        checkout(self.members[0], self.books[0])
+        checkout(self.members[0], self.books[1])
+        self.assertEqual(journal.lag(projector)['pending'], 2)
+
+        journal.project(projector)
+        lag = journal.lag(projector)
+        self.assertEqual((lag['pending'], lag['lag_seconds']), (0, 0.0))
+        self.assertEqual(lag['position'], lag['head'])
+
+    @override_settings(JOURNAL_SETTLE_SECONDS=60)
+    def test_recent_events_wait_for_settle_window(self):
+        projector = journal.PROJECTORS['member_stats']
+        checkout(self.members[0], self.books[0])
+        self.assertEqual(journal.project(projector), 0)
+        self.assertEqual(journal.project(projector, now=timezone.now() + timedelta(seconds=61)), 1)
+
+    @override_settings(JOURNAL_SETTLE_SECONDS=60, JOBS_EAGER=True)
+    def test_eager_checkout_is_projected_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout(self.members[0], self.books[0])
+        self.assertEqual(MemberCirculationStats.objects.get(member=self.members[0]).checkouts, 1)
+        self.assertEqual(journal.lag(journal.PROJECTORS['member_stats'])['pending'], 0)
+
+    def test_backfill_from_existing_loans_matches_live_journal(self):
+        self.circulate()
+        for projector in journal.PROJECTORS.values():
+            journal.project(projector)
+        live = self.projections()
+
+        CirculationEvent.objects.all().delete()
+        self.assertEqual(journal.backfill(), 9)
+        with self.assertRaises(ValueError):
+            journal.backfill()
+        for projector in journal.PROJECTORS.values():
+            journal.replay(projector)
+
+        daily, stats = self.projections()
+        self.assertEqual(stats, live[1])
+        # backfill ใช้กำหนดคืนเป็นวันที่เปลี่ยนเป็น OVERDUE จึงเทียบเฉพาะยอดรวม
+        self.assertEqual(sum(row['checkouts'] for row in daily), 4)
+        self.assertEqual(sum(row['fines_assessed'] for row in daily), sum(row['fines_assessed'] for row in live[0]))
@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from library_app import metrics
+from library_app.models import Member
+from library_app.throttle import TokenBucket
+
+THROTTLE = {
+    'ssid': {'capacity': 3, 'refill_seconds': 60, 'lockout_seconds': 300},
+    'ip': {'capacity': 5, 'refill_seconds': 10, 'lockout_seconds': 60},
+}
+
+
+class TokenBucketTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_capacity_then_lockout_then_refill(self):
+        bucket = TokenBucket('test', capacity=2, refill_seconds=10, lockout_seconds=30)
+        self.assertEqual([bucket.consume('a', now=0), bucket.consume('a', now=0)], [0, 0])
+        self.assertEqual(bucket.consume('a', now=1), 30)
+        # ระหว่างล็อกปฏิเสธทุกครั้ง แม้เวลาผ่านไปพอให้เติมได้แล้ว
+        self.assertEqual(bucket.consume('a', now=21), 10)
+        self.assertEqual(bucket.consume('a', now=31), 0)
+        self.assertEqual(bucket.consume('b', now=1), 0)
+
+@override_settings(LOGIN_THROTTLE=THROTTLE, LOGIN_THROTTLE_ENABLED=True)
+class LoginThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member(ssid=10000001, full_name="Member", email="m@test.com", phone_number="08")
+        cls.member.set_password("secret")
+        cls.member.save()
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def attempt(self, password="wrong", ssid="10000001", ip="10.0.0.1"):
+        return self.client.post("/", {"ssid": ssid, "password": password}, REMOTE_ADDR=ip)
+
+    def test_over_limit_ssid_is_rejected_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.attempt().status_code, 200)
+
+        with mock.patch.object(Member, "check_password") as check_password:
+            response = self.attempt(password="secret", ip="10.0.0.2")
+        check_password.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "300")
+        self.assertContains(response, "พยายามเข้าสู่ระบบบ่อยเกินไป", status_code=429)
+
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters["login_attempts{outcome=wrong_password}"], 3)
+        self.assertEqual(counters["login_throttled{scope=ssid}"], 1)
+
+    def test_ip_limit_covers_many_ssids(self):
+        for offset in range(5):
+            self.assertEqual(self.attempt(ssid=str(20000000 + offset)).status_code, 200)
+        self.assertEqual(self.attempt(ssid="20000099").status_code, 429)
+        # เครื่องอื่นยังเข้าสู่ระบบได้ตามปกติ
+        self.assertEqual(self.attempt(password="secret", ip="10.0.0.9").status_code, 302)
+
+    def test_ssid_variants_share_one_bucket(self):
+        # ทุกแบบค้นหาได้สมาชิกคนเดียวกัน จึงต้องนับรวมกัน (ใช้คนละ IP เพื่อไม่ให้ติดตัวนับของ IP)
+        for ip, ssid in (("10.0.1.1", "010000001"), ("10.0.1.2", "+10000001"), ("10.0.1.3", " 10000001 ")):
+            self.assertEqual(self.attempt(ssid=ssid, ip=ip).status_code, 200)
+        self.assertEqual(self.attempt(password="secret", ssid="0010000001", ip="10.0.1.4").status_code, 429)
+
+    def test_non_numeric_ssid_uses_only_ip_bucket(self):
+        with mock.patch.object(Member.objects, "get") as get, mock.patch.object(Member, "check_password") as check:
+            for _ in range(5):
+                self.assertContains(self.attempt(ssid="abc"), "รหัสสมาชิกต้องเป็นตัวเลขเท่านั้น")
+            self.assertEqual(self.attempt(ssid="abc").status_code, 429)
+        get.assert_not_called()
+        check.assert_not_called()
+        self.assertEqual(metrics.snapshot()["counters"]["login_attempts{outcome=invalid_ssid}"], 5)
+
+    def test_valid_logins_between_guesses_do_not_lift_ip_limit(self):
+        # มีบัญชีของตัวเอง 1 บัญชี: สลับเข้าสู่ระบบจริงกับเดารหัสบัญชีอื่น ต้องยังติดตัวนับของ IP
+        statuses = []
+        for offset in range(3):
+            statuses.append(self.attempt(password="secret").status_code)
+            self.client.logout()
+            statuses.append(self.attempt(ssid=str(20000000 + offset)).status_code)
+        self.assertEqual(statuses, [302, 200, 302, 200, 302, 429])
+
+    def test_successful_login_resets_ssid_bucket(self):
+        self.attempt()
+        self.attempt()
+        # พิมพ์ 0 นำหน้า: ล้าง bucket เดียวกับที่ใช้ตอนตรวจ
+        self.assertEqual(self.attempt(password="secret", ssid="010000001").status_code, 302)
+        self.client.logout()
+        self.client.session.flush()
+        for ip in ("10.0.0.3", "10.0.0.4", "10.0.0.5"):
+            self.assertEqual(self.attempt(ip=ip).status_code, 200)
+
+    @override_settings(LOGIN_THROTTLE_ENABLED=False)
+    def test_can_be_disabled(self):
+        for _ in range(6):
+            self.assertEqual(self.attempt().status_code, 200)
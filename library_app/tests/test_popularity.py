@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from library_app import popularity
+from library_app.circulation import bulk_return, checkout
+from library_app.models import Member, Book, CategoryPopularity
+
+
+@override_settings(POPULARITY_HALF_LIFE_DAYS=14)
+class PopularityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(ssid=10000001, full_name="Member", email="m@test.com", phone_number="08")
+        cls.old = Book.objects.create(book_id=10001, title="Old Hit", author="A", category="History", location="A1")
+        cls.new = Book.objects.create(book_id=10002, title="New Hit", author="A", category="Science", location="A1")
+        cls.quiet = Book.objects.create(book_id=10003, title="Quiet", author="A", category="Science", location="A1")
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def borrow(self, book, days_ago):
+        when = self.now - timedelta(days=days_ago)
+        tx = checkout(self.member, book, now=when)
+        bulk_return([tx.tx_id], returned_at=when + timedelta(days=1))
+
+    def borrow_history(self):
+        # Old Hit: 3 ครั้งเมื่อ 2 เดือนก่อน / New Hit: 2 ครั้งเมื่อวาน
+        for _ in range(3):
+            self.borrow(self.old, days_ago=60)
+        for _ in range(2):
+            self.borrow(self.new, days_ago=1)
+
+    def test_recent_loans_outrank_older_more_frequent_loans(self):
+        self.borrow_history()
+        self.old.refresh_from_db()
+        self.new.refresh_from_db()
+
+        self.assertEqual((self.old.borrow_count, self.new.borrow_count), (3, 2))
+        self.assertGreater(self.new.popularity, self.old.popularity)
+        # 14 วันผ่านไป = น้ำหนักครึ่งหนึ่ง
+        self.assertAlmostEqual(
+            popularity.weight(self.now - timedelta(days=14), self.now) / popularity.weight(self.now, self.now), 0.5,
+        )
+
+    def test_category_scores_follow_book_scores(self):
+        self.borrow_history()
+        science = CategoryPopularity.objects.get(category="Science")
+        history = CategoryPopularity.objects.get(category="History")
+
+        self.assertEqual((science.borrow_count, history.borrow_count), (2, 3))
+        self.assertEqual([c.category for c in popularity.trending_categories()], ["Science", "History"])
+
+    def test_renormalize_keeps_ranking_and_ratios(self):
+        self.borrow_history()
+        before = dict(Book.objects.values_list('book_id', 'popularity'))
+
+        popularity.renormalize(self.now + timedelta(days=28))
+        after = dict(Book.objects.values_list('book_id', 'popularity'))
+
+        self.assertAlmostEqual(after[self.new.pk] / after[self.old.pk], before[self.new.pk] / before[self.old.pk])
+        self.assertEqual(after[self.quiet.pk], 0)
+        self.assertEqual(popularity.current_epoch().epoch, self.now + timedelta(days=28))
+
+    def test_rebuild_matches_incremental_scores(self):
+        self.borrow_history()
+        # ย้าย epoch ให้ตรงกับเวลาที่ rebuild ใช้ แล้วเทียบคะแนนที่ได้จากการยืมทีละครั้ง
+        popularity.renormalize(self.now)
+        incremental = dict(Book.objects.values_list('book_id', 'popularity'))
+        categories = dict(CategoryPopularity.objects.values_list('category', 'popularity'))
+
+        popularity.rebuild(self.now)
+
+        for book_id, score in Book.objects.values_list('book_id', 'popularity'):
+            self.assertAlmostEqual(score, incremental[book_id])
+        for category, score in CategoryPopularity.objects.values_list('category', 'popularity'):
+            self.assertAlmostEqual(score, categories[category])
+        self.assertEqual(Book.objects.get(pk=self.old.pk).borrow_count, 3)
+
+    def test_member_home_sort_orders(self):
+        self.borrow_history()
+        session = self.client.session
+        session["member_id"] = self.member.ssid
+        session["is_admin"] = False
+        session.save()
+
+        def titles(sort):
+            response = self.client.get("/member/home/", {"sort": sort})
+            return [book.title for book in response.context["book_list"]]
+
+        self.assertEqual(titles("trending"), ["New Hit", "Old Hit", "Quiet"])
+        self.assertEqual(titles("popular"), ["Old Hit", "New Hit", "Quiet"])
+        self.assertEqual(titles("bogus"), ["Old Hit", "New Hit", "Quiet"])
+        response = self.client.get("/member/home/", {"sort": "trending"})
+        self.assertContains(response, "Trending categories")
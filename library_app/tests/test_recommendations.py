@@ -0,0 +1,75 @@
+import random
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from library_app import recommendations
+from library_app.circulation import CheckoutError, bulk_return, checkout
+from library_app.models import Member, Book, BookNeighbors, CoBorrowCount
+
+
+class RecommendationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.members = [
+            Member.objects.create(ssid=10000001 + i, full_name=f"Member {i}", email=f"m{i}@test.com", phone_number="08")
+            for i in range(6)
+        ]
+        cls.books = [
+            Book.objects.create(book_id=10001 + i, title=f"Book {i}", author="A", category="Science", location="A1")
+            for i in range(8)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def borrow_and_return(self, member, book):
+        # งาน eager ทำหลัง commit: ให้ callback ของ on_commit ทำงานเหมือนคำขอจริง
+        with self.captureOnCommitCallbacks(execute=True):
+            tx = checkout(member, book)
+            bulk_return([tx.tx_id])
+        book.refresh_from_db()
+
+    def test_checkout_rejects_unavailable_book(self):
+        checkout(self.members[0], self.books[0])
+        with self.assertRaises(CheckoutError):
+            checkout(self.members[1], self.books[0])
+
+    def test_incremental_updates_match_bulk_rebuild(self):
+        rng = random.Random(3)
+        for _ in range(40):
+            self.borrow_and_return(rng.choice(self.members), rng.choice(self.books))
+
+        incremental_pairs = set(CoBorrowCount.objects.filter(count__gt=0).values_list('book_id', 'other_id', 'count'))
+        incremental_top = dict(BookNeighbors.objects.values_list('book_id', 'neighbors'))
+
+        recommendations.rebuild()
+
+        self.assertEqual(set(CoBorrowCount.objects.values_list('book_id', 'other_id', 'count')), incremental_pairs)
+        self.assertEqual(dict(BookNeighbors.objects.values_list('book_id', 'neighbors')), incremental_top)
+
+    def test_repeat_borrow_is_counted_once_per_member(self):
+        a, b = self.books[0], self.books[1]
+        self.borrow_and_return(self.members[0], a)
+        self.borrow_and_return(self.members[0], b)
+        self.borrow_and_return(self.members[0], b)
+
+        self.assertEqual(CoBorrowCount.objects.get(book=a, other=b).count, 1)
+        self.assertEqual(BookNeighbors.objects.get(book=b).neighbors, [[a.book_id, 1]])
+
+    def test_member_home_shows_also_borrowed_panel(self):
+        for member in self.members[:3]:
+            self.borrow_and_return(member, self.books[0])
+            self.borrow_and_return(member, self.books[1])
+        self.borrow_and_return(self.members[3], self.books[2])
+        self.borrow_and_return(self.members[3], self.books[0])
+
+        session = self.client.session
+        session["member_id"] = self.members[3].ssid
+        session["is_admin"] = False
+        session.save()
+        response = self.client.get("/member/home/")
+
+        self.assertContains(response, 'Readers who borrowed "Book 0" also borrowed')
+        self.assertEqual([book.title for book in response.context["also_borrowed"]], ["Book 1", "Book 2"])
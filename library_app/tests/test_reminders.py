@@ -0,0 +1,111 @@
+import time
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from library_app.models import Member, Book, BorrowTransaction, ReminderLog
+from library_app.reminders import Throttle, pending_reminders, send_reminders
+
+
+class CountingBackend(locmem.EmailBackend):
+    """ locmem ที่นับจำนวนครั้งที่เปิด connection และจำลองอีเมลที่ส่งไม่ได้ """
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if any(address.startswith('bounce') for message in messages for address in message.to):
+            raise ConnectionError('rejected')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='library_app.tests.test_reminders.CountingBackend',
+                   REMINDER_DUE_SOON_DAYS=2, REMINDER_RATE_PER_SECOND=0)
+class ReminderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.alice = Member.objects.create(ssid=10000001, full_name="Alice", email="alice@test.com", phone_number="08")
+        cls.bob = Member.objects.create(ssid=10000002, full_name="Bob", email="bob@test.com", phone_number="08")
+        books = [
+            Book.objects.create(book_id=10001 + i, title=f"Book {i}", author="A", category="Science", location="A1")
+            for i in range(5)
+        ]
+
+        def loan(member, book, due_in_days, status='ACTIVE'):
+            return BorrowTransaction.objects.create(
+                member=member, book=book, start_date=cls.now - timedelta(days=7),
+                due_date=cls.now + timedelta(days=due_in_days), status=status,
+            )
+
+        cls.overdue = loan(cls.alice, books[0], -3, status='OVERDUE')
+        cls.due_soon = loan(cls.alice, books[1], 1)
+        cls.bob_due_soon = loan(cls.bob, books[2], 1.5)
+        loan(cls.bob, books[3], 10)
+        loan(cls.bob, books[4], -1, status='RETURNED')
+
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def test_one_email_per_member_with_all_loans(self):
+        stats = send_reminders(now=self.now)
+
+        self.assertEqual(stats, {'members': 2, 'loans': 3, 'sent': 2, 'failed': 0})
+        alice = next(message for message in mail.outbox if message.to == ["alice@test.com"])
+        self.assertIn("เลยกำหนดคืน 1 เล่ม", alice.subject)
+        self.assertIn("Book 0", alice.body)
+        self.assertIn("Book 1", alice.body)
+        self.assertEqual(alice.alternatives[0][1], "text/html")
+        self.assertNotIn("Book 3", "".join(message.body for message in mail.outbox))
+
+    def test_rerun_does_not_send_again_until_loan_becomes_overdue(self):
+        send_reminders(now=self.now)
+        self.assertEqual(send_reminders(now=self.now)['sent'], 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+        # 2 วันต่อมา: รายการ "ใกล้ถึงกำหนด" กลายเป็นเลยกำหนด จึงได้รับแจ้งอีกประเภทหนึ่ง
+        later = self.now + timedelta(days=2)
+        self.assertEqual(send_reminders(now=later)['loans'], 2)
+        self.assertEqual(
+            set(ReminderLog.objects.filter(kind='OVERDUE').values_list('tx_id', flat=True)),
+            {self.overdue.tx_id, self.due_soon.tx_id, self.bob_due_soon.tx_id},
+        )
+
+    def test_reuses_one_connection_per_batch(self):
+        Member.objects.bulk_create([
+            Member(ssid=20000001 + i, full_name=f"M{i}", email=f"m{i}@test.com", phone_number="08") for i in range(5)
+        ])
+        for i, member in enumerate(Member.objects.filter(ssid__gte=20000001)):
+            book = Book.objects.create(book_id=20001 + i, title=f"Extra {i}", author="A", category="X", location="B")
+            BorrowTransaction.objects.create(member=member, book=book, due_date=self.now - timedelta(days=1))
+
+        stats = send_reminders(now=self.now, batch_size=3)
+        self.assertEqual(stats['sent'], 7)
+        self.assertEqual(CountingBackend.opened, 3)
+
+    def test_failed_email_is_retried_on_next_run(self):
+        Member.objects.filter(pk=self.bob.pk).update(email="bounce@test.com")
+        with self.assertLogs('library_app.reminders', 'ERROR'):
+            self.assertEqual(send_reminders(now=self.now)['failed'], 1)
+        self.assertFalse(ReminderLog.objects.filter(member=self.bob).exists())
+
+        Member.objects.filter(pk=self.bob.pk).update(email="bob@test.com")
+        self.assertEqual(send_reminders(now=self.now)['sent'], 1)
+
+    def test_dry_run_sends_nothing(self):
+        stats = send_reminders(now=self.now, dry_run=True)
+        self.assertEqual((stats['members'], stats['sent']), (2, 0))
+        self.assertEqual((len(mail.outbox), pending_reminders(self.now).count()), (0, 3))
+
+    def test_throttle_limits_rate(self):
+        throttle = Throttle(200)
+        start = time.perf_counter()
+        for _ in range(11):
+            throttle.wait()
+        self.assertGreaterEqual(time.perf_counter() - start, 10 / 200)
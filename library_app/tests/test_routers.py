@@ -0,0 +1,61 @@
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import router
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+
+from library_app.models import Member, Book, BorrowTransaction
+from library_app.routers import PRIMARY_PIN_SESSION_KEY, replica_reads, use_replica
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=30)
+class ReplicaRouterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(
+            ssid=10000001, full_name="Member A", email="a@test.com", phone_number="0811111111",
+        )
+        cls.book = Book.objects.create(
+            book_id=2001, title="Django for Beginners", author="William",
+            category="Technology", location="A1", status="BORROWED",
+        )
+        cls.tx = BorrowTransaction.objects.create(
+            member=cls.member, book=cls.book, due_date=timezone.now() + timedelta(days=7), status="ACTIVE",
+        )
+
+    def _request(self, **session_data):
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        request.session.update(session_data)
+        return request
+
+    def test_reads_use_primary_outside_replica_block(self):
+        self.assertEqual(router.db_for_read(Book), "default")
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        with use_replica():
+            self.assertEqual(router.db_for_read(Book), "replica1")
+            self.assertEqual(router.db_for_write(Book), "default")
+
+    def test_decorated_view_reads_from_replica(self):
+        @replica_reads
+        def view(request):
+            return router.db_for_read(BorrowTransaction)
+
+        self.assertEqual(view(self._request(member_id=self.member.ssid)), "replica1")
+
+    def test_return_pins_session_and_member_to_primary(self):
+        @replica_reads
+        def view(request):
+            return router.db_for_read(BorrowTransaction)
+
+        session = self.client.session
+        session["member_id"] = 90000001
+        session["is_admin"] = True
+        session.save()
+        self.client.post(f"/record/{self.tx.tx_id}/process/")
+
+        self.assertIn(PRIMARY_PIN_SESSION_KEY, self.client.session)
+        # สมาชิกเจ้าของรายการต้องอ่านจาก primary ด้วย แม้จะใช้ session คนละอัน
+        self.assertEqual(view(self._request(member_id=self.member.ssid)), "default")
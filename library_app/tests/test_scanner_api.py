@@ -0,0 +1,77 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from library_app.api import issue_token
+from library_app.models import Book, BorrowTransaction, Branch, Member, ScannerDevice
+
+
+class ScannerApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.north = Branch.objects.create(code="NORTH", name="สาขาเหนือ")
+        cls.member = Member.objects.create(ssid=10000001, full_name="Reader", email="r@test.com", phone_number="08")
+        cls.book = Book.objects.create(book_id=1001, title="Data Science", author="A", category="Science", location="A1")
+        cls.device, cls.token = issue_token("Front counter", cls.north)
+
+    def call(self, method, url, data=None, token=None):
+        headers = {'Authorization': f'Bearer {token or self.token}'}
+        if method == 'get':
+            return self.client.get(url, headers=headers)
+        return self.client.post(url, json.dumps(data), content_type='application/json', headers=headers)
+
+    def test_requires_active_device_token(self):
+        self.assertEqual(self.client.get("/api/books/1001/").status_code, 401)
+        self.assertEqual(self.call('get', "/api/books/1001/", token="wrong").status_code, 401)
+        self.assertEqual(self.call('post', "/api/books/1001/", {}).status_code, 405)
+
+        ScannerDevice.objects.filter(pk=self.device.pk).update(is_active=False)
+        self.assertEqual(self.call('get', "/api/books/1001/").status_code, 401)
+
+    def test_checkout_lookup_and_return(self):
+        response = self.call('post', "/api/checkout/", {"ssid": 10000001, "book_id": 1001, "days": 3})
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        tx = BorrowTransaction.objects.get()
+        self.assertEqual(body['tx_id'], tx.tx_id)
+        self.assertEqual(body['branch'], 'MAIN')
+        self.assertIn('สาขา MAIN', body['warning'])
+        self.assertEqual(tx.due_date - tx.start_date, timedelta(days=3))
+        self.assertIsNotNone(ScannerDevice.objects.get(pk=self.device.pk).last_seen_at)
+
+        # ยืมซ้ำ: ข้อความเดียวกับหน้าเคาน์เตอร์ ไม่มี redirect
+        response = self.call('post', "/api/checkout/", {"ssid": 10000001, "book_id": 1001})
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("ไม่พร้อมให้ยืม", response.json()['error'])
+
+        self.assertEqual(self.call('get', "/api/books/1001/").json()['status'], 'BORROWED')
+        loans = self.call('get', "/api/members/10000001/").json()['loans']
+        self.assertEqual([loan['tx_id'] for loan in loans], [tx.tx_id])
+
+        BorrowTransaction.objects.filter(pk=tx.pk).update(due_date=timezone.now() - timedelta(days=2))
+        response = self.call('post', "/api/return/", {"book_id": 1001})
+        self.assertEqual(response.json()['status'], 'RETURNED')
+        self.assertGreater(float(response.json()['fine']), 0)
+        self.assertEqual(self.call('post', "/api/return/", {"book_id": 1001}).status_code, 404)
+
+    def test_rejects_bad_input(self):
+        self.assertEqual(self.call('post', "/api/checkout/", {"ssid": "abc", "book_id": 1001}).status_code, 400)
+        self.assertEqual(self.call('post', "/api/checkout/", [1, 2]).status_code, 400)
+        self.assertEqual(self.call('post', "/api/checkout/", {"ssid": 10000001, "book_id": 1001, "days": 0}).status_code, 400)
+        self.assertEqual(self.call('post', "/api/checkout/", {"ssid": 10000001, "book_id": 9999}).status_code, 404)
+        self.assertEqual(self.call('get', "/api/members/99999999/").status_code, 404)
+
+    def test_scanner_token_command(self):
+        out = StringIO()
+        call_command('scanner_token', 'Return desk', '--branch', 'NORTH', stdout=out)
+        token = out.getvalue().strip().splitlines()[-1]
+        self.assertEqual(self.call('get', "/api/books/1001/", token=token).status_code, 200)
+
+        device = ScannerDevice.objects.get(name='Return desk')
+        call_command('scanner_token', '--revoke', str(device.pk), stdout=StringIO())
+        self.assertEqual(self.call('get', "/api/books/1001/", token=token).status_code, 401)
@@ -0,0 +1,112 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from library_app.models import ArchivedTransaction, Book, BorrowTransaction, Member
+from library_app.snapshot import NOT_RETURNED, Snapshot, write_snapshot
+
+
+@override_settings(SNAPSHOT_CHUNK_SIZE=2)
+class TransactionSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now().replace(microsecond=0)
+        cls.member = Member.objects.create(ssid=10000001, full_name="Member", email="m@test.com", phone_number="08")
+        cls.science = Book.objects.create(book_id=1001, title="Physics", author="A", category="Science", location="A1")
+        cls.history = Book.objects.create(book_id=1002, title="Siam", author="B", category="History", location="A2")
+
+        def loan(book, days_ago, returned=True, fine=0):
+            return BorrowTransaction.objects.create(
+                member=cls.member, book=book, start_date=cls.now - timedelta(days=days_ago),
+                due_date=cls.now - timedelta(days=days_ago - 7), fine_amount=Decimal(fine),
+                returned_at=cls.now - timedelta(days=days_ago - 3) if returned else None,
+                status='RETURNED' if returned else 'ACTIVE',
+            )
+
+        cls.returned = loan(cls.science, 30, fine='12.50')
+        cls.active = loan(cls.history, 2, returned=False)
+        cls.latest = loan(cls.science, 1)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name)
+
+    def test_full_export_round_trip(self):
+        stats = write_snapshot(self.path)
+        self.assertEqual(stats, {'rows': 3, 'appended': 3, 'refreshed': 0})
+
+        snapshot = Snapshot(self.path)
+        self.assertIsInstance(snapshot['tx_id'], np.memmap)
+        self.assertEqual(snapshot['tx_id'].tolist(), [self.returned.tx_id, self.active.tx_id, self.latest.tx_id])
+        self.assertEqual(list(snapshot.decode('category')), ['Science', 'History', 'Science'])
+        self.assertEqual(list(snapshot.decode('status')), ['RETURNED', 'ACTIVE', 'RETURNED'])
+        self.assertEqual(list(snapshot.decode('branch')), ['MAIN', 'MAIN', 'MAIN'])
+        self.assertEqual(snapshot['fine_satang'][0], 1250)
+        self.assertEqual(snapshot['start'][0], int(self.returned.start_date.timestamp()))
+        self.assertEqual(snapshot['returned'][1], NOT_RETURNED)
+
+        frame = snapshot.to_frame(['status', 'returned'])
+        self.assertEqual(frame['status'].value_counts()['RETURNED'], 2)
+        self.assertTrue(frame['returned'].isna()[1])
+
+    def test_incremental_append_refreshes_open_loans_in_place(self):
+        write_snapshot(self.path)
+        before = Snapshot(self.path)
+
+        BorrowTransaction.objects.filter(pk=self.active.pk).update(
+            status='RETURNED', returned_at=self.now, fine_amount=Decimal('30'),
+        )
+        newest = BorrowTransaction.objects.create(
+            member=self.member, book=self.history, due_date=self.now + timedelta(days=7),
+        )
+
+        stats = write_snapshot(self.path)
+        self.assertEqual(stats, {'rows': 4, 'appended': 1, 'refreshed': 1})
+        snapshot = Snapshot(self.path)
+        self.assertEqual(snapshot.last_tx_id, newest.tx_id)
+        self.assertEqual(list(snapshot.decode('status')), ['RETURNED', 'RETURNED', 'RETURNED', 'ACTIVE'])
+        self.assertEqual(snapshot['fine_satang'][1], 3000)
+        self.assertEqual(snapshot.dictionaries['status'], ['RETURNED', 'ACTIVE'])
+        # ผู้อ่านที่เปิดไว้ก่อนยังใช้ได้ และเห็นค่าที่เขียนทับในตำแหน่งเดิม
+        self.assertEqual(len(before), 3)
+        self.assertEqual(before['returned'][1], int(self.now.timestamp()))
+
+        self.assertEqual(write_snapshot(self.path), {'rows': 4, 'appended': 0, 'refreshed': 1})
+
+    def test_includes_archive_without_duplicates(self):
+        fields = dict(member=self.member, book_id=self.history.book_id, start_date=self.now - timedelta(days=400),
+                      due_date=self.now - timedelta(days=393), returned_at=self.now - timedelta(days=395))
+        ArchivedTransaction.objects.create(tx_id=self.returned.tx_id, **fields)
+        ArchivedTransaction.objects.create(tx_id=self.latest.tx_id + 10, **fields)
+        ArchivedTransaction.objects.create(tx_id=1_000_000, member=self.member, book_id=9999,
+                                           start_date=self.now, due_date=self.now)
+
+        write_snapshot(self.path)
+        snapshot = Snapshot(self.path)
+        self.assertEqual(snapshot['tx_id'].tolist(),
+                         [self.returned.tx_id, self.active.tx_id, self.latest.tx_id, self.latest.tx_id + 10, 1_000_000])
+        self.assertEqual(list(snapshot.decode('category')), ['History', 'History', 'Science', 'History', ''])
+
+    def test_recovers_from_interrupted_append(self):
+        write_snapshot(self.path)
+        with open(self.path / 'tx_id.bin', 'ab') as handle:
+            handle.write(b'\xff' * 12)
+
+        BorrowTransaction.objects.create(member=self.member, book=self.science, due_date=self.now)
+        write_snapshot(self.path)
+        snapshot = Snapshot(self.path)
+        self.assertEqual(len(snapshot), 4)
+        self.assertEqual((self.path / 'tx_id.bin').stat().st_size, 4 * 8)
+        self.assertTrue(np.all(np.diff(snapshot['tx_id']) > 0))
+
+    def test_full_rebuild_and_empty_snapshot(self):
+        BorrowTransaction.objects.all().delete()
+        self.assertEqual(write_snapshot(self.path, full=True)['rows'], 0)
+        self.assertEqual(len(Snapshot(self.path).to_frame()), 0)
@@ -0,0 +1,38 @@
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from library_app import checks
+
+TEMPLATES_DIR = Path(checks.APP_DIR) / 'templates'
+
+
+class StaticAssetTests(SimpleTestCase):
+
+    def test_templates_do_not_load_assets_from_cdn(self):
+        for template in TEMPLATES_DIR.rglob('*.html'):
+            content = template.read_text(encoding='utf-8')
+            self.assertNotIn('cdn.tailwindcss.com', content, template)
+            self.assertNotIn('cdn.plot.ly', content, template)
+
+    def test_check_warns_when_assets_are_not_built(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(checks, 'STATIC_DIR', Path(tmp)):
+            warnings = checks.check_built_assets(None)
+        self.assertEqual([warning.id for warning in warnings], ['library_app.W001'])
+
+    @skipUnless(shutil.which('tailwindcss'), 'Tailwind CLI is not installed')
+    def test_build_assets_writes_purged_css_and_vendored_plotly(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            static_dir = Path(tmp)
+            with mock.patch('library_app.management.commands.build_assets.STATIC_DIR', static_dir):
+                call_command('build_assets', stdout=io.StringIO())
+
+            css = (static_dir / 'library_app/css/app.css').read_text(encoding='utf-8')
+            self.assertIn('.bg-blue-600', css)       # ใช้ใน templates
+            self.assertNotIn('.bg-lime-900', css)    # ไม่มีใน templates -> ถูกตัดออก
+            self.assertGreater((static_dir / 'library_app/vendor/plotly.min.js').stat().st_size, 1_000_000)
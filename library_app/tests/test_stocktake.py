@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.utils import timezone
+
+from library_app.models import Book, Branch, Member, Stocktake
+from library_app.stocktake import (StocktakeError, add_scans, apply_stocktake, decode_ids, encode_ids, parse_scans,
+                                   reconcile)
+
+
+class StocktakeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.north = Branch.objects.create(code="NORTH", name="สาขาเหนือ")
+        cls.admin = Member.objects.create(ssid=90000001, full_name="Librarian", email="lib@test.com",
+                                          phone_number="08", is_admin=True)
+
+        def book(book_id, status='AVAILABLE', branch='MAIN'):
+            return Book.objects.create(book_id=book_id, title=f"Book {book_id}", author="A", category="X",
+                                       location="A1", status=status, branch_id=branch)
+
+        cls.on_shelf = book(1001)
+        cls.missing = book(1002)
+        cls.lost = book(1003, status='LOST')
+        cls.borrowed = book(1004, status='BORROWED')
+        cls.returned_during_count = book(1005)
+        cls.other_branch = book(2001, branch='NORTH')
+
+    def setUp(self):
+        self.stocktake = Stocktake.objects.create(branch_id='MAIN', started_at=timezone.now() + timedelta(seconds=1))
+        # หนังสือที่ถูกคืนหลังเริ่มตรวจนับ (ยังไม่ได้กลับขึ้นชั้น)
+        Book.objects.filter(pk=1005).update(updated_at=self.stocktake.started_at + timedelta(minutes=5))
+
+    def test_parse_and_compact_storage(self):
+        ids, rejected = parse_scans("1001\n1003, 1001;1004\r\n\nABC 12x 1234567890123456789\n")
+        self.assertEqual(ids.tolist(), [1001, 1003, 1001, 1004])
+        self.assertEqual(rejected, ['ABC', '12x', '1234567890123456789'])
+
+        shelf = np.arange(100_000, 200_000, dtype=np.int64)
+        blob = encode_ids(shelf)
+        self.assertLess(len(blob), shelf.nbytes // 100)
+        np.testing.assert_array_equal(decode_ids(blob), shelf)
+        self.assertEqual(len(decode_ids(b'')), 0)
+
+    def test_scans_accumulate_without_duplicates(self):
+        add_scans(self.stocktake, parse_scans("1003\n1001\n1001")[0])
+        stocktake = add_scans(self.stocktake, parse_scans("1004 1001 2001 999")[0])
+        self.assertEqual(decode_ids(stocktake.scanned).tolist(), [999, 1001, 1003, 1004, 2001])
+        self.assertEqual((stocktake.scanned_count, stocktake.scan_events), (5, 7))
+
+    def test_reconcile_and_apply(self):
+        stocktake = add_scans(self.stocktake, np.array([1001, 1003, 1004, 2001, 999]))
+        findings = {name: ids.tolist() for name, ids in reconcile(stocktake).items()}
+        self.assertEqual(findings, {
+            'confirmed': [1001], 'missing': [1002], 'found': [1003], 'on_loan': [1004],
+            'maintenance': [], 'changed': [1005], 'unknown': [999, 2001],
+        })
+
+        result = apply_stocktake(stocktake)
+        self.assertEqual((result['marked_lost'], result['marked_available']), (1, 1))
+        statuses = dict(Book.objects.values_list('book_id', 'status'))
+        self.assertEqual(statuses, {1001: 'AVAILABLE', 1002: 'LOST', 1003: 'AVAILABLE', 1004: 'BORROWED',
+                                    1005: 'AVAILABLE', 2001: 'AVAILABLE'})
+
+        stocktake.refresh_from_db()
+        self.assertEqual(stocktake.status, 'APPLIED')
+        self.assertEqual(stocktake.result['ids']['missing'], [1002])
+        with self.assertRaises(StocktakeError):
+            apply_stocktake(stocktake)
+        with self.assertRaises(StocktakeError):
+            add_scans(stocktake, np.array([1002]))
+
+    def test_counter_workflow(self):
+        session = self.client.session
+        session["member_id"], session["is_admin"], session["branch"] = 90000001, True, "NORTH"
+        session.save()
+
+        response = self.client.post("/stocktake/")
+        stocktake = Stocktake.objects.get(branch_id="NORTH")
+        self.assertRedirects(response, f"/stocktake/{stocktake.pk}/", fetch_redirect_response=False)
+        self.client.post("/stocktake/")
+        self.assertEqual(Stocktake.objects.filter(branch_id="NORTH").count(), 1)
+
+        scan_file = SimpleUploadedFile("scanner.txt", b"2001\n1001\nXYZ\n")
+        response = self.client.post(f"/stocktake/{stocktake.pk}/", {"scans": "2001", "scan_file": scan_file},
+                                    follow=True)
+        self.assertContains(response, "สแกนแล้วทั้งหมด 2 เล่ม")
+        self.assertContains(response, "XYZ")
+
+        lines = b"".join(self.client.get(f"/stocktake/{stocktake.pk}/report/").streaming_content).decode().splitlines()
+        self.assertEqual(lines, ["book_id,title,location,branch,status,finding", "1001,Book 1001,A1,MAIN,AVAILABLE,unknown"])
+
+        self.client.post(f"/stocktake/{stocktake.pk}/apply/")
+        stocktake.refresh_from_db()
+        self.assertEqual(stocktake.result['counts']['confirmed'], 1)
+        self.assertContains(self.client.get(f"/stocktake/{stocktake.pk}/"), "ปรับสถานะแล้วเมื่อ")
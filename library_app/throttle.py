@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import BigIntegerField
+
+from . import metrics
+
+# ==========================================
+# Login Throttle (token bucket ใน cache ที่ทุก worker ใช้ร่วมกัน)
+# ==========================================
+# ตรวจก่อนค้นหาสมาชิกและก่อน hash รหัสผ่าน (PBKDF2 ใช้ CPU หลายร้อยมิลลิวินาที) คำขอที่เกินจึงถูกปฏิเสธได้ในไม่กี่ไมโครวินาที
+# bucket มี capacity ครั้ง เติม 1 ครั้งทุก refill_seconds เมื่อหมดจะถูกล็อกทั้ง bucket เป็นเวลา lockout_seconds
+# อ่าน-เขียน cache ไม่ atomic: worker ที่ทำงานพร้อมกันอาจได้ครั้งเกินมาเล็กน้อย ซึ่งยอมรับได้สำหรับการกันการเดารหัส
+
+
+class TokenBucket:
+    def __init__(self, scope, capacity, refill_seconds, lockout_seconds):
+        self.scope = scope
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.lockout_seconds = lockout_seconds
+        # หลังจากนี้ bucket เต็มแน่นอน จึงให้ cache ลบ key ทิ้งได้
+        self.timeout = int(lockout_seconds + capacity * refill_seconds) + 1
+
+    @property
+    def cache(self):
+        return caches[settings.LOGIN_THROTTLE_CACHE]
+
+    def key(self, ident):
+        return f'throttle:{self.scope}:{ident}'
+
+    def consume(self, ident, now=None):
+        """ ใช้ 1 ครั้ง: คืนค่า 0 ถ้าอนุญาต หรือจำนวนวินาทีที่ต้องรอถ้าเกินกำหนด """
+        now = time.time() if now is None else now
+        key = self.key(ident)
+        tokens, updated, locked_until = self.cache.get(key) or (self.capacity, now, 0.0)
+        if now < locked_until:
+            return locked_until - now
+
+        tokens = min(self.capacity, tokens + (now - updated) / self.refill_seconds)
+        if tokens < 1:
+            self.cache.set(key, (tokens, now, now + self.lockout_seconds), self.timeout)
+            return self.lockout_seconds
+        self.cache.set(key, (tokens - 1, now, 0.0), self.timeout)
+        return 0
+
+    def reset(self, ident):
+        self.cache.delete(self.key(ident))
+
+
+def bucket(scope):
+    return TokenBucket(scope, **settings.LOGIN_THROTTLE[scope])
+
+
+def client_ip(request):
+    if settings.LOGIN_THROTTLE_TRUST_X_FORWARDED_FOR:
+        # ใช้ค่าสุดท้ายที่ reverse proxy ของเราเติมเข้าไป (ค่าก่อนหน้านั้น client ปลอมได้)
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def parse_ssid(value):
+    """
+    SSID จากฟอร์ม -> int หรือ None ถ้าไม่ใช่ตัวเลข
+    แปลงแบบเดียวกับตอนค้นหาสมาชิก ("010000001", "+10000001" คือบัญชีเดียวกัน) จึงใช้เป็น key ของ bucket ได้
+    """
+    try:
+        ssid = int(value)
+    except (TypeError, ValueError):
+        return None
+    # เกินช่วงของ BigIntegerField ไม่มีสมาชิกแน่นอน (และไม่ให้ key ของ bucket ยาวตามข้อมูลที่ส่งมา)
+    return ssid if abs(ssid) <= BigIntegerField.MAX_BIGINT else None
+
+
+def check_login(request, ssid):
+    """
+    ก่อนตรวจรหัสผ่าน: คืนค่า 0 ถ้าให้ลองได้ หรือจำนวนวินาทีที่ต้องรอ (ตรวจ IP ก่อน SSID)
+    ssid มาจาก parse_ssid: None (ไม่ใช่ตัวเลข) ใช้เฉพาะ bucket ของ IP เพราะจะถูกปฏิเสธโดยไม่ค้นหาสมาชิกอยู่แล้ว
+    """
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return 0
+    for scope, ident in (('ip', client_ip(request)), ('ssid', ssid)):
+        if ident is None:
+            continue
+        retry_after = bucket(scope).consume(ident)
+        if retry_after:
+            metrics.incr('login_throttled', scope=scope)
+            return retry_after
+    return 0
+
+
+def login_succeeded(ssid):
+    """
+    เข้าสู่ระบบสำเร็จ: ล้างตัวนับของ SSID นั้น
+    ตัวนับของ IP คงไว้: ถ้าคืนให้ ผู้ที่มีบัญชีเดียวจะสลับเข้าสู่ระบบของตัวเองกับการเดารหัสบัญชีอื่นได้ไม่จำกัด
+    """
+    if settings.LOGIN_THROTTLE_ENABLED:
+        bucket('ssid').reset(ssid)
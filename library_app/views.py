@@ -1,9 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib import messages
-from .models import Member, Book, BorrowTransaction
+from django.contrib.messages.storage.base import Message
+from .models import DEFAULT_BRANCH, Member, Book, BorrowTransaction, ArchivedTransaction, Branch, Stocktake
 from .forms import MemberRegistrationForm, BookForm
+from .archive import filter_archive, merge_history
+from .exports import EXPORT_FORMATS, csv_lines, export_rows, filter_transactions
+from .routers import pin_to_primary, reading_from_replica, replica_reads, use_primary
+from . import metrics
+from .circulation import OPEN_STATUSES, CheckoutError, accrued_fines, bulk_return, checkout, return_loan
+from .caching import CATALOG, MEMBERS, bump_history_on_commit, fragment_context, fragments_cached
+from .recommendations import also_borrowed
+from .popularity import CATALOG_SORTS, SORT_LABELS, trending_categories
+from .conditional import book_table_state, catalog_state, conditional_page, history_state
+from .throttle import check_login, login_succeeded, parse_ssid
+from .idempotency import IdempotencyError, request_hash, run_once
+from .sync import MAX_ITEMS, apply_batch
+from .branches import branch_counters, counter_branch, set_counter_branch
+from .stocktake import (FINDINGS, REPORT_HEADER, StocktakeError, add_scans, apply_stocktake, discrepancy_rows,
+                        parse_scans, reconcile, summary)
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.cache import patch_vary_headers
+from django.utils.http import url_has_allowed_host_and_scheme
+import json
+import math
+import uuid
+from contextlib import nullcontext
 from django.db.models import Q
 from django.core.paginator import Paginator
 
@@ -23,30 +45,48 @@ def index(request):
             return redirect('member_home')
 
     if request.method == 'POST':
-        ssid_input = request.POST.get('ssid')
+        ssid = parse_ssid(request.POST.get('ssid'))
         password_input = request.POST.get('password')
 
+        # ปฏิเสธคำขอที่ถี่เกินก่อนค้นหาสมาชิกและก่อน hash รหัสผ่าน (กันการเดารหัสจนกิน CPU ทุก worker)
+        retry_after = math.ceil(check_login(request, ssid))
+        if retry_after:
+            metrics.incr('login_attempts', outcome='throttled')
+            messages.error(request, f'⛔ พยายามเข้าสู่ระบบบ่อยเกินไป กรุณาลองใหม่ในอีก {retry_after} วินาที')
+            response = render(request, 'library_app/login.html', status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        if ssid is None:
+            metrics.incr('login_attempts', outcome='invalid_ssid')
+            messages.error(request, 'รหัสสมาชิกต้องเป็นตัวเลขเท่านั้น')
+            return render(request, 'library_app/login.html')
+
         try:
-            member = Member.objects.get(ssid=ssid_input)
+            member = Member.objects.get(ssid=ssid)
             
             if member.check_password(password_input):
+                login_succeeded(member.ssid)
+                metrics.incr('login_attempts', outcome='success')
                 request.session['member_id'] = member.ssid
                 request.session['is_admin'] = member.is_admin
                 request.session['full_name'] = member.full_name
                 
                 if member.is_admin:
+                    # เคาน์เตอร์เริ่มที่สาขาประจำของบรรณารักษ์ (ไม่มีสาขาประจำ = ทุกสาขา)
+                    set_counter_branch(request, member.branch_id)
                     messages.success(request, f'ยินดีต้อนรับ บรรณารักษ์ {member.full_name}')
                     return redirect('admin_dashboard')
                 else:
                     messages.success(request, f'ยินดีต้อนรับ {member.full_name}')
                     return redirect('member_home')
             else:
+                metrics.incr('login_attempts', outcome='wrong_password')
                 messages.error(request, 'รหัสผ่านไม่ถูกต้อง กรุณาลองใหม่อีกครั้ง')
                 
         except Member.DoesNotExist:
+            metrics.incr('login_attempts', outcome='unknown_member')
             messages.error(request, 'ไม่พบรหัสสมาชิกนี้ในระบบ')
-        except ValueError:
-            messages.error(request, 'รหัสสมาชิกต้องเป็นตัวเลขเท่านั้น')
 
     return render(request, 'library_app/login.html')
 
@@ -55,26 +95,73 @@ def logout_view(request):
     messages.info(request, 'ออกจากระบบเรียบร้อยแล้ว')
     return redirect('index')
 
+def switch_branch(request):
+    """ เปลี่ยนสาขาของเคาน์เตอร์ (เก็บใน session) แล้วกลับไปหน้าเดิม """
+    if not request.session.get('is_admin'): return redirect('index')
+
+    if request.method == 'POST':
+        code = request.POST.get('branch', '')
+        if code and not Branch.objects.filter(code=code).exists():
+            messages.error(request, '⚠️ ไม่พบสาขานี้ในระบบ')
+        else:
+            set_counter_branch(request, code)
+
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = 'admin_dashboard'
+    return redirect(next_url)
+
 #==========================================
 # MODULE 2 : MEMBER PORTAL MODULE 
 #==========================================
+@replica_reads
 def member_profile(request, ssid):
     member = get_object_or_404(Member, ssid=ssid)
-    return render(request, 'library_app/user_history.html', {'member': member})
+    include_archive = request.GET.get('archive') == '1'
 
+    transactions = member.transactions.select_related('book').order_by('-start_date')
+    if include_archive:
+        # ดึงประวัติเก่าจาก archive มารวมเฉพาะเมื่อผู้ใช้ขอดูเท่านั้น
+        transactions = merge_history(transactions, ArchivedTransaction.objects.filter(member_id=member.ssid))
+
+    return render(request, 'library_app/user_history.html', {
+        'member': member, 'transactions': transactions, 'include_archive': include_archive,
+    })
+
+@replica_reads
+@conditional_page(catalog_state)
 def member_home(request):
     member_id = request.session.get("member_id")
     if not member_id: return redirect("index")
 
     member = Member.objects.get(ssid=member_id)
-    books = Book.objects.all().order_by("book_id")
+    sort = request.GET.get("sort", "")
+    if sort not in CATALOG_SORTS: sort = ""
+    books = Book.objects.all().order_by(*CATALOG_SORTS[sort])
 
     query = request.GET.get("q")
     if query:
         books = books.filter(Q(title__icontains=query) | Q(category__icontains=query))
 
-    return render(request, "library_app/member/home.html", {"book_list": books, "member": member})
-
+    # "ผู้อ่านยังยืม" จากหนังสือเล่มล่าสุดของสมาชิก (อ่าน top-K ที่คำนวณไว้ ไม่ join ตอน request)
+    last_borrowed = member.transactions.order_by('-start_date').select_related('book').first()
+    also_borrowed_books = also_borrowed(last_borrowed.book_id, limit=6) if last_borrowed else []
+
+    catalog = fragment_context(CATALOG)
+    # fragment ที่ใช้ร่วมกันทุกคนต้อง render จาก primary: replica ที่ยังตามไม่ทันจะทำให้ข้อมูลเก่าค้างใน cache ของ version ใหม่
+    shared = [("catalog_count", [catalog["catalog_version"], request.GET.get("q", "")]),
+              ("catalog_grid", [catalog["catalog_version"], request.GET.get("q", ""), sort])]
+    source = use_primary() if reading_from_replica() and not fragments_cached(*shared) else nullcontext()
+    with source:
+        return render(request, "library_app/member/home.html", {
+            "book_list": books, "member": member, **catalog,
+            "last_borrowed": last_borrowed, "also_borrowed": also_borrowed_books,
+            # queryset แบบ lazy: query เฉพาะตอน render fragment ที่ยังไม่อยู่ใน cache
+            "sort": sort, "sort_options": SORT_LABELS, "trending_categories": trending_categories(),
+        })
+
+@replica_reads
+@conditional_page(history_state)
 def my_history(request):
     member_id = request.session.get("member_id")
     if not member_id: return redirect("index")
@@ -101,7 +188,9 @@ def manage_users(request):
     else:
         members = Member.objects.all().order_by('-created_at')
 
-    return render(request, 'library_app/users/list.html', {'members': members, 'query': query})
+    return render(request, 'library_app/users/list.html', {
+        'members': members, 'query': query, **fragment_context(MEMBERS),
+    })
 
 def create_user(request):
     if not request.session.get('is_admin'): return redirect('index')
@@ -140,16 +229,21 @@ def edit_user(request, ssid):
 # ==========================================
 # Module 4: Book Management (Admin Only)
 # ==========================================
+@conditional_page(book_table_state)
 def manage_books(request):
     if not request.session.get('is_admin'): return redirect('index')
 
     query = request.GET.get('q', '')
+    branch = counter_branch(request)
+    books = Book.objects.in_branch(branch)
     if query:
-        books = Book.objects.filter(title__icontains=query) | Book.objects.filter(book_id__icontains=query)
+        books = books.filter(Q(title__icontains=query) | Q(book_id__icontains=query))
     else:
-        books = Book.objects.all().order_by('-book_id')
+        books = books.order_by('-book_id')
 
-    return render(request, 'library_app/manage/book_list.html', {'books': books, 'query': query})
+    return render(request, 'library_app/manage/book_list.html', {
+        'books': books, 'query': query, 'branch': branch, **fragment_context(CATALOG),
+    })
 
 def create_book(request):
     if not request.session.get('is_admin'): return redirect('index')
@@ -164,7 +258,7 @@ def create_book(request):
             messages.success(request, f'เพิ่มหนังสือสำเร็จ! รหัสหนังสือคือ {new_book.book_id}')
             return redirect('manage_books')
     else:
-        form = BookForm()
+        form = BookForm(initial={'branch': counter_branch(request) or DEFAULT_BRANCH})
         
     return render(request, 'library_app/manage/book_form.html', {'form': form, 'action': 'Add'})
 
@@ -187,10 +281,13 @@ def delete_book(request, book_id):
     if not request.session.get('is_admin'): return redirect('index')
 
     book = get_object_or_404(Book, book_id=book_id)
-    if book.transactions.filter(status='ACTIVE').exists():
+    if book.transactions.filter(status__in=OPEN_STATUSES).exists():
         messages.error(request, f'ไม่สามารถลบ "{book.title}" ได้ เนื่องจากหนังสือกำลังถูกยืมอยู่!')
     else:
+        member_ids = list(book.transactions.values_list('member_id', flat=True).distinct())
         book.delete()
+        ArchivedTransaction.objects.filter(book_id=book_id).delete()
+        bump_history_on_commit(member_ids)
         messages.success(request, f'ลบหนังสือ "{book.title}" เรียบร้อยแล้ว')
         
     return redirect('manage_books')
@@ -198,82 +295,181 @@ def delete_book(request, book_id):
 # ==========================================
 # Module 5: Borrow Creation
 # ==========================================
+def wants_fragment(request):
+    """ fetch จาก fragments.js: ตอบเฉพาะส่วนที่เปลี่ยน (แถว / ข้อความ) แทน redirect แล้ว render ทั้งหน้า """
+    return request.headers.get('X-Fragment') == '1'
+
+def render_fragment(request, template, context, next_key=False):
+    response = render(request, template, context)
+    response['X-Fragment'] = '1'
+    if next_key:
+        # ฟอร์มที่ยังอยู่บนหน้าต้องได้ key ใหม่สำหรับรายการถัดไป
+        response['X-Next-Idempotency-Key'] = uuid.uuid4().hex
+    patch_vary_headers(response, ['X-Fragment'])
+    return response
+
+def _counter_once(request, action, params, perform, fallback, fragment=None):
+    """
+    ทำรายการยืม-คืนของเคาน์เตอร์ครั้งเดียวต่อ idempotency_key ของฟอร์ม (กดซ้ำ / ส่งซ้ำตอนเครือข่ายค้าง)
+    perform() คืนค่า {'messages': [[level, text], ...], 'redirect': url} คำขอซ้ำแสดงผลเดิมโดยไม่ทำรายการอีก
+    ถ้าเป็นคำขอ fragment จะเรียก fragment(ข้อความ) แทน redirect
+    """
+    try:
+        _, result, _ = run_once(
+            f"counter:{request.session.get('member_id')}", request.POST.get('idempotency_key', ''),
+            request_hash(action, params), lambda: (302, perform()),
+        )
+    except IdempotencyError as error:
+        result = {'messages': [[messages.ERROR, str(error)]], 'redirect': fallback}
+
+    if fragment is not None and wants_fragment(request):
+        return fragment([Message(level, text) for level, text in result['messages']])
+    for level, text in result['messages']:
+        messages.add_message(request, level, text)
+    return redirect(result['redirect'])
+
 def borrow_counter(request):
     if not request.session.get('is_admin'): return redirect('index')
 
     if request.method == 'POST':
-        ssid_input = request.POST.get('ssid')
-        book_id_input = request.POST.get('book_id')
-        duration_days = int(request.POST.get('duration', 7))
-
-        try:
-            member = Member.objects.get(ssid=ssid_input)
-            book = Book.objects.get(book_id=book_id_input)
-
-            if book.status != 'Available':
-                messages.error(request, f'❌ หนังสือ "{book.title}" ไม่พร้อมให้ยืม')
-                return redirect('borrow_counter')
-
-            if BorrowTransaction.objects.filter(book=book, status='ACTIVE').exists():
-                messages.error(request, f'❌ หนังสือ "{book.title}" กำลังถูกยืมอยู่!')
-                return redirect('borrow_counter')
-
-            due_date = timezone.now() + timedelta(days=duration_days)
-            BorrowTransaction.objects.create(member=member, book=book, due_date=due_date, status='ACTIVE')
-            
-            book.status = 'BORROWED'
-            book.save()
-
-            messages.success(request, f'✅ ทำรายการสำเร็จ! {member.full_name} ยืม "{book.title}"')
-            return redirect('borrow_counter')
-
-        except (Member.DoesNotExist, Book.DoesNotExist, ValueError):
-            messages.error(request, '⚠️ ข้อมูลไม่ถูกต้อง หรือไม่พบในระบบ')
-
-    return render(request, 'library_app/borrow/create_tx.html')
+        params = {name: request.POST.get(name) for name in ('ssid', 'book_id', 'duration')}
+
+        def perform():
+            try:
+                duration_days = int(params['duration'] or 7)
+                member = Member.objects.get(ssid=params['ssid'])
+                book = Book.objects.get(book_id=params['book_id'])
+            except (Member.DoesNotExist, Book.DoesNotExist, ValueError):
+                return {'messages': [[messages.ERROR, '⚠️ ข้อมูลไม่ถูกต้อง หรือไม่พบในระบบ']], 'redirect': 'borrow_counter'}
+
+            try:
+                checkout(member, book, days=duration_days)
+            except CheckoutError as error:
+                return {'messages': [[messages.ERROR, str(error)]], 'redirect': 'borrow_counter'}
+            pin_to_primary(request, member.ssid)
+
+            result = [[messages.SUCCESS, f'✅ ทำรายการสำเร็จ! {member.full_name} ยืม "{book.title}"']]
+            branch = counter_branch(request)
+            if branch and book.branch_id != branch:
+                result.append([messages.WARNING, f'📍 หนังสือเล่มนี้เป็นของสาขา {book.branch_id} (รายการยืมนับเป็นของสาขานั้น)'])
+            return {'messages': result, 'redirect': 'borrow_counter'}
+
+        return _counter_once(
+            request, 'borrow', params, perform, fallback='borrow_counter',
+            fragment=lambda result: render_fragment(
+                request, 'library_app/borrow/_messages.html', {'messages': result}, next_key=True),
+        )
+
+    return render(request, 'library_app/borrow/create_tx.html', {'idempotency_key': uuid.uuid4().hex})
 
 # ==========================================
 # Module 6: Return Processing
 # ==========================================
+def _member_panel(member_ssid):
+    """ ข้อมูลสมาชิกและรายการที่ยังไม่คืน -> (member, active_txs) โดย member เป็น None ถ้าไม่พบ """
+    member = Member.objects.filter(ssid=member_ssid).first()
+    if member is None:
+        return None, []
+    return member, member.transactions.filter(status__in=OPEN_STATUSES).select_related('book').order_by('start_date')
+
 def return_counter(request):
     if not request.session.get('is_admin'): return redirect('index')
 
     query_ssid = request.GET.get('ssid', '')
-    member = None
-    active_txs = []
-
+    member, active_txs = None, []
     if query_ssid:
         try:
-            member = Member.objects.get(ssid=query_ssid)
-            active_txs = member.transactions.filter(status='ACTIVE').order_by('start_date')
-        except Member.DoesNotExist:
+            member, active_txs = _member_panel(int(query_ssid))
+        except ValueError:
+            pass
+        if member is None:
             messages.error(request, '⚠️ ไม่พบรหัสสมาชิก (SSID) นี้ในระบบ')
 
-    return render(request, 'library_app/borrow/record.html', {'member': member, 'active_txs': active_txs, 'query_ssid': query_ssid})
+    context = {'member': member, 'active_txs': active_txs, 'query_ssid': query_ssid, 'idempotency_key': uuid.uuid4().hex}
+    if wants_fragment(request):
+        return render_fragment(request, 'library_app/borrow/_member_panel.html', context)
+    return render(request, 'library_app/borrow/record.html', context)
 
 def process_return(request, tx_id):
     if not request.session.get('is_admin'): return redirect('index')
 
     tx = get_object_or_404(BorrowTransaction, tx_id=tx_id)
-    
-    if tx.status == 'ACTIVE':
-        tx.returned_at = timezone.now()
-        tx.status = 'RETURNED'
-        tx.book.status = 'AVAILABLE'
-        tx.book.save()
-        
-        if tx.returned_at > tx.due_date:
-            overdue_days = (tx.returned_at - tx.due_date).days
-            tx.fine_amount = overdue_days * 10.00 if overdue_days > 0 else 0
-                
-        tx.save()
-        
-        if tx.fine_amount > 0:
-            messages.error(request, f'⚠️ รับคืนแล้ว (มีค่าปรับ {tx.fine_amount} บาท!)')
+    back = f"/record/?ssid={tx.member_id}"
+
+    def perform():
+        result = []
+        if tx.status in OPEN_STATUSES:
+            returned = return_loan(tx)
+            pin_to_primary(request, returned.member_id)
+
+            if returned.fine_amount > 0:
+                result.append([messages.ERROR, f'⚠️ รับคืนแล้ว (มีค่าปรับ {returned.fine_amount} บาท!)'])
+            else:
+                result.append([messages.SUCCESS, f'✅ รับคืนเรียบร้อยแล้ว'])
+        return {'messages': result, 'redirect': back}
+
+    def fragment(result):
+        # แทนที่เฉพาะแถวของรายการนี้ (แสดงผลการรับคืนในแถว)
+        row = BorrowTransaction.objects.select_related('book').get(pk=tx.pk)
+        return render_fragment(request, 'library_app/borrow/_loan_row.html', {
+            'tx': row, 'messages': result, 'idempotency_key': uuid.uuid4().hex,
+        })
+
+    return _counter_once(request, 'return', {'tx_id': tx_id}, perform, fallback=back, fragment=fragment)
+
+def process_bulk_return(request, ssid):
+    """ รับคืนหนังสือทุกเล่มที่สมาชิกยืมอยู่ในครั้งเดียว """
+    if not request.session.get('is_admin'): return redirect('index')
+
+    back = f"/record/?ssid={ssid}"
+    if request.method != 'POST':
+        return redirect(back)
+    member = get_object_or_404(Member, ssid=ssid)
+
+    def perform():
+        tx_ids = list(member.transactions.filter(status__in=OPEN_STATUSES).values_list('tx_id', flat=True))
+        returned = bulk_return(tx_ids)
+        pin_to_primary(request, member.ssid)
+
+        total_fine = sum(tx.fine_amount for tx in returned)
+        if total_fine > 0:
+            result = [[messages.ERROR, f'⚠️ รับคืนแล้ว {len(returned)} เล่ม (มีค่าปรับรวม {total_fine} บาท!)']]
+        elif returned:
+            result = [[messages.SUCCESS, f'✅ รับคืนเรียบร้อยแล้ว {len(returned)} เล่ม']]
         else:
-            messages.success(request, f'✅ รับคืนเรียบร้อยแล้ว')
-            
-    return redirect(f"/record/?ssid={tx.member.ssid}")
+            result = []
+        return {'messages': result, 'redirect': back}
+
+    def fragment(result):
+        _, active_txs = _member_panel(member.ssid)
+        return render_fragment(request, 'library_app/borrow/_member_panel.html', {
+            'member': member, 'active_txs': active_txs, 'messages': result, 'idempotency_key': uuid.uuid4().hex,
+        })
+
+    return _counter_once(request, 'bulk_return', {'ssid': ssid}, perform, fallback=back, fragment=fragment)
+
+# ==========================================
+# Module 6b: Offline Counter Sync (คิวสแกนจากหน้ายืม/คืน)
+# ==========================================
+def counter_sync(request):
+    """ {"items": [{"id", "op": "borrow"|"return", "book_id", "ssid", "days", "scanned_at"}, ...]} -> ผลรายรายการ """
+    if not request.session.get('is_admin'):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    if request.method != 'POST':
+        response = JsonResponse({'error': 'method not allowed'}, status=405)
+        response['Allow'] = 'POST'
+        return response
+    try:
+        items = json.loads(request.body or b'{}').get('items')
+    except (ValueError, AttributeError):
+        items = None
+    if not isinstance(items, list) or len(items) > MAX_ITEMS:
+        return JsonResponse({'error': f'items must be a list of at most {MAX_ITEMS} scans'}, status=400)
+
+    results = apply_batch(items, f"counter:{request.session.get('member_id')}", branch=counter_branch(request))
+    if any(result.get('ok') for result in results):
+        pin_to_primary(request)
+    return JsonResponse({'results': results}, json_dumps_params={'ensure_ascii': False})
 
 # ==========================================
 # Module 7: Transaction History
@@ -283,14 +479,38 @@ def transaction_history(request):
 
     query = request.GET.get('q', '')
     status_filter = request.GET.get('status', '')
-    txs = BorrowTransaction.objects.all().order_by('-start_date')
+    include_archive = request.GET.get('archive') == '1'
+    branch = counter_branch(request)
+    txs = BorrowTransaction.objects.in_branch(branch).select_related('member', 'book').order_by('-start_date')
+    txs = filter_transactions(txs, query, status_filter)
 
-    if query:
-        txs = txs.filter(Q(member__ssid__icontains=query) | Q(book__book_id__icontains=query) | Q(book__title__icontains=query))
-    if status_filter:
-        txs = txs.filter(status=status_filter)
+    if include_archive:
+        archived = filter_archive(ArchivedTransaction.objects.in_branch(branch), query, status_filter)
+        txs = merge_history(txs, archived)
 
-    return render(request, 'library_app/transaction/list.html', {'transactions': txs, 'query': query, 'status_filter': status_filter})
+    return render(request, 'library_app/transaction/list.html', {
+        'transactions': txs, 'query': query, 'status_filter': status_filter, 'include_archive': include_archive,
+    })
+
+def transaction_export(request):
+    """ ดาวน์โหลดประวัติธุรกรรมทั้งหมด (CSV/JSONL) แบบ streaming ตามตัวกรองเดียวกับหน้า History """
+    if not request.session.get('is_admin'): return redirect('index')
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+    to_lines, content_type = EXPORT_FORMATS[export_format]
+
+    rows = export_rows(
+        query=request.GET.get('q', ''),
+        status_filter=request.GET.get('status', ''),
+        include_archive=request.GET.get('archive') == '1',
+        branch=counter_branch(request),
+    )
+    response = StreamingHttpResponse(to_lines(rows), content_type=content_type)
+    filename = f"transactions-{timezone.now():%Y%m%d-%H%M}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 # ==========================================
 # Module 8: Admin Settings
@@ -323,18 +543,22 @@ def change_password(request):
 # ==========================================
 # Module 9: Admin Dashboard (Data Visualization with Pandas)
 # ==========================================
+@replica_reads
 def admin_dashboard(request):
     """ หน้า Dashboard ดึงข้อมูลจากฐานข้อมูลจริงมาทำกราฟด้วย Pandas/Plotly """
     if not request.session.get('is_admin'):
         return redirect('index')
 
+    # สมาชิกใช้ได้ทุกสาขา ส่วนหนังสือ/รายการยืมนับเฉพาะสาขาของเคาน์เตอร์
+    branch = counter_branch(request)
     total_members = Member.objects.filter(is_admin=False).count()
-    total_books   = Book.objects.count()
-    active_borrows  = BorrowTransaction.objects.filter(status='ACTIVE').count()
-    overdue_count   = BorrowTransaction.objects.filter(status='OVERDUE').count()
+    total_books   = Book.objects.in_branch(branch).count()
+    active_borrows  = BorrowTransaction.objects.in_branch(branch).filter(status='ACTIVE').count()
+    overdue_count   = BorrowTransaction.objects.in_branch(branch).filter(status='OVERDUE').count()
+    fines_accrued   = accrued_fines(branch=branch)
 
     overdue_transactions = (
-        BorrowTransaction.objects
+        BorrowTransaction.objects.in_branch(branch)
         .filter(status='OVERDUE')
         .select_related('member', 'book')
         .order_by('due_date')
@@ -343,7 +567,7 @@ def admin_dashboard(request):
     # ----------------------------------------------------
     # ส่วนทำ Data Visualization จากฐานข้อมูลจริง (20 Records)
     # ----------------------------------------------------
-    txs = BorrowTransaction.objects.select_related('book').all()
+    txs = BorrowTransaction.objects.in_branch(branch).select_related('book')
     
     chart_config = {'displayModeBar': False, 'responsive': True}
     
@@ -429,7 +653,10 @@ def admin_dashboard(request):
         'total_books':          total_books,
         'active_borrows':       active_borrows,
         'overdue_count':        overdue_count,
+        'fines_accrued':        fines_accrued,
         'overdue_transactions': overdue_transactions,
+        'branch':               branch,
+        'branch_counters':      branch_counters(),
         
         'graph1_html': graph1_html,
         'graph2_html': graph2_html,
@@ -437,4 +664,87 @@ def admin_dashboard(request):
         'graph3_pie_html': graph3_pie_html,
     }
 
-    return render(request, 'library_app/admin/dashboard.html', context)
\ No newline at end of file
+    return render(request, 'library_app/admin/dashboard.html', context)
+
+
+# ==========================================
+# Module 10: Runtime Metrics (Admin Only)
+# ==========================================
+def metrics_view(request):
+    """ ตัวนับภายใน worker ปัจจุบัน (connection pool, งานเบื้องหลัง ฯลฯ) ในรูปแบบ JSON """
+    if not request.session.get('is_admin'): return redirect('index')
+    return JsonResponse(metrics.snapshot())
+
+
+# ==========================================
+# Module 11: Stocktake (ตรวจนับหนังสือบนชั้น, Admin Only)
+# ==========================================
+def stocktake_list(request):
+    if not request.session.get('is_admin'): return redirect('index')
+
+    branch = counter_branch(request)
+    if request.method == 'POST':
+        if Stocktake.objects.filter(branch_id=branch or None, status='OPEN').exists():
+            messages.error(request, '⚠️ สาขานี้มีรอบตรวจนับที่ยังไม่ปิดอยู่แล้ว')
+            return redirect('stocktake_list')
+        stocktake = Stocktake.objects.create(branch_id=branch or None, started_by_id=request.session.get('member_id'))
+        messages.success(request, f'📦 เริ่มรอบตรวจนับ #{stocktake.pk} แล้ว สแกนหนังสือได้เลย')
+        return redirect('stocktake_detail', pk=stocktake.pk)
+
+    # ไม่ต้องโหลดรหัสที่สแกนและผลการตรวจนับของทุกรอบมาแสดงในรายการ
+    stocktakes = Stocktake.objects.select_related('branch', 'started_by').defer('scanned', 'result')
+    return render(request, 'library_app/stocktake/list.html', {
+        'stocktakes': stocktakes.order_by('-started_at')[:50], 'branch': branch,
+    })
+
+def stocktake_detail(request, pk):
+    """ หน้ารอบตรวจนับ: รับรหัสจากเครื่องสแกน (วางข้อความหรืออัปโหลดไฟล์) และแสดงผลการเทียบกับแคตตาล็อก """
+    if not request.session.get('is_admin'): return redirect('index')
+
+    stocktake = get_object_or_404(Stocktake, pk=pk)
+    if request.method == 'POST':
+        text = request.POST.get('scans', '')
+        upload = request.FILES.get('scan_file')
+        if upload:
+            text += '\n' + upload.read().decode('utf-8', errors='replace')
+        ids, rejected = parse_scans(text)
+        try:
+            stocktake = add_scans(stocktake, ids)
+        except StocktakeError as e:
+            messages.error(request, str(e))
+            return redirect('stocktake_detail', pk=pk)
+
+        messages.success(request, f'📦 รับรหัส {len(ids)} รายการ (สแกนแล้วทั้งหมด {stocktake.scanned_count} เล่ม)')
+        if rejected:
+            messages.warning(request, f'⚠️ ข้ามข้อความที่ไม่ใช่รหัสหนังสือ {len(rejected)} รายการ เช่น {", ".join(rejected[:5])}')
+        return redirect('stocktake_detail', pk=pk)
+
+    counts = summary(reconcile(stocktake)) if stocktake.status == 'OPEN' else stocktake.result['counts']
+    return render(request, 'library_app/stocktake/detail.html', {
+        'stocktake': stocktake,
+        'confirmed': counts['confirmed'],
+        'findings': [(name, label, counts[name]) for name, label in FINDINGS.items()],
+    })
+
+def stocktake_apply(request, pk):
+    """ ปิดรอบตรวจนับและปรับสถานะหนังสือตามผล (POST เท่านั้น) """
+    if not request.session.get('is_admin'): return redirect('index')
+
+    if request.method == 'POST':
+        try:
+            result = apply_stocktake(get_object_or_404(Stocktake, pk=pk))
+        except StocktakeError as e:
+            messages.error(request, str(e))
+        else:
+            messages.success(request, f"✅ ปรับสถานะแล้ว: LOST {result['marked_lost']} เล่ม, AVAILABLE {result['marked_available']} เล่ม")
+    return redirect('stocktake_detail', pk=pk)
+
+def stocktake_report(request, pk):
+    """ ดาวน์โหลดรายงานความคลาดเคลื่อนของรอบตรวจนับ (CSV แบบ streaming) """
+    if not request.session.get('is_admin'): return redirect('index')
+
+    stocktake = get_object_or_404(Stocktake, pk=pk)
+    response = StreamingHttpResponse(csv_lines(discrepancy_rows(stocktake), REPORT_HEADER),
+                                     content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="stocktake-{stocktake.pk}.csv"'
+    return response
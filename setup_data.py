@@ -9,6 +9,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core_config.settings')
 django.setup()
 
 from library_app.models import Member, Book, BorrowTransaction
+from library_app.fines import get_policy
 
 def run():
     print("🗑️  Cleaning old data...")
@@ -115,7 +116,7 @@ def run():
             # เลยกำหนดมาแล้ว 1-5 วัน
             due_date = get_date_ago(1, 5)
             start_date = due_date - timedelta(days=duration)
-            fine_amount = float((now - due_date).days * 10) # ปรับวันละ 10 บาท
+            fine_amount = get_policy().fine_for(due_date, now, book.category) # ใช้นโยบายค่าปรับเดียวกับระบบ
             book.status = 'BORROWED'
 
         else: # ACTIVE